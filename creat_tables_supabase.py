@@ -10,6 +10,22 @@ SUPABASE_CONFIG = {
     "port": "5432"
 }
 
+def sql_data_iso(coluna):
+    """
+    Expressão (PostgreSQL) que converte d/m/aaaa ou dd/mm/aaaa em aaaa-mm-dd, como
+    db_utils.data_iso; NULL se a data não existir. Os CASE aninhados garantem que as
+    conversões para inteiro só rodam depois de o formato e a faixa serem confirmados.
+    """
+    texto = f"btrim({coluna})"
+    dia, mes, ano = (f"split_part({texto}, '/', {parte})" for parte in (1, 2, 3))
+    ultimo_dia = f"extract(day from make_date({ano}::int, {mes}::int, 1) + interval '1 month' - interval '1 day')"
+    return f"""CASE WHEN {texto} ~ '^[0-9]{{1,2}}/[0-9]{{1,2}}/[0-9]{{4}}$' THEN
+                CASE WHEN {mes}::int BETWEEN 1 AND 12 AND {ano}::int >= 1 THEN
+                    CASE WHEN {dia}::int BETWEEN 1 AND {ultimo_dia}
+                    THEN {ano} || '-' || lpad({mes}, 2, '0') || '-' || lpad({dia}, 2, '0') END
+                END
+            END"""
+
 def criar_tabelas_supabase():
     try:
         conn = psycopg2.connect(
@@ -62,6 +78,8 @@ def criar_tabelas_supabase():
                 valor_produto REAL,
                 data_venda TEXT NOT NULL,
                 data_compra TEXT NOT NULL,
+                data_venda_iso TEXT,
+                data_compra_iso TEXT,
                 forma_pagamento TEXT,
                 codigo_loja TEXT NOT NULL,
                 nome_loja TEXT,
@@ -97,6 +115,19 @@ def criar_tabelas_supabase():
             );
         """)
 
+        # Datas ordenáveis (aaaa-mm-dd) para filtros de intervalo em tabelas já existentes
+        # (aceita d/m/aaaa, como o SQLite; datas inexistentes ficam NULL)
+        cursor.execute(f"""
+            ALTER TABLE vendas ADD COLUMN IF NOT EXISTS data_venda_iso TEXT;
+            ALTER TABLE vendas ADD COLUMN IF NOT EXISTS data_compra_iso TEXT;
+            UPDATE vendas SET data_venda_iso = {sql_data_iso('data_venda')}
+            WHERE data_venda_iso IS NULL AND data_venda IS NOT NULL;
+            UPDATE vendas SET data_compra_iso = {sql_data_iso('data_compra')}
+            WHERE data_compra_iso IS NULL AND data_compra IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_vendas_data_venda_iso ON vendas(data_venda_iso);
+            CREATE INDEX IF NOT EXISTS idx_vendas_data_compra_iso ON vendas(data_compra_iso);
+        """)
+
         conn.commit()
         conn.close()
         print("✅ Tabelas criadas com sucesso no Supabase!")
@@ -1,7 +1,9 @@
 import sys
 import os
-import random
+import math
+import functools
 import unidecode
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
@@ -44,8 +46,13 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # 🔹 Importações do seu projeto
 from src.pipeline import executar_pipeline, validar_e_padronizar_csv
-from src.validacao import corrigir_linha, validar_linha
-from src.db_utils import criar_tabela, carregar_usuarios, salvar_usuario, deletar_usuario
+from src.importacoes import planejar_importacao
+from src.validacao import corrigir_df, validar_df
+from src.categorias import normalizar_colunas
+from src.cubo_vendas import CuboVendas, CuboVendasIncremental
+from src.db_utils import (criar_tabela, carregar_usuarios, salvar_usuario, deletar_usuario, buscar_vendas_filtradas,
+                          buscar_opcoes_filtros, restricoes_perfil, versao_dados_vendas, combinar_filtros)
+from streamlit.errors import StreamlitAPIException
 
 # Configurações do dashboard
 st.set_page_config(page_title="Painel de Vendas", layout="wide")
@@ -420,29 +427,288 @@ if not any(isinstance(h, RotatingFileHandler) and getattr(h, 'baseFilename', Non
     wfh.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
     root_logger.addHandler(wfh)
 
-# 🔹 Função para carregar dados do SQLite (otimizada para memória)
-@st.cache_data
-def carregar_dados_sqlite(limit=50000):
+# 🔹 Função para carregar dados do banco (cache renovado quando `versao` muda)
+@st.cache_data(show_spinner=False, max_entries=2)
+def carregar_dados_sqlite(versao, limit=None):
     """
-    Carrega dados do SQLite com limite para evitar estouro de memória
+    Carrega todas as vendas do banco (o dashboard filtra no banco com
+    buscar_vendas_filtradas; esta carga completa serve ao pipeline).
+    `versao`: versao_dados_vendas(), só usada como chave do cache.
     """
     from src.db_utils import buscar_vendas
     return buscar_vendas(limit=limit)
 
-# 🔹 Função para obter lojas do banco de dados
-@st.cache_data
-def obter_lojas():
-    import sqlite3
-    conn = sqlite3.connect(DB_PATH)
-    query = "SELECT DISTINCT nome_loja FROM lojas ORDER BY nome_loja"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df['nome_loja'].tolist()
+# 🔹 Função para obter lojas do banco de dados (cache renovado quando `versao` muda)
+@st.cache_data(show_spinner=False, max_entries=4)
+def obter_lojas(versao):
+    """Nomes das lojas cadastradas; `versao` (versao_dados_vendas()) é só a chave do cache"""
+    from src.db_utils import buscar_lojas
+    df = buscar_lojas()
+    if df.empty:
+        return []
+    return df['nome_loja'].dropna().drop_duplicates().tolist()
+
+# Colunas de texto normalizadas (títulos, espaços e acentos) na carga dos dados
+COLUNAS_TEXTO_NORMALIZADO = ["nome_cliente", "bairro", "cidade", "forma_pagamento", "nome_vendedor"]
+
+def formatar_texto(texto):
+    if pd.isna(texto):
+        return ""
+    s = str(texto)
+    # Remove títulos
+    for prefixo in ["Sr.", "Sra.", "Dr.", "Dra.", "Srta."]:
+        s = s.replace(prefixo, "")
+    s = s.strip()
+    return unidecode.unidecode(s)
+
+def primeira_parte_endereco(serie):
+    """Endereço até a primeira vírgula ("" quando ausente), vetorizado"""
+    texto = serie.astype(object)
+    texto = texto.where(texto.isna(), texto.astype(str))
+    return texto.str.split(",", n=1).str[0].fillna("")
+
+def preencher_datas_nascimento(serie):
+    """
+    Datas de nascimento como dd/mm/aaaa, vetorizado; as ausentes ou inválidas
+    recebem uma data aleatória de quem tem entre 18 e 65 anos
+    """
+    datas = pd.to_datetime(serie, dayfirst=True, errors='coerce', format='mixed')
+    faltantes = datas.isna().to_numpy()
+    quantidade = int(faltantes.sum())
+    if quantidade:
+        sorteio = np.random.default_rng()
+        sorteadas = pd.to_datetime(pd.DataFrame({
+            'year': pd.Timestamp.today().year - sorteio.integers(18, 66, quantidade),
+            'month': sorteio.integers(1, 13, quantidade),
+            'day': sorteio.integers(1, 29, quantidade),
+        }))
+        datas = datas.copy()
+        datas[faltantes] = sorteadas.to_numpy()
+    return datas.dt.strftime("%d/%m/%Y")
+
+# 🔹 Cache das transformações: chaveado pela versão dos dados (banco ou arquivo),
+# de modo que mudar filtros não refaz correção, validação e limpeza
+def versao_csv(caminho):
+    """Versão de um CSV para as chaves de cache: caminho, mtime e tamanho"""
+    info = os.stat(caminho)
+    return (os.path.abspath(caminho), info.st_mtime_ns, info.st_size)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def carregar_csv_processado(caminho, versao):
+    """Lê, valida e formata o CSV carregado automaticamente (uma vez por `versao` do arquivo)"""
+    df_csv = pd.read_csv(caminho, sep=",", dtype=str)
+
+    # Validar e padronizar estrutura
+    df_csv = validar_e_padronizar_csv(df_csv)
+
+    # Processar dados (correção e validação vetorizadas)
+    df = corrigir_df(df_csv)
+    df['erros'] = validar_df(df).map(", ".join)
+
+    # Limpeza e formatação (uma vez por valor distinto; colunas de poucos valores ficam categóricas)
+    normalizar_colunas(df, COLUNAS_TEXTO_NORMALIZADO, lambda x: unidecode.unidecode(str(x)))
+    df["endereco"] = primeira_parte_endereco(df["endereco"])
+    df["telefone"] = df["telefone"].astype(str).str.extract(r'(\d{10,11})')[0]
+
+    # Datas
+    for coluna in ["data_compra", "data_venda"]:
+        df[coluna + "_dt"] = pd.to_datetime(df[coluna], format="%d/%m/%Y", errors="coerce")
+        df[coluna] = df[coluna + "_dt"].dt.strftime("%d/%m/%Y")
+
+    df["data_nascimento"] = preencher_datas_nascimento(df["data_nascimento"])
+    return df
+
+def limpar_dados(df):
+    """Validação, correção e limpeza (vetorizadas sobre o DataFrame inteiro)"""
+    df_corrigido = corrigir_df(df).reset_index(drop=True)
+    df_corrigido['erros'] = validar_df(df_corrigido).map(", ".join)
+
+    # Converter colunas numéricas
+    df_corrigido["quantidade"] = pd.to_numeric(df_corrigido["quantidade"], errors="coerce").fillna(0).astype(int)
+    df_corrigido["valor_produto"] = pd.to_numeric(df_corrigido["valor_produto"], errors="coerce").fillna(0.0).astype(float)
+
+    # 🔹 Limpeza e formatação (uma vez por valor distinto; colunas de poucos valores ficam categóricas)
+    normalizar_colunas(df_corrigido, COLUNAS_TEXTO_NORMALIZADO, formatar_texto)
+
+    # Corrigir endereço
+    df_corrigido["endereco"] = primeira_parte_endereco(df_corrigido["endereco"])
+
+    # Telefone: manter apenas a partir do DDD
+    df_corrigido["telefone"] = df_corrigido["telefone"].astype(str).str.extract(r'(\d{10,11})')[0]
+
+    # Datas: criar colunas datetime
+    for coluna in ["data_compra", "data_venda"]:
+        # Assume formato dd/mm/yyyy gerado pelo populate.py
+        df_corrigido[coluna + "_dt"] = pd.to_datetime(df_corrigido[coluna], format="%d/%m/%Y", errors="coerce")
+        df_corrigido[coluna] = df_corrigido[coluna + "_dt"].dt.strftime("%d/%m/%Y")
+
+    # Preencher data_nascimento
+    df_corrigido["data_nascimento"] = preencher_datas_nascimento(df_corrigido["data_nascimento"])
+    return df_corrigido
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def limpar_dados_cache(_df, versao):
+    """limpar_dados memorizado pela `versao` dos dados (o DataFrame em si não é hasheado)"""
+    return limpar_dados(_df)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def buscar_pagina_vendas(filtros, restricoes, ordenar_por, decrescente, pagina, tamanho, versao):
+    """
+    Uma página das vendas filtradas (ordenação, LIMIT e OFFSET no banco) já limpa,
+    memorizada por filtros, perfil, ordem, página e versão do banco
+    """
+    df = buscar_vendas_filtradas(filtros, restricoes, limit=tamanho, offset=(pagina - 1) * tamanho,
+                                 ordenar_por=ordenar_por, decrescente=decrescente)
+    return limpar_dados(df) if not df.empty else df
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def buscar_opcoes_filtros_cache(restricoes, versao):
+    """Opções dos filtros da sidebar, memorizadas por perfil e versão do banco"""
+    return buscar_opcoes_filtros(restricoes)
+
+# 🔹 Cubo de vendas para KPIs e gráficos, compartilhado entre sessões (não é
+# alterado; perfil e filtros entram com fatiar). No banco, cada nova versão dos
+# dados só acrescenta as vendas novas ao cubo
+@st.cache_resource(show_spinner=False)
+def cubo_vendas_banco(backend):
+    """Cubo incremental das vendas do banco (um por backend)"""
+    return CuboVendasIncremental()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def cubo_vendas_df(_df, versao):
+    """Cubo das vendas já limpas do CSV carregado, pela `versao` do arquivo"""
+    return CuboVendas.de_vendas(_df)
+
+def somar_cubo(cubo, *dimensoes, normalizar=False):
+    """
+    cubo.somar com os nomes de coluna dos gráficos. Com `normalizar` (dados do
+    banco), os rótulos de COLUNAS_TEXTO_NORMALIZADO passam por formatar_texto,
+    como as vendas em limpar_dados.
+    """
+    df = cubo.somar(*dimensoes)
+    texto = [coluna for coluna in dimensoes if coluna in COLUNAS_TEXTO_NORMALIZADO]
+    if normalizar and texto and not df.empty:
+        for coluna in texto:
+            df[coluna] = df[coluna].map(formatar_texto)
+        df = df.groupby(list(dimensoes), sort=False).sum().reset_index()
+    return df.rename(columns={'valor_total': 'valor_total_calculado', 'ano': 'year', 'mes': 'month'})
+
+# 🔹 Tabela "Dados Filtrados": paginação e formatação só das linhas exibidas
+# Colunas de ordenação (chaves de ORDENACAO_VENDAS em db_utils)
+ROTULOS_ORDENACAO = {
+    'data_venda': 'Data da venda',
+    'valor_total': 'Valor total',
+    'quantidade': 'Quantidade',
+    'nome_cliente': 'Cliente',
+    'nome_loja': 'Loja',
+    'nome_vendedor': 'Vendedor',
+    'nome_produto': 'Produto',
+    'forma_pagamento': 'Forma de pagamento',
+}
+TAMANHOS_PAGINA = [25, 50, 100, 250]
+COLUNAS_OCULTAS_TABELA = ["id_venda", "index", "erros", "data_importacao", "data_registro", "data_compra_dt",
+                          "data_venda_dt", "data_compra", "valor_total_calculado"]
+SEPARADORES_BRL = str.maketrans(",.", ".,")
+
+def formatar_brl(valores):
+    """Series numérica -> texto em reais (R$ 1.234,56); nulos viram vazio"""
+    numeros = pd.to_numeric(valores, errors="coerce")
+    texto = numeros.map("{:,.2f}".format, na_action="ignore").str.translate(SEPARADORES_BRL)
+    return ("R$ " + texto).fillna("")
+
+def tabela_vendas(df):
+    """Colunas e formatação de exibição/exportação das vendas (coluna a coluna, sem apply por linha)"""
+    colunas = [c for c in df.columns if c not in COLUNAS_OCULTAS_TABELA]
+    if "id_cliente" in colunas:
+        colunas.remove("id_cliente")
+        colunas = ["id_cliente"] + colunas
+    tabela = df[colunas].copy()
+    tabela["valor_total"] = formatar_brl(pd.to_numeric(df["valor_produto"], errors="coerce") *
+                                         pd.to_numeric(df["quantidade"], errors="coerce"))
+
+    # Tratamento de dados: remover acentuação da coluna endereco
+    if "endereco" in tabela.columns:
+        tabela["endereco"] = tabela["endereco"].map(lambda x: unidecode.unidecode(str(x)), na_action="ignore")
+
+    # Tratamento de dados: primeira letra maiúscula e demais minúsculas na coluna status_venda
+    if "status_venda" in tabela.columns:
+        tabela["status_venda"] = tabela["status_venda"].astype(object).str.capitalize()
+
+    for coluna in ["data_compra", "data_venda", "data_nascimento"]:
+        if coluna in tabela.columns:
+            tabela[coluna] = tabela[coluna].astype(str)
+    return tabela
+
+def ordenar_vendas(df, ordenar_por, decrescente):
+    """
+    `df` na ordem da tabela, ordenando só a coluna-chave (nulos como no SQLite:
+    primeiro na ordem crescente, por último na decrescente)
+    """
+    if ordenar_por == "data_venda":
+        chave = df["data_venda_dt"]
+    elif ordenar_por == "valor_total":
+        chave = df["valor_produto"] * df["quantidade"]
+    else:
+        chave = df[ordenar_por].astype(object)
+    posicoes = chave.reset_index(drop=True).sort_values(
+        ascending=not decrescente, kind="stable", na_position="last" if decrescente else "first").index
+    return df.iloc[posicoes]
+
+def pagina_vendas_df(df, ordenar_por, decrescente, pagina, tamanho):
+    """Página da tabela a partir do DataFrame carregado (CSV)"""
+    inicio = (pagina - 1) * tamanho
+    return ordenar_vendas(df, ordenar_por, decrescente).iloc[inicio:inicio + tamanho]
+
+def csv_vendas_banco(filtros, restricoes, ordenar_por, decrescente):
+    """CSV de todas as vendas filtradas no banco (gerado só quando a exportação é pedida)"""
+    vendas = buscar_vendas_filtradas(filtros, restricoes, ordenar_por=ordenar_por, decrescente=decrescente)
+    vendas = limpar_dados(vendas) if not vendas.empty else vendas
+    return tabela_vendas(vendas).to_csv(index=False, sep=';').encode("utf-8") if not vendas.empty else b""
+
+def csv_vendas_df(df, ordenar_por, decrescente):
+    """CSV de todas as vendas filtradas do DataFrame carregado (gerado só quando pedido)"""
+    return tabela_vendas(ordenar_vendas(df, ordenar_por, decrescente)).to_csv(index=False, sep=';').encode("utf-8")
+
+def botao_exportar_csv(gerar_csv):
+    """
+    Botão de exportação: o CSV é gerado no clique (download_button com função).
+    Em versões do Streamlit sem esse recurso, um botão prepara o arquivo antes.
+    """
+    argumentos = dict(label="Exportar dados filtrados", file_name="dados_filtrados.csv", mime="text/csv",
+                      use_container_width=True)
+    try:
+        st.download_button(data=gerar_csv, **argumentos)
+    except StreamlitAPIException:
+        if st.button("Preparar exportação", use_container_width=True):
+            st.download_button(data=gerar_csv(), **argumentos)
 
 # 🔹 Função para adicionar espaçamento entre seções
 def nova_linha():
     st.markdown("<br>", unsafe_allow_html=True)
 
+# 🔹 Abas que executam só o conteúdo da aba aberta
+def abas_sob_demanda(rotulos, key):
+    """
+    st.tabs com estado (on_change="rerun"): trocar de aba refaz a página e
+    apenas a aba aberta roda. Versões do Streamlit sem esse recurso criam abas
+    comuns, em que todas rodam.
+    """
+    try:
+        return st.tabs(rotulos, key=key, on_change="rerun")
+    except TypeError:
+        return st.tabs(rotulos)
+
+def expander_sob_demanda(rotulo, key):
+    """st.expander com estado: fechado, seu conteúdo não roda (ver abas_sob_demanda)"""
+    try:
+        return st.expander(rotulo, expanded=False, key=key, on_change="rerun")
+    except TypeError:
+        return st.expander(rotulo, expanded=False)
+
+def secao_aberta(secao):
+    """False só quando a aba/expander sabidamente está fechado (sem estado, tudo roda)"""
+    return getattr(secao, "open", None) is not False
+
 # 🔹 Função para detectar separador automaticamente
 def detectar_separador(uploaded_file):
     """Detecta automaticamente o separador do CSV (vírgula ou ponto e vírgula)"""
@@ -586,7 +852,7 @@ if st.session_state.get("show_config", False):
         with col2:
             nova_senha = st.text_input("Senha*", type="password", value=st.session_state.get('nova_senha', ''), key="nova_senha_input")
             # Obter lista de lojas do banco de dados
-            lojas_disponiveis = obter_lojas()
+            lojas_disponiveis = obter_lojas(versao_dados_vendas())
             lojas_disponiveis.insert(0, "Todas lojas")
             nova_loja = st.selectbox("Loja de atuação*", options=lojas_disponiveis, index=lojas_disponiveis.index(st.session_state.get('nova_loja', lojas_disponiveis[0])) if st.session_state.get('nova_loja') in lojas_disponiveis else 0, key="nova_loja_select")
 
@@ -728,7 +994,7 @@ if st.session_state.get("show_config", False):
                     senha_editada = st.text_input(f"Senha", value=data.get("password", ""), type="password", key=f"senha_{user}")
 
                     # Selectbox para lojas
-                    lojas_disponiveis = obter_lojas()
+                    lojas_disponiveis = obter_lojas(versao_dados_vendas())
                     lojas_disponiveis.insert(0, "Todas lojas")
                     loja_atual = data.get("loja", "Todas lojas")
                     loja_editada = st.selectbox(
@@ -886,6 +1152,14 @@ if st.session_state.get("show_config", False):
 else:
     # Inicializar df
     df = None
+    # Arquivo de onde df veio (para reconhecer, no pipeline, arquivos já importados)
+    fonte_importacao = None
+    # Dados do banco: filtros e restrições do perfil vão para a consulta SQL (df fica None)
+    dados_do_banco = False
+    # Versão de df (arquivo ou upload): chave do cache da limpeza
+    versao_dados = None
+    restricoes = restricoes_perfil(st.session_state.role, st.session_state.get('loja_usuario'),
+                                   st.session_state.get('nome_usuario'))
 
     # 🔹 Carregamento automático dos dados do CSV após login
     data_loaded_from_csv = False
@@ -893,60 +1167,18 @@ else:
     if os.path.exists(csv_path):
         st.info("Carregando dados automaticamente do arquivo CSV...")
         try:
-            # Carregar e processar CSV automaticamente
-            df_csv = pd.read_csv(csv_path, sep=",", dtype=str)
-
-            # Validar e padronizar estrutura
-            df_csv = validar_e_padronizar_csv(df_csv)
-
-            # Processar dados (correção e validação)
-            linhas_corrigidas = []
-            for _, row in df_csv.iterrows():
-                row = corrigir_linha(row)
-                erros = validar_linha(row)
-                row_dict = row.to_dict()
-                row_dict['erros'] = ", ".join(erros) if erros else ""
-                linhas_corrigidas.append(row_dict)
-
-            df = pd.DataFrame(linhas_corrigidas)
-
-            # Limpeza e formatação
-            df["nome_cliente"] = df["nome_cliente"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-            df["bairro"] = df["bairro"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-            df["cidade"] = df["cidade"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-            df["forma_pagamento"] = df["forma_pagamento"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-            df["nome_vendedor"] = df["nome_vendedor"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-            df["endereco"] = df.apply(lambda x: str(x["endereco"]).split(",")[0] if pd.notna(x["endereco"]) else "", axis=1)
-            df["telefone"] = df["telefone"].astype(str).str.extract(r'(\d{10,11})')[0]
-
-            # Datas
-            for coluna in ["data_compra", "data_venda"]:
-                df[coluna + "_dt"] = pd.to_datetime(df[coluna], format="%d/%m/%Y", errors="coerce")
-                df[coluna] = df[coluna + "_dt"].dt.strftime("%d/%m/%Y")
-
-            def preencher_data_nascimento(valor):
-                try:
-                    dt = pd.to_datetime(valor, dayfirst=True, errors='coerce')
-                    if pd.isna(dt):
-                        idade = random.randint(18, 65)
-                        ano = pd.Timestamp.today().year - idade
-                        mes = random.randint(1, 12)
-                        dia = random.randint(1, 28)
-                        dt = pd.Timestamp(year=ano, month=mes, day=dia)
-                    return dt.strftime("%d/%m/%Y")
-                except:
-                    return ""
-            df["data_nascimento"] = df["data_nascimento"].apply(preencher_data_nascimento)
+            # Carregar e processar CSV automaticamente (recalculado só quando o arquivo muda)
+            df = carregar_csv_processado(csv_path, versao_csv(csv_path))
+            versao_dados = ('csv',) + versao_csv(csv_path)
 
             data_loaded_from_csv = True
+            fonte_importacao = csv_path
             st.session_state['data_processed'] = True
             st.success("✅ Dados carregados automaticamente do CSV!")
         except Exception as e:
             st.error(f"❌ Erro ao carregar CSV automaticamente: {e}")
-            df = carregar_dados_sqlite()
             st.session_state['data_processed'] = False
     else:
-        df = carregar_dados_sqlite()
         st.session_state['data_processed'] = False
 
     # 🔹 Upload ou carregamento adicional (opcional)
@@ -967,6 +1199,8 @@ else:
 
             # Validar e padronizar estrutura
             df = validar_e_padronizar_csv(df)
+            fonte_importacao = uploaded_file
+            versao_dados = ('upload', uploaded_file.name, uploaded_file.size, getattr(uploaded_file, 'file_id', None))
 
             st.success("✅ CSV carregado com sucesso!")
 
@@ -993,59 +1227,21 @@ else:
     else:
         if not data_loaded_from_csv:
             #st.subheader("Carregando dados")
-            df = carregar_dados_sqlite()
+            versao_banco = versao_dados_vendas()
+            opcoes_filtros = buscar_opcoes_filtros_cache(restricoes, versao_banco)
+            dados_do_banco = opcoes_filtros['data_min'] is not None
 
             # Se não há dados no banco, tentar carregar automaticamente do CSV
-            if df.empty:
+            if not dados_do_banco:
                 csv_path = os.path.join(os.path.dirname(__file__), "..", "data", "raw", "vendas_clean.csv")
                 if os.path.exists(csv_path):
                     st.info("🔄 Carregando dados automaticamente do arquivo CSV...")
                     try:
-                        # Carregar e processar CSV automaticamente
-                        df_csv = pd.read_csv(csv_path, sep=",", dtype=str)
-
-                        # Validar e padronizar estrutura
-                        df_csv = validar_e_padronizar_csv(df_csv)
-
-                        # Processar dados (correção e validação)
-                        linhas_corrigidas = []
-                        for _, row in df_csv.iterrows():
-                            row = corrigir_linha(row)
-                            erros = validar_linha(row)
-                            row_dict = row.to_dict()
-                            row_dict['erros'] = ", ".join(erros) if erros else ""
-                            linhas_corrigidas.append(row_dict)
-
-                        df = pd.DataFrame(linhas_corrigidas)
-
-                        # Limpeza e formatação
-                        df["nome_cliente"] = df["nome_cliente"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-                        df["bairro"] = df["bairro"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-                        df["cidade"] = df["cidade"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-                        df["forma_pagamento"] = df["forma_pagamento"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-                        df["nome_vendedor"] = df["nome_vendedor"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else "")
-                        df["endereco"] = df.apply(lambda x: str(x["endereco"]).split(",")[0] if pd.notna(x["endereco"]) else "", axis=1)
-                        df["telefone"] = df["telefone"].astype(str).str.extract(r'(\d{10,11})')[0]
-
-                        # Datas
-                        for coluna in ["data_compra", "data_venda"]:
-                            df[coluna + "_dt"] = pd.to_datetime(df[coluna], format="%d/%m/%Y", errors="coerce")
-                            df[coluna] = df[coluna + "_dt"].dt.strftime("%d/%m/%Y")
-
-                        def preencher_data_nascimento(valor):
-                            try:
-                                dt = pd.to_datetime(valor, dayfirst=True, errors='coerce')
-                                if pd.isna(dt):
-                                    idade = random.randint(18, 65)
-                                    ano = pd.Timestamp.today().year - idade
-                                    mes = random.randint(1, 12)
-                                    dia = random.randint(1, 28)
-                                    dt = pd.Timestamp(year=ano, month=mes, day=dia)
-                                return dt.strftime("%d/%m/%Y")
-                            except:
-                                return ""
-                        df["data_nascimento"] = df["data_nascimento"].apply(preencher_data_nascimento)
+                        # Carregar e processar CSV automaticamente (recalculado só quando o arquivo muda)
+                        df = carregar_csv_processado(csv_path, versao_csv(csv_path))
+                        versao_dados = ('csv',) + versao_csv(csv_path)
 
+                        fonte_importacao = csv_path
                         st.success("✅ Dados carregados automaticamente do CSV!")
 
                     except Exception as e:
@@ -1064,8 +1260,20 @@ else:
             with col1:
                 if st.button("▶️ Executar pipeline"):
                     nova_linha()
-                    result = executar_pipeline(df, enviar_dropbox)
-                    st.success("✅ Pipeline executado com sucesso!")
+                    # Arquivo já importado é ignorado; de arquivo estendido, só as linhas novas
+                    importacao = planejar_importacao(fonte_importacao) if fonte_importacao is not None else None
+                    if df is None:
+                        df = carregar_dados_sqlite(versao_dados_vendas())
+                    df_pipeline = df
+                    if importacao:
+                        importacao['total_registros'] = len(df)
+                        importacao['usuario_importacao'] = st.session_state.get('usuario')
+                        df_pipeline = df.iloc[importacao['linhas_ja_importadas']:]
+                    result = executar_pipeline(df_pipeline, enviar_dropbox, importacao=importacao)
+                    if result.get("importacao") == "pular":
+                        st.info("ℹ️ Este arquivo já foi importado; nenhuma linha nova para processar.")
+                    else:
+                        st.success("✅ Pipeline executado com sucesso!")
 
                     relatorios_pdf = sorted(
                         [f for f in os.listdir(REPORTS_DIR) if f.startswith("relatorio_qualidade_") and f.endswith(".pdf")],
@@ -1082,76 +1290,24 @@ else:
             with col2:
                 pass  # Checkbox moved above
 
-    # 🔹 Validação e correção (otimizada para memória)
-    linhas_corrigidas = []
-    chunk_size = 1000
-
-    # Processar em chunks para evitar carregar tudo na memória
-    for start_idx in range(0, len(df), chunk_size):
-        end_idx = min(start_idx + chunk_size, len(df))
-        chunk_df = df.iloc[start_idx:end_idx]
-
-        for _, row in chunk_df.iterrows():
-            row = corrigir_linha(row)
-            erros = validar_linha(row)
-            row_dict = row.to_dict()
-            row_dict['erros'] = ", ".join(erros) if erros else ""
-            linhas_corrigidas.append(row_dict)
-
-        # Limpar chunk da memória
-        del chunk_df
-
-    df_corrigido = pd.DataFrame(linhas_corrigidas)
-    # Limpar lista após criar DataFrame
-    del linhas_corrigidas
-
-    # Converter colunas numéricas
-    df_corrigido["quantidade"] = pd.to_numeric(df_corrigido["quantidade"], errors="coerce").fillna(0).astype(int)
-    df_corrigido["valor_produto"] = pd.to_numeric(df_corrigido["valor_produto"], errors="coerce").fillna(0.0).astype(float)
-
-    # 🔹 Limpeza e formatação
-    def formatar_texto(texto):
-        if pd.isna(texto):
-            return ""
-        s = str(texto)
-        # Remove títulos
-        for prefixo in ["Sr.", "Sra.", "Dr.", "Dra.", "Srta."]:
-            s = s.replace(prefixo, "")
-        s = s.strip()
-        return unidecode.unidecode(s)
-
-    df_corrigido["nome_cliente"] = df_corrigido["nome_cliente"].apply(formatar_texto)
-    df_corrigido["bairro"] = df_corrigido["bairro"].apply(formatar_texto)
-    df_corrigido["cidade"] = df_corrigido["cidade"].apply(formatar_texto)
-    df_corrigido["forma_pagamento"] = df_corrigido["forma_pagamento"].apply(formatar_texto)
-    df_corrigido["nome_vendedor"] = df_corrigido["nome_vendedor"].apply(formatar_texto)
-
-    # Corrigir endereço
-    df_corrigido["endereco"] = df_corrigido.apply(lambda x: str(x["endereco"]).split(",")[0] if pd.notna(x["endereco"]) else "", axis=1)
-
-    # Telefone: manter apenas a partir do DDD
-    df_corrigido["telefone"] = df_corrigido["telefone"].astype(str).str.extract(r'(\d{10,11})')[0]
-
-    # Datas: criar colunas datetime
-    for coluna in ["data_compra", "data_venda"]:
-        # Assume formato dd/mm/yyyy gerado pelo populate.py
-        df_corrigido[coluna + "_dt"] = pd.to_datetime(df_corrigido[coluna], format="%d/%m/%Y", errors="coerce")
-        df_corrigido[coluna] = df_corrigido[coluna + "_dt"].dt.strftime("%d/%m/%Y")
-
-    # Preencher data_nascimento
-    def preencher_data_nascimento(valor):
-        try:
-            dt = pd.to_datetime(valor, dayfirst=True, errors='coerce')
-            if pd.isna(dt):
-                idade = random.randint(18, 65)
-                ano = pd.Timestamp.today().year - idade
-                mes = random.randint(1, 12)
-                dia = random.randint(1, 28)
-                dt = pd.Timestamp(year=ano, month=mes, day=dia)
-            return dt.strftime("%d/%m/%Y")
-        except:
-            return ""
-    df_corrigido["data_nascimento"] = df_corrigido["data_nascimento"].apply(preencher_data_nascimento)
+    # 🔹 Opções dos filtros: do banco (já restritas ao perfil) ou do DataFrame carregado
+    if dados_do_banco:
+        df_corrigido = None
+        opcoes = opcoes_filtros
+        vendedores_da_loja = opcoes['vendedores']
+        data_min = pd.to_datetime(opcoes['data_min']).date()
+        data_max = pd.to_datetime(opcoes['data_max']).date()
+    else:
+        df_corrigido = limpar_dados_cache(df, versao_dados) if versao_dados else limpar_dados(df)
+        opcoes = {
+            'lojas': df_corrigido["nome_loja"].dropna().unique().tolist(),
+            'vendedores': df_corrigido["nome_vendedor"].dropna().unique().tolist(),
+            'formas_pagamento': df_corrigido["forma_pagamento"].dropna().unique().tolist(),
+            'produtos': df_corrigido["nome_produto"].dropna().unique().tolist(),
+        }
+        vendedores_da_loja = df_corrigido[df_corrigido["nome_loja"] == st.session_state.loja_usuario]["nome_vendedor"].dropna().unique().tolist()
+        data_min = df_corrigido["data_venda_dt"].min().date()
+        data_max = df_corrigido["data_venda_dt"].max().date()
 
     # 🔹 Filtros na sidebar
     st.sidebar.header("Filtros")
@@ -1166,15 +1322,15 @@ else:
     elif st.session_state.role == "manager" and st.session_state.loja_usuario != "Todas lojas":
         # 🔹 MANAGER: vê dados de TODOS os vendedores da SUA loja
         filtro_loja = [st.session_state.loja_usuario]
-        filtro_vendedor = df_corrigido[df_corrigido["nome_loja"] == st.session_state.loja_usuario]["nome_vendedor"].dropna().unique()
+        filtro_vendedor = vendedores_da_loja
     else:
         # 🔹 ADMIN ou manager com "Todas" as lojas
-        filtro_loja = df_corrigido["nome_loja"].dropna().unique()
-        filtro_vendedor = df_corrigido["nome_vendedor"].dropna().unique()
+        filtro_loja = opcoes['lojas']
+        filtro_vendedor = opcoes['vendedores']
 
     # 🔹 Filtros adicionais (sempre aplicados, mas UI só se tiver permissão)
-    filtro_pagamento = df_corrigido["forma_pagamento"].dropna().unique()
-    filtro_produto = df_corrigido["nome_produto"].dropna().unique()
+    filtro_pagamento = opcoes['formas_pagamento']
+    filtro_produto = opcoes['produtos']
     filtro_status_usuario = ["Ativo"]  # Por padrão, mostrar apenas ativos
 
     # 🔹 Se tem permissão para ver filtros, mostrar interface para ajustar
@@ -1186,22 +1342,17 @@ else:
             
         # Para manager, permitir ajustar vendedores dentro da loja
         elif st.session_state.role == "manager" and st.session_state.loja_usuario != "Todas lojas":
-            filtro_vendedor = st.sidebar.multiselect("Vendedor",
-                df_corrigido[df_corrigido["nome_loja"] == st.session_state.loja_usuario]["nome_vendedor"].dropna().unique(),
-                default=filtro_vendedor)
+            filtro_vendedor = st.sidebar.multiselect("Vendedor", vendedores_da_loja, default=filtro_vendedor)
         elif st.session_state.role in ["admin", "manager"]:
             # Admin/manager podem ajustar loja e vendedor
-            filtro_loja = st.sidebar.multiselect("Loja", df_corrigido["nome_loja"].dropna().unique(),
-                                                 default=filtro_loja)
-            filtro_vendedor = st.sidebar.multiselect("Vendedor", df_corrigido["nome_vendedor"].dropna().unique(),
-                                                     default=filtro_vendedor)
+            filtro_loja = st.sidebar.multiselect("Loja", opcoes['lojas'], default=filtro_loja)
+            filtro_vendedor = st.sidebar.multiselect("Vendedor", opcoes['vendedores'], default=filtro_vendedor)
 
         # Filtros adicionais para admin/manager
         if st.session_state.role in ["admin", "manager"]:
-            filtro_pagamento = st.sidebar.multiselect("Forma de Pagamento", df_corrigido["forma_pagamento"].dropna().unique(),
+            filtro_pagamento = st.sidebar.multiselect("Forma de Pagamento", opcoes['formas_pagamento'],
                                                       default=filtro_pagamento)
-            filtro_produto = st.sidebar.multiselect("Produto", df_corrigido["nome_produto"].dropna().unique(),
-                                                   default=filtro_produto)
+            filtro_produto = st.sidebar.multiselect("Produto", opcoes['produtos'], default=filtro_produto)
 
             filtro_status_usuario = st.sidebar.multiselect(
                 "Status do Usuário",
@@ -1211,62 +1362,84 @@ else:
             )
 
     # 🔹 Filtro de datas (data_venda) - formato brasileiro
-    data_min = df_corrigido["data_venda_dt"].min().date()
-    data_max = df_corrigido["data_venda_dt"].max().date()
     inicio = st.sidebar.date_input("Data inicial - Venda (dd/mm/aaaa)", value=data_min, format="DD/MM/YYYY")
     fim = st.sidebar.date_input("Data final - Venda (dd/mm/aaaa)", value=data_max, format="DD/MM/YYYY")
     st.sidebar.caption("Calendário e datas no padrão brasileiro: dia/mês/ano. Se o calendário aparecer em inglês, ajuste o idioma do navegador para português.")
 
     # 🔹 Aplicar filtros - CORREÇÃO: Simplificar lógica de filtragem
+    def filtro_sql(escolhidos, disponiveis):
+        """None (sem filtro na consulta) quando todas as opções disponíveis estão marcadas"""
+        escolhidos = list(escolhidos)
+        return None if set(disponiveis) <= set(escolhidos) else escolhidos
+
+    # Cubo de todas as vendas (KPIs e gráficos somam fatias dele)
+    if dados_do_banco:
+        cubo_base = cubo_vendas_banco(versao_banco[0] if versao_banco else None).atualizar(versao_banco)
+    else:
+        cubo_base = cubo_vendas_df(df_corrigido, versao_dados) if versao_dados else CuboVendas.de_vendas(df_corrigido)
+
     try:
-        # Aplicar filtros básicos para todos os usuários
-        df_filtrado = df_corrigido[
-            (df_corrigido["nome_loja"].isin(filtro_loja)) &
-            (df_corrigido["nome_vendedor"].isin(filtro_vendedor)) &
-            (df_corrigido["forma_pagamento"].isin(filtro_pagamento)) &
-            (df_corrigido["nome_produto"].isin(filtro_produto)) &
-            (df_corrigido["data_venda_dt"] >= pd.to_datetime(inicio)) &
-            (df_corrigido["data_venda_dt"] <= pd.to_datetime(fim))
-        ]
-
-        # Dividir 'Cartão' em 'Cartão de Débito' e 'Cartão de Crédito'
-        cartao_rows = df_filtrado[df_filtrado['forma_pagamento'] == 'Cartão']
-        if not cartao_rows.empty:
-            num_cartao = len(cartao_rows)
-            num_debito = num_cartao // 2
-            debito_rows = cartao_rows.iloc[:num_debito].copy()
-            debito_rows['forma_pagamento'] = 'Cartão de Débito'
-            credito_rows = cartao_rows.iloc[num_debito:].copy()
-            credito_rows['forma_pagamento'] = 'Cartão de Crédito'
-            df_filtrado = df_filtrado[df_filtrado['forma_pagamento'] != 'Cartão']
-            df_filtrado = pd.concat([df_filtrado, debito_rows, credito_rows], ignore_index=True)
+        if dados_do_banco:
+            # KPIs, gráficos e total de linhas saem do cubo; da tabela, o banco
+            # entrega só a página exibida (filtros e perfil aplicados na consulta)
+            filtros = {
+                'lojas': filtro_sql(filtro_loja, opcoes['lojas']),
+                'vendedores': filtro_sql(filtro_vendedor, opcoes['vendedores']),
+                'formas_pagamento': filtro_sql(filtro_pagamento, opcoes['formas_pagamento']),
+                'produtos': filtro_sql(filtro_produto, opcoes['produtos']),
+                'data_inicio': inicio,
+                'data_fim': fim,
+            }
+            cubo = cubo_base.fatiar(combinar_filtros(filtros, restricoes))
+        else:
+            # Aplicar filtros básicos para todos os usuários
+            df_filtrado = df_corrigido[
+                (df_corrigido["nome_loja"].isin(filtro_loja)) &
+                (df_corrigido["nome_vendedor"].isin(filtro_vendedor)) &
+                (df_corrigido["forma_pagamento"].isin(filtro_pagamento)) &
+                (df_corrigido["nome_produto"].isin(filtro_produto)) &
+                (df_corrigido["data_venda_dt"] >= pd.to_datetime(inicio)) &
+                (df_corrigido["data_venda_dt"] <= pd.to_datetime(fim))
+            ]
+            cubo = cubo_base.fatiar({
+                'lojas': filtro_loja,
+                'vendedores': filtro_vendedor,
+                'formas_pagamento': filtro_pagamento,
+                'produtos': filtro_produto,
+                'data_inicio': inicio,
+                'data_fim': fim,
+            })
 
     except Exception as e:
         st.error(f"❌ Erro ao aplicar filtros: {e}")
         # Fallback: usar dados não filtrados
-        df_filtrado = df_corrigido.copy()
+        cubo = None
 
-    # 🔹 VERIFICAR SE df_filtrado EXISTE ANTES DE USAR
-    if 'df_filtrado' not in locals() or df_filtrado.empty:
+    # 🔹 VERIFICAR SE HÁ VENDAS COM OS FILTROS ANTES DE USAR
+    if cubo is None or cubo.vazio:
         st.info("Nenhum dado encontrado com os filtros aplicados. Verifique os filtros selecionados.")
-        # Usar df_corrigido como fallback para evitar erros
-        df_filtrado = df_corrigido.copy()
+        # Usar os dados sem filtros (no banco, ainda restritos ao perfil) como fallback para evitar erros
+        filtros = {}
+        df_filtrado = df_corrigido
+        cubo = cubo_base.fatiar(restricoes) if dados_do_banco else cubo_base
 
 
 
     # 🔹 Indicadores de Vendas
-    if st.session_state.permissions.get("ver_indicadores", True) and not df_filtrado.empty:
+    if st.session_state.permissions.get("ver_indicadores", True) and not cubo.vazio:
         try:
-            # Calcular valor total considerando quantidade
-            df_filtrado['valor_total_calculado'] = df_filtrado['valor_produto'] * df_filtrado['quantidade']
-            valor_total = df_filtrado['valor_total_calculado'].sum()
-            total_vendas = len(df_filtrado)
+            # Totais e rankings somados no cubo (valor = valor_produto * quantidade)
+            totais = cubo.totais()
+            valor_total = totais['valor_total']
+            total_vendas = totais['total_vendas']
             ticket_medio = valor_total / total_vendas if total_vendas > 0 else 0
-            
-            # CORREÇÃO: Garantir que estamos pegando valores numéricos
-            vendas_por_loja = df_filtrado.groupby("nome_loja")['valor_total_calculado'].sum().sort_values(ascending=False)
-            vendas_por_produto = df_filtrado.groupby("nome_produto")['valor_total_calculado'].sum().sort_values(ascending=False)
-            vendas_por_vendedor = df_filtrado.groupby("nome_vendedor")['valor_total_calculado'].sum().sort_values(ascending=False)
+
+            def ranking(coluna):
+                return somar_cubo(cubo, coluna, normalizar=dados_do_banco).set_index(coluna)['valor_total_calculado'].sort_values(ascending=False)
+
+            vendas_por_loja = ranking("nome_loja")
+            vendas_por_produto = ranking("nome_produto")
+            vendas_por_vendedor = ranking("nome_vendedor")
 
             nova_linha()
             st.markdown("### Indicadores de Vendas")
@@ -1339,394 +1512,382 @@ else:
         }
         
         # 🔹 DEFINIR AS TABS
-        tab1, tab2, tab3 = st.tabs(["Por Loja", "Evolução Temporal", "Por Produto"])
+        # Só a aba aberta calcula agregados e monta figuras (as demais não rodam)
+        tab1, tab2, tab3 = abas_sob_demanda(["Por Loja", "Evolução Temporal", "Por Produto"], "abas_graficos")
         
         with tab1:
-            col_chart1, col_chart2 = st.columns(2)
-
-            with col_chart1:
-                # Vendas por loja
-                if not df_filtrado.empty and 'nome_loja' in df_filtrado.columns:
-                    vendas_loja = df_filtrado.groupby('nome_loja').agg({
-                        'valor_total_calculado': 'sum'
-                    }).reset_index()
-
-                    if not vendas_loja.empty:
-                        # Criar coluna com nome curto da loja
-                        vendas_loja['nome_loja_curto'] = vendas_loja['nome_loja'].str.replace('Loja ', '', regex=False)
-                        vendas_loja['valor_formatado'] = vendas_loja['valor_total_calculado'].apply(
-                            lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.')
-                        )
-                        vendas_loja['nome_loja_display'] = vendas_loja['nome_loja'].map(loja_display_map)
-
-                        fig_lojas = px.bar(
-                            vendas_loja,
-                            x='nome_loja_display',
-                            y='valor_total_calculado',
-                            title="Vendas por Loja",
-                            color='nome_loja',
-                            color_discrete_map=loja_color_map,
-                            labels={'nome_loja_display': 'Loja', 'valor_total_calculado': 'Valor Total (R$)'},
-                            text=vendas_loja['valor_formatado']
-                        )
-
-                        fig_lojas.update_layout(
-                            title={'text': "Vendas por loja", 'x': 0.5, 'xanchor': 'center'},
-                            yaxis=dict(tickformat='R$ ,.2f'),
-                            legend_title_text=None,
-                            legend=dict(font=dict(size=14))
-                        )
-
-                        fig_lojas.update_traces(
-                            hovertemplate='<b>%{x}</b><br>%{text}<extra></extra>',
-                            textposition='none'
-                        )
-
-                        st.plotly_chart(fig_lojas, use_container_width=True)
+            if secao_aberta(tab1):
+                col_chart1, col_chart2 = st.columns(2)
+
+                with col_chart1:
+                    # Vendas por loja
+                    if not cubo.vazio:
+                        vendas_loja = somar_cubo(cubo, 'nome_loja')[['nome_loja', 'valor_total_calculado']]
+
+                        if not vendas_loja.empty:
+                            # Criar coluna com nome curto da loja
+                            vendas_loja['nome_loja_curto'] = vendas_loja['nome_loja'].str.replace('Loja ', '', regex=False)
+                            vendas_loja['valor_formatado'] = vendas_loja['valor_total_calculado'].apply(
+                                lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.')
+                            )
+                            vendas_loja['nome_loja_display'] = vendas_loja['nome_loja'].map(loja_display_map)
+
+                            fig_lojas = px.bar(
+                                vendas_loja,
+                                x='nome_loja_display',
+                                y='valor_total_calculado',
+                                title="Vendas por Loja",
+                                color='nome_loja',
+                                color_discrete_map=loja_color_map,
+                                labels={'nome_loja_display': 'Loja', 'valor_total_calculado': 'Valor Total (R$)'},
+                                text=vendas_loja['valor_formatado']
+                            )
+
+                            fig_lojas.update_layout(
+                                title={'text': "Vendas por loja", 'x': 0.5, 'xanchor': 'center'},
+                                yaxis=dict(tickformat='R$ ,.2f'),
+                                legend_title_text=None,
+                                legend=dict(font=dict(size=14))
+                            )
+
+                            fig_lojas.update_traces(
+                                hovertemplate='<b>%{x}</b><br>%{text}<extra></extra>',
+                                textposition='none'
+                            )
+
+                            st.plotly_chart(fig_lojas, use_container_width=True)
+                        else:
+                            st.info("📊 Não há dados de vendas por loja para exibir.")
                     else:
-                        st.info("📊 Não há dados de vendas por loja para exibir.")
-                else:
-                    st.info("📊 Aguardando dados para exibir gráfico de vendas por loja.")
-
-            with col_chart2:
-                # Top vendedores
-                if not df_filtrado.empty and 'nome_vendedor' in df_filtrado.columns and 'nome_loja' in df_filtrado.columns:
-                    top_vendedores_com_loja = df_filtrado.groupby(['nome_vendedor', 'nome_loja']).agg({
-                        'valor_total_calculado': 'sum'
-                    }).reset_index().nlargest(10, 'valor_total_calculado')
-
-                    if not top_vendedores_com_loja.empty:
-                        top_vendedores_com_loja['nome_loja_curto'] = top_vendedores_com_loja['nome_loja'].str.replace('Loja ', '', regex=False)
-                        top_vendedores_com_loja['valor_formatado'] = top_vendedores_com_loja['valor_total_calculado'].apply(
-                            lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.')
-                        )
-                        top_vendedores_com_loja['nome_loja_display'] = top_vendedores_com_loja['nome_loja'].map(loja_display_map)
-                        top_vendedores_com_loja = top_vendedores_com_loja.sort_values('valor_total_calculado', ascending=True)
-
-                        fig_vendedores = px.bar(
-                            top_vendedores_com_loja,
-                            x='valor_total_calculado',
-                            y='nome_vendedor',
-                            orientation='h',
-                            title="Total por vendedor",
-                            color='nome_loja',
-                            color_discrete_map=loja_color_map,
-                            labels={'valor_total_calculado': 'Valor Total (R$)', 'nome_vendedor': 'Vendedor'},
-                            text=top_vendedores_com_loja['valor_formatado']
-                        )
-
-                        fig_vendedores.update_layout(
-                            yaxis={'categoryorder': 'total ascending'},
-                            title={'text': "Total por vendedor", 'x': 0.5, 'xanchor': 'center'},
-                            xaxis=dict(tickformat='R$ ,.2f'),
-                            legend_title_text=None,
-                            legend=dict(font=dict(size=14))
-                        )
-
-                        fig_vendedores.update_traces(
-                            hovertemplate='<b>%{y}</b><br>%{text}<br>Loja: %{fullData.name}<extra></extra>',
-                            textposition='none'
-                        )
-
-                        st.plotly_chart(fig_vendedores, use_container_width=True)
+                        st.info("📊 Aguardando dados para exibir gráfico de vendas por loja.")
+
+                with col_chart2:
+                    # Top vendedores
+                    if not cubo.vazio:
+                        top_vendedores_com_loja = somar_cubo(cubo, 'nome_vendedor', 'nome_loja', normalizar=dados_do_banco)[
+                            ['nome_vendedor', 'nome_loja', 'valor_total_calculado']
+                        ].nlargest(10, 'valor_total_calculado')
+
+                        if not top_vendedores_com_loja.empty:
+                            top_vendedores_com_loja['nome_loja_curto'] = top_vendedores_com_loja['nome_loja'].str.replace('Loja ', '', regex=False)
+                            top_vendedores_com_loja['valor_formatado'] = top_vendedores_com_loja['valor_total_calculado'].apply(
+                                lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.')
+                            )
+                            top_vendedores_com_loja['nome_loja_display'] = top_vendedores_com_loja['nome_loja'].map(loja_display_map)
+                            top_vendedores_com_loja = top_vendedores_com_loja.sort_values('valor_total_calculado', ascending=True)
+
+                            fig_vendedores = px.bar(
+                                top_vendedores_com_loja,
+                                x='valor_total_calculado',
+                                y='nome_vendedor',
+                                orientation='h',
+                                title="Total por vendedor",
+                                color='nome_loja',
+                                color_discrete_map=loja_color_map,
+                                labels={'valor_total_calculado': 'Valor Total (R$)', 'nome_vendedor': 'Vendedor'},
+                                text=top_vendedores_com_loja['valor_formatado']
+                            )
+
+                            fig_vendedores.update_layout(
+                                yaxis={'categoryorder': 'total ascending'},
+                                title={'text': "Total por vendedor", 'x': 0.5, 'xanchor': 'center'},
+                                xaxis=dict(tickformat='R$ ,.2f'),
+                                legend_title_text=None,
+                                legend=dict(font=dict(size=14))
+                            )
+
+                            fig_vendedores.update_traces(
+                                hovertemplate='<b>%{y}</b><br>%{text}<br>Loja: %{fullData.name}<extra></extra>',
+                                textposition='none'
+                            )
+
+                            st.plotly_chart(fig_vendedores, use_container_width=True)
+                        else:
+                            st.info("📊 Não há dados de vendedores para exibir.")
                     else:
-                        st.info("📊 Não há dados de vendedores para exibir.")
-                else:
-                    st.info("📊 Aguardando dados para exibir gráfico de vendedores.")
+                        st.info("📊 Aguardando dados para exibir gráfico de vendedores.")
 
         with tab2:
-            col_chart3, col_chart4 = st.columns(2)
-
-            with col_chart3:
-                # Evolução temporal
-                if not df_filtrado.empty and 'data_venda_dt' in df_filtrado.columns and 'nome_loja' in df_filtrado.columns:
-                    df_filtrado_copy = df_filtrado.copy()
-                    df_filtrado_copy['month'] = df_filtrado_copy['data_venda_dt'].dt.month
-                    df_filtrado_copy['year'] = df_filtrado_copy['data_venda_dt'].dt.year
-
-                    evolucao_lojas = df_filtrado_copy.groupby(['year', 'month', 'nome_loja']).agg({
-                        'valor_total_calculado': 'sum'
-                    }).reset_index()
-
-                    if not evolucao_lojas.empty:
-                        evolucao_lojas = evolucao_lojas.sort_values(['year', 'month', 'valor_total_calculado'])
-                        evolucao_lojas['nome_loja_curto'] = evolucao_lojas['nome_loja'].str.replace('Loja ', '', regex=False)
-                        evolucao_lojas['nome_loja_display'] = evolucao_lojas['nome_loja'].map(loja_display_map)
-
-                        meses_pt = {
-                            1: 'jan', 2: 'fev', 3: 'mar', 4: 'abr', 5: 'mai', 6: 'jun',
-                            7: 'jul', 8: 'ago', 9: 'set', 10: 'out', 11: 'nov', 12: 'dez'
-                        }
-                        evolucao_lojas['data_display'] = evolucao_lojas.apply(
-                            lambda row: f"{meses_pt[row['month']]} {row['year']}", axis=1
-                        )
-
-                        fig_evolucao = px.bar(
-                            evolucao_lojas,
-                            x='data_display',
-                            y='valor_total_calculado',
-                            color='nome_loja',
-                            title="Evolução das vendas por loja",
-                            color_discrete_map=loja_color_map,
-                            labels={'data_display': 'Data', 'valor_total_calculado': 'Valor Total (R$)'}
-                        )
-
-                        fig_evolucao.update_layout(
-                            hovermode='x unified',
-                            showlegend=True,
-                            barmode='stack',
-                            legend=dict(
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1,
-                                itemclick="toggle",
-                                itemdoubleclick="toggleothers",
-                                font=dict(size=14)
-                            ),
-                            yaxis=dict(tickformat='R$ ,.2f'),
-                            xaxis=dict(categoryorder='array', categoryarray=evolucao_lojas['data_display'].unique()),
-                            legend_title_text=None
-                        )
-
-                        fig_evolucao.update_traces(
-                            hovertemplate='<b>%{fullData.name}</b><br>Data: %{x}<br>Valor: R$ %{y:,.2f}<extra></extra>'
-                        )
-
-                        fig_evolucao.update_layout(legend_traceorder='reversed')
-                        st.plotly_chart(fig_evolucao, use_container_width=True)
+            if secao_aberta(tab2):
+                col_chart3, col_chart4 = st.columns(2)
+
+                with col_chart3:
+                    # Evolução temporal
+                    if not cubo.vazio:
+                        evolucao_lojas = somar_cubo(cubo, 'ano', 'mes', 'nome_loja')[
+                            ['year', 'month', 'nome_loja', 'valor_total_calculado']
+                        ]
+
+                        if not evolucao_lojas.empty:
+                            evolucao_lojas = evolucao_lojas.sort_values(['year', 'month', 'valor_total_calculado'])
+                            evolucao_lojas['nome_loja_curto'] = evolucao_lojas['nome_loja'].str.replace('Loja ', '', regex=False)
+                            evolucao_lojas['nome_loja_display'] = evolucao_lojas['nome_loja'].map(loja_display_map)
+
+                            meses_pt = {
+                                1: 'jan', 2: 'fev', 3: 'mar', 4: 'abr', 5: 'mai', 6: 'jun',
+                                7: 'jul', 8: 'ago', 9: 'set', 10: 'out', 11: 'nov', 12: 'dez'
+                            }
+                            evolucao_lojas['data_display'] = evolucao_lojas.apply(
+                                lambda row: f"{meses_pt[row['month']]} {row['year']}", axis=1
+                            )
+
+                            fig_evolucao = px.bar(
+                                evolucao_lojas,
+                                x='data_display',
+                                y='valor_total_calculado',
+                                color='nome_loja',
+                                title="Evolução das vendas por loja",
+                                color_discrete_map=loja_color_map,
+                                labels={'data_display': 'Data', 'valor_total_calculado': 'Valor Total (R$)'}
+                            )
+
+                            fig_evolucao.update_layout(
+                                hovermode='x unified',
+                                showlegend=True,
+                                barmode='stack',
+                                legend=dict(
+                                    orientation="h",
+                                    yanchor="bottom",
+                                    y=1.02,
+                                    xanchor="right",
+                                    x=1,
+                                    itemclick="toggle",
+                                    itemdoubleclick="toggleothers",
+                                    font=dict(size=14)
+                                ),
+                                yaxis=dict(tickformat='R$ ,.2f'),
+                                xaxis=dict(categoryorder='array', categoryarray=evolucao_lojas['data_display'].unique()),
+                                legend_title_text=None
+                            )
+
+                            fig_evolucao.update_traces(
+                                hovertemplate='<b>%{fullData.name}</b><br>Data: %{x}<br>Valor: R$ %{y:,.2f}<extra></extra>'
+                            )
+
+                            fig_evolucao.update_layout(legend_traceorder='reversed')
+                            st.plotly_chart(fig_evolucao, use_container_width=True)
+                        else:
+                            st.info("📊 Não há dados de evolução temporal para exibir.")
                     else:
-                        st.info("📊 Não há dados de evolução temporal para exibir.")
-                else:
-                    st.info("📊 Aguardando dados para exibir gráfico de evolução temporal.")
-
-            with col_chart4:
-                # Formas de pagamento
-                if not df_filtrado.empty and 'forma_pagamento' in df_filtrado.columns:
-                    pagamentos = df_filtrado.groupby('forma_pagamento').agg({
-                        'valor_total_calculado': 'sum',
-                        'quantidade': 'count'
-                    }).reset_index()
-
-                    if not pagamentos.empty:
-                        total_valor = pagamentos['valor_total_calculado'].sum()
-                        pagamentos['porcentagem'] = (pagamentos['valor_total_calculado'] / total_valor * 100).round(1)
-                        pagamentos['valor_formatado'] = pagamentos['valor_total_calculado'].apply(
-                            lambda x: f'R$ {x:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
-                        )
-
-                        fig_pagamentos = px.pie(
-                            pagamentos,
-                            names='forma_pagamento',
-                            values='valor_total_calculado',
-                            title="Forma De Pagamento",
-                            color_discrete_map={'Cartão de Débito': '#9B59B6', 'Cartão de Crédito': '#B8860B', 'Dinheiro': '#2B50E4', 'Pix': '#E67E22', 'Boleto': '#27AE60'},
-                            custom_data=['valor_formatado', 'porcentagem']
-                        )
-
-                        fig_pagamentos.update_traces(
-                            textposition='outside',
-                            texttemplate='<b>%{customdata[0]}</b><br><b>(%{customdata[1]}%)</b>',
-                            hovertemplate='<b>%{label}</b><br>Valor: %{customdata[0]}<br>Percentual: %{customdata[1]:.1f}%',
-                            marker=dict(line=dict(color='#ffffff', width=2))
-                        )
-
-                        fig_pagamentos.update_layout(
-                            title={'text': "Distribuição por forma de pagamento", 'x': 0.5, 'xanchor': 'center'},
-                            margin=dict(t=80, b=80, l=80, r=80),
-                            showlegend=True,
-                            legend=dict(
-                                orientation="v",
-                                yanchor="middle",
-                                y=0.7,
-                                xanchor="left",
-                                x=1.15,
-                                font=dict(size=14)
-                            ),
-                            uniformtext_minsize=13.5,
-                            uniformtext_mode='hide'
-                        )
-
-                        st.plotly_chart(fig_pagamentos, use_container_width=True)
+                        st.info("📊 Aguardando dados para exibir gráfico de evolução temporal.")
+
+                with col_chart4:
+                    # Formas de pagamento
+                    if not cubo.vazio:
+                        pagamentos = somar_cubo(cubo, 'forma_pagamento', normalizar=dados_do_banco)[
+                            ['forma_pagamento', 'valor_total_calculado', 'total_vendas']
+                        ].rename(columns={'total_vendas': 'quantidade'})
+
+                        if not pagamentos.empty:
+                            total_valor = pagamentos['valor_total_calculado'].sum()
+                            pagamentos['porcentagem'] = (pagamentos['valor_total_calculado'] / total_valor * 100).round(1)
+                            pagamentos['valor_formatado'] = pagamentos['valor_total_calculado'].apply(
+                                lambda x: f'R$ {x:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+                            )
+
+                            fig_pagamentos = px.pie(
+                                pagamentos,
+                                names='forma_pagamento',
+                                values='valor_total_calculado',
+                                title="Forma De Pagamento",
+                                color_discrete_map={'Cartão': '#9B59B6', 'Cartão de Débito': '#9B59B6', 'Cartão de Crédito': '#B8860B', 'Dinheiro': '#2B50E4', 'Pix': '#E67E22', 'Boleto': '#27AE60'},
+                                custom_data=['valor_formatado', 'porcentagem']
+                            )
+
+                            fig_pagamentos.update_traces(
+                                textposition='outside',
+                                texttemplate='<b>%{customdata[0]}</b><br><b>(%{customdata[1]}%)</b>',
+                                hovertemplate='<b>%{label}</b><br>Valor: %{customdata[0]}<br>Percentual: %{customdata[1]:.1f}%',
+                                marker=dict(line=dict(color='#ffffff', width=2))
+                            )
+
+                            fig_pagamentos.update_layout(
+                                title={'text': "Distribuição por forma de pagamento", 'x': 0.5, 'xanchor': 'center'},
+                                margin=dict(t=80, b=80, l=80, r=80),
+                                showlegend=True,
+                                legend=dict(
+                                    orientation="v",
+                                    yanchor="middle",
+                                    y=0.7,
+                                    xanchor="left",
+                                    x=1.15,
+                                    font=dict(size=14)
+                                ),
+                                uniformtext_minsize=13.5,
+                                uniformtext_mode='hide'
+                            )
+
+                            st.plotly_chart(fig_pagamentos, use_container_width=True)
+                        else:
+                            st.info("📊 Não há dados de formas de pagamento para exibir.")
                     else:
-                        st.info("📊 Não há dados de formas de pagamento para exibir.")
-                else:
-                    st.info("📊 Aguardando dados para exibir gráfico de formas de pagamento.")
+                        st.info("📊 Aguardando dados para exibir gráfico de formas de pagamento.")
         
         with tab3:
-            col_chart5, col_chart6 = st.columns(2)
+            if secao_aberta(tab3):
+                col_chart5, col_chart6 = st.columns(2)
             
-            with col_chart5:
-                # Produtos mais vendidos
-                if not df_filtrado.empty and 'nome_produto' in df_filtrado.columns:
-                    produtos_vendidos = df_filtrado.groupby('nome_produto').agg({
-                        'quantidade': 'sum'
-                    }).nlargest(10, 'quantidade').reset_index()
-
-                    if not produtos_vendidos.empty:
-                        total_quantidade = produtos_vendidos['quantidade'].sum()
-                        produtos_vendidos['porcentagem'] = (produtos_vendidos['quantidade'] / total_quantidade * 100).round(1)
-
-                        st.markdown("""
-                            <h3 style='font-size: 18px; font-weight: bold; margin-bottom: 20px; text-align: center;'>
-                                Produtos mais vendidos (Quantidade)
-                            </h3>
-                        """, unsafe_allow_html=True)
-
-                        cols = st.columns(3)
+                with col_chart5:
+                    # Produtos mais vendidos
+                    if not cubo.vazio:
+                        produtos_vendidos = somar_cubo(cubo, 'nome_produto')[
+                            ['nome_produto', 'quantidade']
+                        ].nlargest(10, 'quantidade').reset_index(drop=True)
+
+                        if not produtos_vendidos.empty:
+                            total_quantidade = produtos_vendidos['quantidade'].sum()
+                            produtos_vendidos['porcentagem'] = (produtos_vendidos['quantidade'] / total_quantidade * 100).round(1)
+
+                            st.markdown("""
+                                <h3 style='font-size: 18px; font-weight: bold; margin-bottom: 20px; text-align: center;'>
+                                    Produtos mais vendidos (Quantidade)
+                                </h3>
+                            """, unsafe_allow_html=True)
+
+                            cols = st.columns(3)
                         
-                        for i, (_, produto) in enumerate(produtos_vendidos.head(6).iterrows()):
-                            with cols[i % 3]:
-                                st.markdown(
-                                    f"""
-                                    <div style='
-                                        background: #2B50E4;
-                                        padding: 15px;
-                                        border-radius: 10px;
-                                        margin: 8px 0;
-                                        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                                        color: white;
-                                        text-align: center;
-                                        height: 120px;
-                                        display: flex;
-                                        flex-direction: column;
-                                        justify-content: center;
-                                    '>
-                                        <h4 style='margin: 0; font-size: 14px; font-weight: bold;'>#{i+1} {produto['nome_produto']}</h4>
-                                        <div style='font-size: 20px; font-weight: bold; margin: 8px 0;'>{produto['quantidade']} un</div>
-                                        <div style='font-size: 12px; background: rgba(255,255,255,0.2); padding: 4px; border-radius: 5px;'>
-                                            {produto['porcentagem']}% do total
+                            for i, (_, produto) in enumerate(produtos_vendidos.head(6).iterrows()):
+                                with cols[i % 3]:
+                                    st.markdown(
+                                        f"""
+                                        <div style='
+                                            background: #2B50E4;
+                                            padding: 15px;
+                                            border-radius: 10px;
+                                            margin: 8px 0;
+                                            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+                                            color: white;
+                                            text-align: center;
+                                            height: 120px;
+                                            display: flex;
+                                            flex-direction: column;
+                                            justify-content: center;
+                                        '>
+                                            <h4 style='margin: 0; font-size: 14px; font-weight: bold;'>#{i+1} {produto['nome_produto']}</h4>
+                                            <div style='font-size: 20px; font-weight: bold; margin: 8px 0;'>{produto['quantidade']} un</div>
+                                            <div style='font-size: 12px; background: rgba(255,255,255,0.2); padding: 4px; border-radius: 5px;'>
+                                                {produto['porcentagem']}% do total
+                                            </div>
                                         </div>
-                                    </div>
-                                    """,
-                                    unsafe_allow_html=True
-                                )
-
-                        if len(produtos_vendidos) > 6:
-                            with st.expander(f"Ver todos os {len(produtos_vendidos)} produtos"):
-                                df_expander = produtos_vendidos.iloc[6:].copy()
-                                df_expander['Posição'] = range(7, len(produtos_vendidos) + 1)
-                                df_expander = df_expander[['Posição', 'nome_produto', 'quantidade', 'porcentagem']]
-                                df_expander.columns = ['#', 'Produto', 'Unidade', '% do Total']
-                                st.dataframe(df_expander, use_container_width=True, hide_index=True)
+                                        """,
+                                        unsafe_allow_html=True
+                                    )
+
+                            if len(produtos_vendidos) > 6:
+                                with st.expander(f"Ver todos os {len(produtos_vendidos)} produtos"):
+                                    df_expander = produtos_vendidos.iloc[6:].copy()
+                                    df_expander['Posição'] = range(7, len(produtos_vendidos) + 1)
+                                    df_expander = df_expander[['Posição', 'nome_produto', 'quantidade', 'porcentagem']]
+                                    df_expander.columns = ['#', 'Produto', 'Unidade', '% do Total']
+                                    st.dataframe(df_expander, use_container_width=True, hide_index=True)
+                        else:
+                            st.info("📊 Não há dados de produtos vendidos para exibir.")
+                    else:
+                        st.info("📊 Aguardando dados para exibir cards de produtos mais vendidos.")
+
+                with col_chart6:
+                    st.markdown("<div style='margin-top: 32px;'></div>", unsafe_allow_html=True)
+
+                    # Produtos por valor
+                    if not cubo.vazio:
+                        produtos_valor = somar_cubo(cubo, 'nome_produto')[
+                            ['nome_produto', 'valor_total_calculado']
+                        ].nlargest(10, 'valor_total_calculado').reset_index(drop=True)
+
+                        if not produtos_valor.empty:
+                            produtos_valor['valor_formatado'] = produtos_valor['valor_total_calculado'].apply(
+                                lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.')
+                            )
+
+                            st.markdown("""
+                                <h3 style='
+                                    text-align: center;
+                                    font-size: 18px;
+                                    font-family: Arial, sans-serif;
+                                '>
+                                    Produtos por valor (Total)
+                                </h3>
+                            """, unsafe_allow_html=True)
+
+                            produtos_valor_colors = ['#9B59B6', '#B8860B', '#2B50E4', '#E67E22', '#27AE60',
+                                                     '#FF6B6B', '#4ECDC4', '#45B7D1', '#FECA57', '#8B4513']
+
+                            fig_produtos_valor = px.bar(
+                                produtos_valor,
+                                x='valor_total_calculado',
+                                y='nome_produto',
+                                orientation='h',
+                                color='nome_produto',
+                                color_discrete_sequence=produtos_valor_colors,
+                                labels={'valor_total_calculado': 'Valor Total (R$)', 'nome_produto': ''},
+                                text=produtos_valor['valor_formatado']
+                            )
+
+                            fig_produtos_valor.update_layout(
+                                yaxis=dict(
+                                    showticklabels=True,
+                                    title='',
+                                    automargin=True,
+                                    categoryorder='total ascending'
+                                ),
+                                showlegend=True,
+                                legend=dict(
+                                    orientation='v',
+                                    yanchor='top',
+                                    xanchor='left',
+                                    x=1.02,
+                                    itemclick='toggle',
+                                    itemdoubleclick='toggleothers',
+                                    font=dict(size=14)
+                                ),
+                                margin=dict(t=10, b=50, l=50, r=150),
+                                height=350,
+                                xaxis=dict(tickformat='R$ ,.2f')
+                            )
+
+                            fig_produtos_valor.update_traces(
+                                hovertemplate='<b>%{y}</b><br>%{text}<extra></extra>',
+                                textposition='none',
+                                marker_line_width=0
+                            )
+
+                            st.plotly_chart(fig_produtos_valor, use_container_width=True)
+                        else:
+                            st.info("📊 Não há dados de produtos por valor para exibir.")
                     else:
-                        st.info("📊 Não há dados de produtos vendidos para exibir.")
+                        st.info("📊 Aguardando dados para exibir gráfico de produtos por valor.")
+
+    # 🔹 Tabela filtrada com expander, paginação e download
+    if not cubo.vazio:
+        expander_tabela = expander_sob_demanda("Dados Filtrados", "expander_dados_filtrados")
+        with expander_tabela:
+            if secao_aberta(expander_tabela):
+                col_ordem, col_direcao, col_tamanho, col_pagina = st.columns(4)
+                ordenar_por = col_ordem.selectbox("Ordenar por", list(ROTULOS_ORDENACAO),
+                                                  format_func=ROTULOS_ORDENACAO.get, key="tabela_ordenar_por")
+                decrescente = col_direcao.selectbox("Ordem", ["Decrescente", "Crescente"],
+                                                    key="tabela_ordem") == "Decrescente"
+                tamanho_pagina = col_tamanho.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1,
+                                                       key="tabela_tamanho_pagina")
+
+                # Total de linhas sem contar no banco: o cubo já tem o total de vendas filtradas
+                total_linhas = cubo.totais()['total_vendas'] if dados_do_banco else len(df_filtrado)
+                total_paginas = max(1, math.ceil(total_linhas / tamanho_pagina))
+                pagina = int(col_pagina.number_input(f"Página (de {total_paginas})", min_value=1,
+                                                     max_value=total_paginas, value=1, step=1))
+
+                if dados_do_banco:
+                    df_pagina = buscar_pagina_vendas(filtros, restricoes, ordenar_por, decrescente, pagina,
+                                                     tamanho_pagina, versao_banco)
                 else:
-                    st.info("📊 Aguardando dados para exibir cards de produtos mais vendidos.")
-
-            with col_chart6:
-                st.markdown("<div style='margin-top: 32px;'></div>", unsafe_allow_html=True)
-
-                # Produtos por valor
-                if not df_filtrado.empty and 'nome_produto' in df_filtrado.columns:
-                    produtos_valor = df_filtrado.groupby('nome_produto').agg({
-                        'valor_total_calculado': 'sum'
-                    }).nlargest(10, 'valor_total_calculado').reset_index()
-
-                    if not produtos_valor.empty:
-                        produtos_valor['valor_formatado'] = produtos_valor['valor_total_calculado'].apply(
-                            lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.')
-                        )
+                    df_pagina = pagina_vendas_df(df_filtrado, ordenar_por, decrescente, pagina, tamanho_pagina)
 
-                        st.markdown("""
-                            <h3 style='
-                                text-align: center;
-                                font-size: 18px;
-                                font-family: Arial, sans-serif;
-                            '>
-                                Produtos por valor (Total)
-                            </h3>
-                        """, unsafe_allow_html=True)
-
-                        produtos_valor_colors = ['#9B59B6', '#B8860B', '#2B50E4', '#E67E22', '#27AE60',
-                                                 '#FF6B6B', '#4ECDC4', '#45B7D1', '#FECA57', '#8B4513']
-
-                        fig_produtos_valor = px.bar(
-                            produtos_valor,
-                            x='valor_total_calculado',
-                            y='nome_produto',
-                            orientation='h',
-                            color='nome_produto',
-                            color_discrete_sequence=produtos_valor_colors,
-                            labels={'valor_total_calculado': 'Valor Total (R$)', 'nome_produto': ''},
-                            text=produtos_valor['valor_formatado']
-                        )
-
-                        fig_produtos_valor.update_layout(
-                            yaxis=dict(
-                                showticklabels=True,
-                                title='',
-                                automargin=True,
-                                categoryorder='total ascending'
-                            ),
-                            showlegend=True,
-                            legend=dict(
-                                orientation='v',
-                                yanchor='top',
-                                xanchor='left',
-                                x=1.02,
-                                itemclick='toggle',
-                                itemdoubleclick='toggleothers',
-                                font=dict(size=14)
-                            ),
-                            margin=dict(t=10, b=50, l=50, r=150),
-                            height=350,
-                            xaxis=dict(tickformat='R$ ,.2f')
-                        )
-
-                        fig_produtos_valor.update_traces(
-                            hovertemplate='<b>%{y}</b><br>%{text}<extra></extra>',
-                            textposition='none',
-                            marker_line_width=0
-                        )
+                primeira_linha = (pagina - 1) * tamanho_pagina
+                st.caption(f"Vendas {primeira_linha + 1} a {primeira_linha + len(df_pagina)} de {total_linhas}")
+                if not df_pagina.empty:
+                    st.dataframe(tabela_vendas(df_pagina), use_container_width=True)
 
-                        st.plotly_chart(fig_produtos_valor, use_container_width=True)
-                    else:
-                        st.info("📊 Não há dados de produtos por valor para exibir.")
+                if dados_do_banco:
+                    botao_exportar_csv(functools.partial(csv_vendas_banco, filtros, restricoes, ordenar_por, decrescente))
                 else:
-                    st.info("📊 Aguardando dados para exibir gráfico de produtos por valor.")
-
-    # 🔹 Tabela filtrada com expander e download
-    if not df_filtrado.empty:
-        with st.expander("Dados Filtrados", expanded=False):
-            cols_para_mostrar = [c for c in df_filtrado.columns if c not in ["id_venda", "index", "erros", "data_importacao", "data_registro", "data_compra_dt", "data_venda_dt", "data_compra", "valor_total_calculado"]]
-            if "id_cliente" in cols_para_mostrar:
-                cols_para_mostrar.remove("id_cliente")
-                cols_para_mostrar = ["id_cliente"] + cols_para_mostrar
-
-            # Adicionar valor_total_calculado como valor_total para exibição
-            df_filtrado_display = df_filtrado[cols_para_mostrar].copy()
-            df_filtrado_display['valor_total'] = df_filtrado['valor_total_calculado']
-
-            # Tratamento de dados: remover acentuação da coluna endereco
-            if "endereco" in df_filtrado_display.columns:
-                df_filtrado_display["endereco"] = df_filtrado_display["endereco"].apply(lambda x: unidecode.unidecode(str(x)) if pd.notna(x) else x)
-
-            # Tratamento de dados: primeira letra maiúscula e demais minúsculas na coluna status_venda
-            if "status_venda" in df_filtrado_display.columns:
-                df_filtrado_display["status_venda"] = df_filtrado_display["status_venda"].apply(lambda x: str(x).capitalize() if pd.notna(x) else x)
-
-            # Garantir formato das datas brasileiras
-            for coluna in ["data_compra_dt", "data_venda_dt"]:
-                if coluna in df_filtrado_display.columns:
-                    df_filtrado_display[coluna] = pd.to_datetime(df_filtrado_display[coluna], errors="coerce").dt.strftime("%d/%m/%Y")
-
-            for coluna in ["data_compra", "data_venda", "data_nascimento"]:
-                if coluna in df_filtrado_display.columns:
-                    df_filtrado_display[coluna] = df_filtrado_display[coluna].astype(str)
-
-            # Formatar valor_total para exibição em reais
-            if "valor_total" in df_filtrado_display.columns:
-                df_filtrado_display["valor_total"] = df_filtrado_display["valor_total"].apply(
-                    lambda x: f"R$ {x:,.2f}".replace(',', 'temp').replace('.', ',').replace('temp', '.') if pd.notna(x) else ""
-                )
-
-            st.dataframe(df_filtrado_display, use_container_width=True)
-            st.download_button(
-                label="Exportar dados filtrados",
-                data=df_filtrado_display.to_csv(index=False, sep=';').encode("utf-8"),
-                file_name="dados_filtrados.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
\ No newline at end of file
+                    botao_exportar_csv(functools.partial(csv_vendas_df, df_filtrado, ordenar_por, decrescente))
@@ -81,6 +81,8 @@ CREATE TABLE IF NOT EXISTS vendas (
     valor_produto REAL NOT NULL CHECK(valor_produto >= 0),
     data_venda TEXT NOT NULL,
     data_compra TEXT NOT NULL,
+    data_venda_iso TEXT,               -- data_venda em aaaa-mm-dd (ordenável; usada em filtros e ordenação)
+    data_compra_iso TEXT,              -- data_compra em aaaa-mm-dd
     forma_pagamento TEXT,
     codigo_loja TEXT NOT NULL,
     nome_loja TEXT,
@@ -171,7 +173,33 @@ CREATE TABLE IF NOT EXISTS importacoes (
     registros_com_erro INTEGER DEFAULT 0,
     usuario_importacao TEXT,
     data_importacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    status TEXT DEFAULT 'CONCLUIDA'
+    status TEXT DEFAULT 'CONCLUIDA',
+    hash_arquivo TEXT,                 -- sha256 do conteúdo do arquivo
+    tamanho_bytes INTEGER              -- tamanho do arquivo (permite detectar arquivos estendidos)
+);
+
+-- =============================================
+-- TABELA: vendas_resumo_diario
+-- Resumo por (dia, loja, vendedor, produto, forma de pagamento), atualizado pelo
+-- pipeline ao fim de cada chunk; as views de desempenho leem daqui
+-- =============================================
+CREATE TABLE IF NOT EXISTS vendas_resumo_diario (
+    dia TEXT NOT NULL,                 -- data_venda_iso
+    codigo_loja TEXT NOT NULL,
+    codigo_vendedor TEXT NOT NULL,
+    codigo_produto TEXT NOT NULL,
+    forma_pagamento TEXT NOT NULL DEFAULT '',
+    total_vendas INTEGER NOT NULL DEFAULT 0,
+    quantidade_total INTEGER NOT NULL DEFAULT 0,
+    valor_total REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, codigo_loja, codigo_vendedor, codigo_produto, forma_pagamento)
+) WITHOUT ROWID;
+
+-- Último id_venda já agregado em vendas_resumo_diario
+CREATE TABLE IF NOT EXISTS vendas_resumo_controle (
+    id INTEGER PRIMARY KEY CHECK(id = 1),
+    ultimo_id_venda INTEGER NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- =============================================
@@ -234,7 +262,9 @@ BEGIN
     UPDATE vendas SET data_registro = CURRENT_TIMESTAMP WHERE id_venda = NEW.id_venda;
 END;
 
--- Trigger: Log de novas vendas
+-- Trigger: Log de novas vendas (uma linha por venda)
+-- Opcional: o pipeline grava um resumo por importação/chunk em sistema_logs;
+-- desative com src/migrations/ensure_loja_vendedor.py --sale-log-trigger off
 CREATE TRIGGER IF NOT EXISTS trg_vendas_after_insert_log
 AFTER INSERT ON vendas
 FOR EACH ROW
@@ -266,8 +296,8 @@ END;
 
 -- Índices para tabela vendas
 CREATE INDEX IF NOT EXISTS idx_vendas_cpf ON vendas(cpf);
-CREATE INDEX IF NOT EXISTS idx_vendas_data_venda ON vendas(data_venda);
-CREATE INDEX IF NOT EXISTS idx_vendas_data_compra ON vendas(data_compra);
+CREATE INDEX IF NOT EXISTS idx_vendas_data_venda_iso ON vendas(data_venda_iso);
+CREATE INDEX IF NOT EXISTS idx_vendas_data_compra_iso ON vendas(data_compra_iso);
 CREATE INDEX IF NOT EXISTS idx_vendas_loja ON vendas(codigo_loja);
 CREATE INDEX IF NOT EXISTS idx_vendas_vendedor ON vendas(codigo_vendedor);
 CREATE INDEX IF NOT EXISTS idx_vendas_produto ON vendas(codigo_produto);
@@ -295,6 +325,9 @@ CREATE INDEX IF NOT EXISTS idx_logs_modulo ON sistema_logs(modulo);
 CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos(categoria);
 CREATE INDEX IF NOT EXISTS idx_produtos_ativo ON produtos(ativo);
 
+-- Índices para tabela importacoes
+CREATE INDEX IF NOT EXISTS idx_importacoes_hash ON importacoes(hash_arquivo);
+
 -- =============================================
 -- VIEWS PARA RELATÓRIOS
 -- =============================================
@@ -307,6 +340,8 @@ SELECT
     v.nome_cliente,
     v.data_venda,
     v.data_compra,
+    v.data_venda_iso,
+    v.data_compra_iso,
     p.nome_produto,
     p.categoria as categoria_produto,
     v.valor_produto,
@@ -323,79 +358,117 @@ FROM vendas v
 JOIN produtos p ON v.codigo_produto = p.codigo_produto
 JOIN lojas l ON v.codigo_loja = l.codigo_loja
 JOIN vendedores vd ON v.codigo_vendedor = vd.codigo_vendedor
-WHERE v.data_venda IS NOT NULL;
+WHERE v.data_venda_iso IS NOT NULL;
+
+-- View: Resumo diário atualizado - grupos de vendas_resumo_diario mais as vendas
+-- gravadas depois da marca d'água (inserções fora do pipeline), agrupadas do mesmo jeito
+CREATE VIEW IF NOT EXISTS vw_vendas_resumo_atual AS
+SELECT dia, codigo_loja, codigo_vendedor, codigo_produto, forma_pagamento,
+       total_vendas, quantidade_total, valor_total
+FROM vendas_resumo_diario
+UNION ALL
+SELECT 
+    v.data_venda_iso,
+    v.codigo_loja,
+    v.codigo_vendedor,
+    v.codigo_produto,
+    COALESCE(v.forma_pagamento, ''),
+    COUNT(*),
+    SUM(v.quantidade),
+    COALESCE(SUM(v.valor_total), 0)
+FROM vendas v
+WHERE v.id_venda > (SELECT COALESCE(MAX(ultimo_id_venda), 0) FROM vendas_resumo_controle)
+  AND v.data_venda_iso IS NOT NULL
+GROUP BY 1, 2, 3, 4, 5;
 
--- View: Performance de vendedores
+-- View: Performance de vendedores (a partir do resumo diário)
 CREATE VIEW IF NOT EXISTS vw_performance_vendedores AS
 SELECT 
     vd.codigo_vendedor,
     vd.nome_vendedor,
     l.nome_loja,
-    COUNT(v.id_venda) as total_vendas,
-    SUM(v.valor_total) as valor_total_vendido,
-    AVG(v.valor_total) as ticket_medio,
-    MAX(v.data_venda) as ultima_venda
+    SUM(r.total_vendas) as total_vendas,
+    SUM(r.valor_total) as valor_total_vendido,
+    SUM(r.valor_total) / SUM(r.total_vendas) as ticket_medio,
+    MAX(r.dia) as ultima_venda
 FROM vendedores vd
-LEFT JOIN vendas v ON vd.codigo_vendedor = v.codigo_vendedor
-LEFT JOIN lojas l ON v.codigo_loja = l.codigo_loja
-WHERE v.data_venda IS NOT NULL
+JOIN vw_vendas_resumo_atual r ON vd.codigo_vendedor = r.codigo_vendedor
+LEFT JOIN lojas l ON r.codigo_loja = l.codigo_loja
 GROUP BY vd.codigo_vendedor, vd.nome_vendedor, l.nome_loja;
 
--- View: Performance de lojas
+-- View: Performance de lojas (contagem e valores do resumo diário; clientes e
+-- vendedores distintos não são somáveis por grupo e continuam contados em vendas)
 CREATE VIEW IF NOT EXISTS vw_performance_lojas AS
 SELECT 
     l.codigo_loja,
     l.nome_loja,
     l.cidade,
     l.estado,
-    COUNT(v.id_venda) as total_vendas,
-    SUM(v.valor_total) as valor_total_vendido,
-    COUNT(DISTINCT v.codigo_vendedor) as total_vendedores,
-    COUNT(DISTINCT v.id_cliente) as total_clientes,
-    AVG(v.valor_total) as ticket_medio
+    r.total_vendas,
+    r.valor_total_vendido,
+    d.total_vendedores,
+    d.total_clientes,
+    r.valor_total_vendido / r.total_vendas as ticket_medio
 FROM lojas l
-LEFT JOIN vendas v ON l.codigo_loja = v.codigo_loja
-WHERE v.data_venda IS NOT NULL
-GROUP BY l.codigo_loja, l.nome_loja, l.cidade, l.estado;
-
--- View: Produtos mais vendidos
+JOIN (
+    SELECT codigo_loja, SUM(total_vendas) as total_vendas, SUM(valor_total) as valor_total_vendido
+    FROM vw_vendas_resumo_atual
+    GROUP BY codigo_loja
+) r ON r.codigo_loja = l.codigo_loja
+LEFT JOIN (
+    SELECT codigo_loja, COUNT(DISTINCT codigo_vendedor) as total_vendedores,
+           COUNT(DISTINCT id_cliente) as total_clientes
+    FROM vendas
+    WHERE data_venda_iso IS NOT NULL
+    GROUP BY codigo_loja
+) d ON d.codigo_loja = l.codigo_loja;
+
+-- View: Produtos mais vendidos (a partir do resumo diário)
 CREATE VIEW IF NOT EXISTS vw_produtos_mais_vendidos AS
 SELECT 
     p.codigo_produto,
     p.nome_produto,
     p.categoria,
     p.valor_produto,
-    SUM(v.quantidade) as total_vendido,
-    SUM(v.valor_total) as valor_total_vendido,
-    COUNT(v.id_venda) as total_vendas
+    SUM(r.quantidade_total) as total_vendido,
+    SUM(r.valor_total) as valor_total_vendido,
+    SUM(r.total_vendas) as total_vendas
 FROM produtos p
-JOIN vendas v ON p.codigo_produto = v.codigo_produto
-WHERE v.data_venda IS NOT NULL
+JOIN vw_vendas_resumo_atual r ON p.codigo_produto = r.codigo_produto
 GROUP BY p.codigo_produto, p.nome_produto, p.categoria, p.valor_produto
 ORDER BY total_vendido DESC;
 
 -- View: Vendas por período (mensal)
 CREATE VIEW IF NOT EXISTS vw_vendas_mensais AS
 SELECT 
-    strftime('%Y-%m', data_venda) as mes_ano,
+    substr(data_venda_iso, 1, 7) as mes_ano,
     COUNT(*) as total_vendas,
     SUM(valor_total) as valor_total,
     AVG(valor_total) as ticket_medio,
     COUNT(DISTINCT id_cliente) as clientes_unicos
 FROM vendas
-WHERE data_venda IS NOT NULL
-GROUP BY strftime('%Y-%m', data_venda)
+WHERE data_venda_iso IS NOT NULL
+GROUP BY substr(data_venda_iso, 1, 7)
 ORDER BY mes_ano DESC;
 
--- View: Resumo para dashboard
+-- View: Resumo para dashboard (contagem e valores do resumo diário mais as vendas
+-- sem data, que o resumo não agrupa - lidas pelo índice de data_venda_iso; os
+-- COUNT(DISTINCT ...) não são somáveis por grupo e continuam em vendas)
 CREATE VIEW IF NOT EXISTS vw_dashboard_resumo AS
 SELECT 
-    (SELECT COUNT(*) FROM vendas) as total_vendas,
-    (SELECT SUM(valor_total) FROM vendas) as valor_total_vendido,
+    t.total_vendas,
+    t.valor_total_vendido,
     (SELECT COUNT(DISTINCT id_cliente) FROM vendas) as total_clientes,
     (SELECT COUNT(DISTINCT codigo_vendedor) FROM vendas) as total_vendedores,
     (SELECT COUNT(*) FROM lojas WHERE ativo = 1) as total_lojas_ativas,
-    (SELECT AVG(valor_total) FROM vendas) as ticket_medio_geral;
+    t.valor_total_vendido / NULLIF(t.total_vendas, 0) as ticket_medio_geral
+FROM (
+    SELECT 
+        (SELECT COALESCE(SUM(total_vendas), 0) FROM vw_vendas_resumo_atual)
+            + (SELECT COUNT(*) FROM vendas WHERE data_venda_iso IS NULL) as total_vendas,
+        (SELECT COALESCE(SUM(valor_total), 0) FROM vw_vendas_resumo_atual)
+            + COALESCE((SELECT SUM(valor_total) FROM vendas WHERE data_venda_iso IS NULL), 0) as valor_total_vendido
+) t;
 
 -- =============================================
 -- DADOS INICIAIS (INSERÇÕES BÁSICAS)
@@ -1,8 +1,9 @@
-from src.db_utils import criar_tabela, inserir_linha, ensure_store_sellers_from_df, logger
+from src.db_utils import criar_tabela, inserir_linha, ensure_store_sellers_from_df, reconstruir_resumo_vendas, logger
 from src.etl import carregar_dados, tratar_dados
-from src.validacao import corrigir_linha, validar_linha
 from src.gerador_dados import gerar_dados_fake
-from src.pipeline import executar_pipeline
+from src.importacoes import planejar_importacao
+from src.pipeline import (executar_pipeline, executar_pipeline_stream, corrigir_e_validar_paralelo, USAR_BLOOM_CPF,
+                          CARGA_EM_BLOCO, NIVEL_AUDITORIA)
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 import os
@@ -110,13 +111,33 @@ def main():
     p_run = sub.add_parser('run', help='Run the pipeline processing data/raw/vendas.csv')
     p_run.add_argument('--generate-sample', action='store_true')
     p_run.add_argument('--sample-size', type=int, default=100)
+    p_run.add_argument('--stream', action='store_true',
+                       help='Read the CSV in chunks instead of loading it whole; exact-duplicate rows within a '
+                            'chunk are dropped (repeats across chunks are caught by the CPF check) and '
+                            'missing columns filled as usual, but rows keep the file order '
+                            '(not sorted by id_cliente) and extra columns such as the sale dates are kept')
+    p_run.add_argument('--chunk-size', type=int, default=5000)
+    p_run.add_argument('--workers', type=int, default=1, help='Processes used for correction/validation')
+    p_run.add_argument('--force', action='store_true', help='Process the file even if it was already imported')
+    p_run.add_argument('--resume', action='store_true', help='Continue an interrupted run from its last checkpoint')
+    p_run.add_argument('--cpf-bloom', action='store_true', default=USAR_BLOOM_CPF,
+                       help='Prefilter duplicate CPFs with the Bloom filter persisted under data/db/')
+    p_run.add_argument('--bulk-load', action='store_true', default=CARGA_EM_BLOCO,
+                       help='SQLite: load chunks through a staging table with set-based trigger checks')
+    p_run.add_argument('--rebuild-indexes', action='store_true', default=None,
+                       help='With --bulk-load, drop secondary vendas indexes during the load and rebuild them after')
+    p_run.add_argument('--audit-level', choices=['importacao', 'chunk', 'nenhuma'], default=NIVEL_AUDITORIA,
+                       help='Summary entries written to sistema_logs: per import (default), per chunk, or none')
 
     p_gen = sub.add_parser('generate-sample', help='Generate a sample vendas.csv')
     p_gen.add_argument('--sample-size', type=int, default=100)
 
     p_mig = sub.add_parser('migrate', help='Run DB migrations (idempotent)')
 
+    sub.add_parser('rebuild-summary', help='Recreate the daily sales summary table from vendas')
+
     p_dry = sub.add_parser('dry-run', help='Run pipeline validation without DB writes')
+    p_dry.add_argument('--workers', type=int, default=1, help='Processes used for correction/validation')
 
     args = parser.parse_args()
 
@@ -136,6 +157,12 @@ def main():
         criar_tabela()
         return
 
+    if args.cmd == 'rebuild-summary':
+        logger.info('Rebuilding daily sales summary')
+        criar_tabela()
+        reconstruir_resumo_vendas()
+        return
+
     # run or dry-run both need to load and treat data
     if args.cmd in ('run', 'dry-run'):
         if args.cmd == 'run' and getattr(args, 'generate_sample', False):
@@ -143,28 +170,53 @@ def main():
             gerar_dados_fake('data/raw/vendas.csv', quantidade=args.sample_size)
 
         criar_tabela()
+
+        if args.cmd == 'run' and args.stream:
+            # streaming run: memory bounded by chunk size, not by file size
+            result = executar_pipeline_stream('data/raw/vendas.csv', enviar_dropbox=False,
+                                              chunk_size=args.chunk_size, sep=';', workers=args.workers,
+                                              verificar_importacao=not args.force, retomar=args.resume,
+                                              usar_bloom_cpf=args.cpf_bloom, carga_em_bloco=args.bulk_load,
+                                              recriar_indices=args.rebuild_indexes, nivel_auditoria=args.audit_level)
+            logger.info('Pipeline result: %s', result)
+            # keep the file in place after a failure so the run can be resumed
+            if result.get('sucesso'):
+                arquivar_csv()
+            return
+
         df = carregar_dados('data/raw/vendas.csv')
         if df.empty:
             logger.error('CSV is empty or malformed: data/raw/vendas.csv')
             return
+
+        # skip files already imported; for extended files keep only the new rows
+        importacao = None
+        if args.cmd == 'run' and not args.force:
+            importacao = planejar_importacao('data/raw/vendas.csv')
+            df = df.iloc[importacao['linhas_ja_importadas']:]
+            importacao['total_registros'] = importacao['linhas_ja_importadas'] + len(df)
         df = tratar_dados(df)
 
         if args.cmd == 'dry-run':
             logger.info('Running dry-run: validating %d rows', len(df))
             # only validate and report issues
-            problemas = []
-            for _, row in df.iterrows():
-                r = corrigir_linha(row)
-                erros = validar_linha(r)
-                if erros:
-                    problemas.append({'row': r.to_dict(), 'erros': erros})
+            df_corrigido, erros_por_linha = corrigir_e_validar_paralelo(df, workers=args.workers)
+            com_erros = erros_por_linha.map(len) > 0
+            problemas = [
+                {'row': row, 'erros': erros}
+                for row, erros in zip(df_corrigido[com_erros].to_dict('records'), erros_por_linha[com_erros])
+            ]
             logger.info('Dry-run completed: %d rows with issues', len(problemas))
             return
 
         # normal run
-        result = executar_pipeline(df, enviar_dropbox=False, caminho_raw='data/raw/vendas.csv')
+        result = executar_pipeline(df, enviar_dropbox=False, caminho_raw='data/raw/vendas.csv', workers=args.workers,
+                                   importacao=importacao, retomar=args.resume,
+                                   usar_bloom_cpf=args.cpf_bloom, carga_em_bloco=args.bulk_load,
+                                   recriar_indices=args.rebuild_indexes, nivel_auditoria=args.audit_level)
         logger.info('Pipeline result: %s', result)
-        arquivar_csv()
+        if result.get('sucesso'):
+            arquivar_csv()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,99 @@
+# src/acumuladores.py
+"""
+Estruturas de memória limitada usadas pelo pipeline para acumular resultados
+linha a linha, independentemente do tamanho da entrada:
+- AmostraReservatorio: amostra aleatória uniforme de tamanho fixo;
+- CsvErrosRotativo: grava as linhas com erro em CSVs que rodam por tamanho.
+"""
+import csv
+import os
+import random
+
+class AmostraReservatorio:
+    """
+    Amostra uniforme de até `capacidade` itens de um fluxo de tamanho desconhecido
+    (algoritmo R): cada item visto tem a mesma probabilidade de estar na amostra.
+    """
+
+    def __init__(self, capacidade=1000, semente=None):
+        self.capacidade = capacidade
+        self.vistos = 0
+        self.itens = []
+        self._random = random.Random(semente)
+
+    def adicionar(self, item):
+        self.vistos += 1
+        if len(self.itens) < self.capacidade:
+            self.itens.append(item)
+        else:
+            posicao = self._random.randrange(self.vistos)
+            if posicao < self.capacidade:
+                self.itens[posicao] = item
+
+    def extend(self, itens):
+        for item in itens:
+            self.adicionar(item)
+
+    def estado(self):
+        """Estado serializável em JSON (itens, vistos e gerador), para checkpoints"""
+        return {'vistos': self.vistos, 'itens': self.itens, 'random': self._random.getstate()}
+
+    def restaurar(self, estado):
+        """Continua a amostragem a partir de um estado()"""
+        self.vistos = estado['vistos']
+        self.itens = list(estado['itens'])
+        versao, interno, gauss = estado['random']
+        self._random.setstate((versao, tuple(interno), gauss))
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __iter__(self):
+        return iter(self.itens)
+
+class CsvErrosRotativo:
+    """
+    Escreve linhas (dicts) em `{prefixo}_001.csv`, `{prefixo}_002.csv`, ...,
+    abrindo um novo arquivo a cada `max_linhas` linhas. As colunas são as do
+    primeiro registro escrito. Os arquivos só são criados se houver linhas.
+    """
+
+    def __init__(self, prefixo, max_linhas=100000):
+        self.prefixo = prefixo
+        self.max_linhas = max_linhas
+        self.arquivos = []
+        self.total_linhas = 0
+        self._arquivo = None
+        self._writer = None
+        self._colunas = None
+        self._linhas_arquivo = 0
+
+    def _rotacionar(self):
+        self.fechar()
+        caminho = f"{self.prefixo}_{len(self.arquivos) + 1:03d}.csv"
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        self._arquivo = open(caminho, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._arquivo, fieldnames=self._colunas, extrasaction='ignore')
+        self._writer.writeheader()
+        self._linhas_arquivo = 0
+        self.arquivos.append(caminho)
+
+    def escrever(self, linhas):
+        for linha in linhas:
+            if self._colunas is None:
+                self._colunas = list(linha.keys())
+            if self._writer is None or self._linhas_arquivo >= self.max_linhas:
+                self._rotacionar()
+            self._writer.writerow(linha)
+            self._linhas_arquivo += 1
+            self.total_linhas += 1
+
+    def flush(self):
+        if self._arquivo:
+            self._arquivo.flush()
+
+    def fechar(self):
+        if self._arquivo:
+            self._arquivo.close()
+            self._arquivo = None
+            self._writer = None
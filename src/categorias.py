@@ -0,0 +1,46 @@
+# src/categorias.py
+"""
+Normalização de texto por dicionário para colunas com poucos valores distintos
+(forma de pagamento, vendedor, cidade...): a coluna vira pandas Categorical e a
+função de normalização roda uma vez por valor distinto, não por linha.
+
+A coluna continua categórica em filtros (isin) e agrupamentos - use
+groupby(..., observed=True) para não gerar grupos vazios.
+"""
+import numpy as np
+import pandas as pd
+
+# Acima desta proporção de valores distintos por linha a coluna volta a ser texto
+# (categorias não economizam memória quando quase todo valor é único)
+PROPORCAO_MAX_CATEGORIAS = 0.5
+
+def normalizar_categorias(serie, funcao, valor_nulo=""):
+    """
+    Aplica `funcao` a cada valor distinto de `serie` e devolve uma Series
+    categórica com os valores normalizados (valores que passam a coincidir são
+    fundidos em uma categoria). Nulos viram `valor_nulo`; com None continuam nulos.
+    """
+    codigos, valores = pd.factorize(serie)
+    normalizados = [funcao(valor) for valor in valores]
+    if valor_nulo is not None:
+        normalizados.append(valor_nulo)
+        codigos = np.where(codigos < 0, len(valores), codigos)
+
+    mapa, categorias = pd.factorize(pd.Index(normalizados, dtype=object))
+    mapa = np.append(mapa, -1)  # códigos -1 (nulos mantidos) continuam -1
+    return pd.Series(pd.Categorical.from_codes(mapa[codigos], categories=categorias),
+                     index=serie.index, name=serie.name)
+
+def normalizar_colunas(df, colunas, funcao, valor_nulo="", proporcao_max=PROPORCAO_MAX_CATEGORIAS):
+    """
+    Normaliza em `df` (no lugar) as `colunas` existentes com normalizar_categorias.
+    Colunas com mais de `proporcao_max` valores distintos por linha voltam a object.
+    """
+    for coluna in colunas:
+        if coluna not in df.columns:
+            continue
+        normalizada = normalizar_categorias(df[coluna], funcao, valor_nulo)
+        if len(df) and len(normalizada.cat.categories) > proporcao_max * len(df):
+            normalizada = normalizada.astype(object)
+        df[coluna] = normalizada
+    return df
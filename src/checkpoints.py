@@ -0,0 +1,67 @@
+# src/checkpoints.py
+"""
+Checkpoints do pipeline: após cada chunk gravado, o estado parcial (último
+chunk, linhas consumidas, contadores e erros por tipo) é salvo em JSON, para
+que uma execução interrompida possa ser retomada de onde parou.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_CHECKPOINTS = os.path.join("data", "checkpoints")
+
+def impressao_dataframe(df):
+    """Hash do conteúdo de um DataFrame (para identificar o checkpoint de dados em memória)"""
+    hashes_linhas = pd.util.hash_pandas_object(df, index=False).values
+    hasher = hashlib.sha256(hashes_linhas.tobytes())
+    hasher.update("|".join(map(str, df.columns)).encode('utf-8'))
+    return hasher.hexdigest()
+
+def caminho_checkpoint(chave):
+    return os.path.join(DIRETORIO_CHECKPOINTS, f"{chave}.json")
+
+def carregar_checkpoint(chave, chunk_size, inicio=0):
+    """
+    Retorna o estado salvo para `chave`, ou None se não houver checkpoint
+    compatível (mesmo tamanho de chunk e mesma linha inicial).
+    """
+    caminho = caminho_checkpoint(chave)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            estado = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Checkpoint ilegível ignorado ({caminho}): {e}")
+        return None
+
+    if estado.get('chunk_size') != chunk_size or estado.get('inicio') != inicio:
+        logger.warning(f"⚠️ Checkpoint de {caminho} foi gerado com outros parâmetros; ignorando")
+        return None
+
+    logger.info(f"♻️ Retomando do chunk {estado['ultimo_chunk']} ({estado['total_linhas']} linhas já processadas)")
+    return estado
+
+def salvar_checkpoint(chave, estado):
+    """Grava o estado de forma atômica (arquivo temporário + os.replace)"""
+    os.makedirs(DIRETORIO_CHECKPOINTS, exist_ok=True)
+    caminho = caminho_checkpoint(chave)
+    temporario = caminho + ".tmp"
+    estado = dict(estado, atualizado_em=datetime.datetime.now().isoformat())
+    with open(temporario, 'w', encoding='utf-8') as f:
+        # default=str: valores numpy/Timestamp das linhas da amostra do relatório
+        json.dump(estado, f, ensure_ascii=False, default=str)
+    os.replace(temporario, caminho)
+
+def remover_checkpoint(chave):
+    """Remove o checkpoint de uma execução concluída"""
+    try:
+        os.remove(caminho_checkpoint(chave))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,270 @@
+# src/cubo_vendas.py
+"""
+Cubo de vendas em NumPy sobre (dia, loja, vendedor, produto, forma de pagamento)
+com as medidas total de vendas, quantidade e valor.
+
+Cada célula é uma combinação presente nos dados (cubo esparso): as dimensões são
+arrays de códigos para os rótulos de cada dimensão e as medidas são arrays
+paralelos. Fatiar filtra rótulos (poucos) e aplica a máscara às células; somar
+agrupa os códigos com np.unique + np.bincount. O custo depende do número de
+grupos, não do número de vendas.
+
+Vendas sem data ficam em células de dia nulo: entram nos totais e nos demais
+agrupamentos e saem só das fatias com intervalo de datas.
+
+O cubo não é alterado depois de construído (fatiar e juntar devolvem outro
+cubo), então uma instância pode ser compartilhada entre sessões do dashboard.
+CuboVendasIncremental mantém o cubo do banco em dia acrescentando só as vendas
+novas.
+"""
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DIMENSOES = ('dia', 'nome_loja', 'nome_vendedor', 'nome_produto', 'forma_pagamento')
+MEDIDAS = ('total_vendas', 'quantidade', 'valor_total')
+
+# Chaves dos filtros do dashboard (ver db_utils.FILTROS_VENDAS) -> dimensão do cubo
+FILTROS_CUBO = {
+    'lojas': 'nome_loja',
+    'vendedores': 'nome_vendedor',
+    'produtos': 'nome_produto',
+    'formas_pagamento': 'forma_pagamento',
+}
+
+# Dimensões derivadas do dia
+DERIVADAS_DIA = {
+    'ano': lambda dias: dias.year,
+    'mes': lambda dias: dias.month,
+}
+
+def _dia(valor):
+    """date, datetime ou texto ISO -> datetime64[D] (None se vazio)"""
+    if valor is None or valor == '':
+        return None
+    return np.datetime64(pd.Timestamp(valor).date(), 'D')
+
+class CuboVendas:
+    """
+    Use `CuboVendas.de_vendas(df)` (uma linha por venda) ou
+    `CuboVendas.de_resumo(df)` (grupos de vendas_resumo_diario), depois
+    `fatiar(filtros)`, `totais()` e `somar(*dimensoes)`.
+    """
+
+    def __init__(self, codigos, rotulos, medidas):
+        self.codigos = codigos
+        self.rotulos = rotulos
+        self.medidas = medidas
+
+    @classmethod
+    def de_grupos(cls, df, quantidade='quantidade', valor='valor_total', total='total_vendas'):
+        """Cubo a partir de linhas já agrupadas: colunas DIMENSOES (dia datetime) + medidas"""
+        codigos, rotulos = {}, {}
+        for dimensao in DIMENSOES:
+            codigos[dimensao], valores = pd.factorize(df[dimensao], use_na_sentinel=False)
+            if dimensao == 'dia':
+                rotulos[dimensao] = np.asarray(valores, dtype='datetime64[D]')
+            else:
+                rotulos[dimensao] = np.asarray(valores, dtype=object)
+            codigos[dimensao] = codigos[dimensao].astype(np.int32)
+        medidas = {
+            'total_vendas': pd.to_numeric(df[total], errors='coerce').fillna(0).to_numpy(np.int64),
+            'quantidade': pd.to_numeric(df[quantidade], errors='coerce').fillna(0).to_numpy(np.int64),
+            'valor_total': pd.to_numeric(df[valor], errors='coerce').fillna(0.0).to_numpy(np.float64),
+        }
+        return cls(codigos, rotulos, medidas)
+
+    @classmethod
+    def de_resumo(cls, resumo):
+        """Cubo a partir de buscar_resumo_vendas() (uma linha por grupo diário)"""
+        if resumo.empty:
+            return cls.de_vendas(None)
+        resumo = resumo.assign(
+            dia=pd.to_datetime(resumo['dia'], format='%Y-%m-%d', errors='coerce'),
+            # no resumo, forma de pagamento ausente é '' (parte da chave)
+            forma_pagamento=resumo['forma_pagamento'].where(resumo['forma_pagamento'] != ''),
+        )
+        return cls.de_grupos(resumo, quantidade='quantidade_total')
+
+    @classmethod
+    def de_vendas(cls, df, coluna_data='data_venda_dt'):
+        """
+        Cubo a partir das vendas (uma linha por venda): agrupa pelas dimensões
+        com valor = valor_produto * quantidade. `coluna_data`: datetime ou texto ISO.
+        """
+        if df is None or df.empty:
+            vazio = pd.DataFrame({coluna: pd.Series(dtype=object) for coluna in DIMENSOES + MEDIDAS})
+            return cls.de_grupos(vazio.assign(dia=pd.Series(dtype='datetime64[ns]')))
+
+        quantidade = pd.to_numeric(df['quantidade'], errors='coerce').fillna(0)
+        vendas = pd.DataFrame({
+            'dia': pd.to_datetime(df[coluna_data], errors='coerce').dt.normalize(),
+            **{dimensao: df[dimensao] for dimensao in DIMENSOES[1:]},
+            'total_vendas': 1,
+            'quantidade': quantidade,
+            'valor_total': pd.to_numeric(df['valor_produto'], errors='coerce').fillna(0.0) * quantidade,
+        })
+        grupos = vendas.groupby(list(DIMENSOES), observed=True, dropna=False, sort=False).sum().reset_index()
+        return cls.de_grupos(grupos)
+
+    def __len__(self):
+        return len(self.medidas['total_vendas'])
+
+    @property
+    def vazio(self):
+        return len(self) == 0
+
+    def fatiar(self, filtros=None):
+        """
+        Sub-cubo com as células que atendem aos filtros, nas chaves do dashboard:
+        listas de nomes em 'lojas', 'vendedores', 'produtos', 'formas_pagamento'
+        (None = sem filtro) e 'data_inicio'/'data_fim' (intervalo fechado; com
+        ele, as células sem dia ficam de fora).
+        """
+        filtros = filtros or {}
+        mascara = np.ones(len(self), dtype=bool)
+        for chave, dimensao in FILTROS_CUBO.items():
+            valores = filtros.get(chave)
+            if valores is not None:
+                permitidos = pd.Index(self.rotulos[dimensao]).isin(list(valores))
+                mascara &= permitidos[self.codigos[dimensao]]
+
+        inicio, fim = _dia(filtros.get('data_inicio')), _dia(filtros.get('data_fim'))
+        if inicio is not None or fim is not None:
+            dias = self.rotulos['dia']
+            permitidos = ~np.isnat(dias)
+            if inicio is not None:
+                permitidos &= dias >= inicio
+            if fim is not None:
+                permitidos &= dias <= fim
+            mascara &= permitidos[self.codigos['dia']]
+
+        if mascara.all():
+            return self
+        return CuboVendas({dimensao: codigos[mascara] for dimensao, codigos in self.codigos.items()},
+                          self.rotulos,
+                          {medida: valores[mascara] for medida, valores in self.medidas.items()})
+
+    def juntar(self, outro):
+        """
+        Cubo com as células dos dois cubos (rótulos unidos, códigos de `outro`
+        remapeados). Combinações repetidas viram células a mais, somadas juntas.
+        """
+        codigos, rotulos = {}, {}
+        for dimensao in DIMENSOES:
+            posicoes = pd.Index(self.rotulos[dimensao]).get_indexer(outro.rotulos[dimensao])
+            novos = posicoes < 0
+            posicoes[novos] = len(self.rotulos[dimensao]) + np.arange(novos.sum())
+            rotulos[dimensao] = np.concatenate([self.rotulos[dimensao], outro.rotulos[dimensao][novos]])
+            codigos[dimensao] = np.concatenate([self.codigos[dimensao],
+                                                posicoes[outro.codigos[dimensao]].astype(np.int32)])
+        medidas = {medida: np.concatenate([valores, outro.medidas[medida]])
+                   for medida, valores in self.medidas.items()}
+        return CuboVendas(codigos, rotulos, medidas)
+
+    def totais(self):
+        """Soma das medidas em todas as células: {'total_vendas', 'quantidade', 'valor_total'}"""
+        return {medida: valores.sum().item() for medida, valores in self.medidas.items()}
+
+    def _dimensao(self, dimensao):
+        """(códigos por célula, rótulos) de uma dimensão ou de 'ano'/'mes' derivados do dia"""
+        if dimensao in DERIVADAS_DIA:
+            por_dia = DERIVADAS_DIA[dimensao](pd.DatetimeIndex(self.rotulos['dia']))
+            codigos, rotulos = pd.factorize(por_dia, use_na_sentinel=False)
+            return codigos[self.codigos['dia']], np.asarray(rotulos)
+        return self.codigos[dimensao], self.rotulos[dimensao]
+
+    def somar(self, *dimensoes):
+        """
+        DataFrame com uma linha por combinação presente de `dimensoes` (de
+        DIMENSOES ou 'ano'/'mes') e as medidas somadas. Como no groupby do
+        pandas, grupos com rótulo nulo ficam de fora.
+        """
+        if not dimensoes:
+            return pd.DataFrame([self.totais()], columns=list(MEDIDAS))
+        if self.vazio:
+            return pd.DataFrame(columns=list(dimensoes) + list(MEDIDAS))
+
+        pares = [self._dimensao(dimensao) for dimensao in dimensoes]
+        chave = np.ravel_multi_index([codigos for codigos, _ in pares],
+                                     [max(len(rotulos), 1) for _, rotulos in pares])
+        grupos, celulas_grupo = np.unique(chave, return_inverse=True)
+        indices = np.unravel_index(grupos, [max(len(rotulos), 1) for _, rotulos in pares])
+
+        resultado = pd.DataFrame({dimensao: rotulos[indice]
+                                  for dimensao, (_, rotulos), indice in zip(dimensoes, pares, indices)})
+        for medida, valores in self.medidas.items():
+            soma = np.bincount(celulas_grupo, weights=valores, minlength=len(grupos))
+            resultado[medida] = soma if valores.dtype.kind == 'f' else np.rint(soma).astype(np.int64)
+
+        resultado = resultado.dropna(subset=list(dimensoes)).reset_index(drop=True)
+        for dimensao in dimensoes:
+            if dimensao in DERIVADAS_DIA:
+                resultado[dimensao] = resultado[dimensao].astype(int)
+        return resultado
+
+def cubo_do_banco(desde_id=None):
+    """
+    (cubo, maior id_venda coberto) das vendas do banco - todas, ou só as com
+    id_venda acima de `desde_id`. SQLite: resumo diário + vendas ainda não
+    resumidas e vendas sem data, agrupadas no banco; Supabase (sem resumo):
+    agrega as vendas.
+    Filtros e restrições de perfil são aplicados depois, com fatiar.
+    """
+    from src.db_utils import buscar_vendas_agrupadas, buscar_vendas_filtradas
+
+    grupos, maior_id = buscar_vendas_agrupadas(desde_id)
+    if maior_id is not None:
+        cubo = CuboVendas.de_resumo(grupos)
+    else:
+        vendas = buscar_vendas_filtradas(desde_id=desde_id)
+        cubo = CuboVendas.de_vendas(vendas, coluna_data='data_venda_iso')
+        maior_id = int(vendas['id_venda'].max()) if not vendas.empty else (desde_id or 0)
+    return cubo, maior_id
+
+class CuboVendasIncremental:
+    """
+    Cubo de todas as vendas do banco mantido entre versões dos dados: a primeira
+    carga lê o resumo diário; a cada nova versão, só as vendas com id_venda acima
+    da marca d'água são agrupadas e juntadas ao cubo (custo das vendas novas).
+    Se o maior id_venda diminuir (exclusões, que o resumo diário não enxerga), o
+    cubo é reconstruído agrupando todas as vendas. Correções de vendas já
+    carregadas só entram numa reconstrução.
+
+    Seguro para uso concorrente (sessões do dashboard compartilham a instância).
+    """
+
+    def __init__(self):
+        self.cubo = None
+        self.ultimo_id_venda = None
+        self.versao = None
+        self._lock = threading.Lock()
+
+    def _reconstruir(self, sem_resumo=False):
+        self.cubo, self.ultimo_id_venda = cubo_do_banco(desde_id=0 if sem_resumo else None)
+        logger.info(f"🧊 Cubo de vendas construído: {len(self.cubo)} células (até id_venda {self.ultimo_id_venda})")
+
+    def atualizar(self, versao=None):
+        """
+        Cubo em dia com a `versao` dos dados (versao_dados_vendas()); sem versão
+        conhecida, reconstrói. Com a mesma versão da última chamada, não consulta o banco.
+        """
+        with self._lock:
+            if self.cubo is not None and versao is not None and versao == self.versao:
+                return self.cubo
+            if self.cubo is None or versao is None:
+                self._reconstruir()
+            else:
+                novas, maior_id = cubo_do_banco(desde_id=self.ultimo_id_venda)
+                if maior_id < self.ultimo_id_venda:
+                    self._reconstruir(sem_resumo=True)
+                elif not novas.vazio:
+                    self.cubo = self.cubo.juntar(novas)
+                    self.ultimo_id_venda = maior_id
+                    logger.info(f"🧊 Cubo de vendas atualizado: +{len(novas)} células (até id_venda {maior_id})")
+            self.versao = versao
+            return self.cubo
@@ -11,12 +11,20 @@ try:
 except ImportError:
     HAS_SUPABASE = False
 import os
+import pathlib
 import pandas as pd
 import logging
 import json
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 import csv
+import atexit
+import re
 import streamlit as st
+from src.indice_cpf import IndiceCPF
 
 # Configurar logger
 logger = logging.getLogger('app')
@@ -30,30 +38,225 @@ DUPLICATE_LOG = os.path.join("data", "reports", "duplicates.log")
 DUPLICATE_CSV = os.path.join("data", "reports", "duplicates.csv")
 DB_PATH = os.path.join("data", "db", "vendas.db")
 
-def get_db_connection():
+# Conexões
+HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_HEALTH_CHECK_INTERVAL", 60))
+SQLITE_POOL_SIZE = int(os.environ.get("DB_SQLITE_POOL_SIZE", 4))
+
+# Log de duplicatas (gravado em bloco)
+DUPLICATE_BUFFER_SIZE = int(os.environ.get("DUPLICATE_BUFFER_SIZE", 1000))
+DUPLICATE_FLUSH_INTERVAL = float(os.environ.get("DUPLICATE_FLUSH_INTERVAL", 5))
+
+class ConnectionManager:
     """
-    Retorna conexão com o banco - prioriza Supabase PostgreSQL, fallback para SQLite
+    Gerenciador de conexões compartilhado pelo processo.
+    - Escolhe o backend (Supabase ou SQLite) uma vez e só reavalia a cada
+      `intervalo_verificacao` segundos, em vez de testar o Supabase a cada chamada
+    - Reaproveita um único cliente Supabase
+    - Mantém um pequeno pool de conexões SQLite por arquivo de banco (DB_PATH)
+    - Mantém uma conexão só de leitura por banco para sondar a versão dos dados
     """
-    # Tentar Supabase primeiro
-    if HAS_SUPABASE:
+
+    def __init__(self, intervalo_verificacao=HEALTH_CHECK_INTERVAL, tamanho_pool=SQLITE_POOL_SIZE):
+        self.intervalo_verificacao = intervalo_verificacao
+        self.tamanho_pool = tamanho_pool
+        self._lock = threading.Lock()
+        self._lock_verificacao = threading.Lock()
+        self._backend = None
+        self._ultima_verificacao = 0.0
+        self._supabase = None
+        self._colunas_vendas_supabase = None
+        self._pools = {}
+        self._sondas = {}
+        self._geracao_sonda = 0
+
+    def _backend_valido(self):
+        if self._backend is not None and time.monotonic() - self._ultima_verificacao < self.intervalo_verificacao:
+            return self._backend
+        return None
+
+    def backend(self):
+        """
+        Retorna o backend em uso, reavaliando a saúde do Supabase apenas quando o intervalo expira.
+        A verificação roda fora de self._lock (uma por vez, em _lock_verificacao), para que
+        uma sonda lenta não bloqueie o pool SQLite; enquanto ela roda, as demais threads
+        seguem com o backend em cache, e só esperam por ela se ainda não houver nenhum.
+        """
+        with self._lock:
+            backend = self._backend_valido()
+            if backend is not None:
+                return backend
+            em_cache = self._backend
+
+        if not self._lock_verificacao.acquire(blocking=em_cache is None):
+            return em_cache
+        try:
+            with self._lock:
+                # Outra thread pode ter concluído a verificação enquanto esperávamos
+                backend = self._backend_valido()
+            if backend is None:
+                backend = self._verificar_backend()
+                with self._lock:
+                    self._backend = backend
+                    self._ultima_verificacao = time.monotonic()
+            return backend
+        finally:
+            self._lock_verificacao.release()
+
+    def invalidar(self):
+        """Força nova verificação do backend na próxima conexão"""
+        with self._lock:
+            self._backend = None
+
+    def colunas_vendas_supabase(self, cliente):
+        """
+        Colunas de COLUNAS_INSERCAO_VENDAS existentes em vendas no Supabase, verificadas
+        uma vez por processo. Bancos criados antes das colunas de data ISO (sem nova
+        execução de creat_tables_supabase.py) não as têm, e elas são omitidas do insert.
+        """
+        if self._colunas_vendas_supabase is None:
+            try:
+                cliente.table('vendas').select(', '.join(COLUNAS_DATA_ISO)).limit(1).execute()
+                self._colunas_vendas_supabase = COLUNAS_INSERCAO_VENDAS
+            except Exception as e:
+                if not any(col in str(e) for col in COLUNAS_DATA_ISO):
+                    # Falha sem relação com as colunas: tenta de novo no próximo insert
+                    return COLUNAS_INSERCAO_VENDAS
+                logger.warning("⚠️ Tabela vendas do Supabase sem as colunas de data ISO; "
+                               "execute creat_tables_supabase.py para os filtros por período")
+                self._colunas_vendas_supabase = [col for col in COLUNAS_INSERCAO_VENDAS if col not in COLUNAS_DATA_ISO]
+        return self._colunas_vendas_supabase
+
+    def _verificar_backend(self):
+        if HAS_SUPABASE:
+            try:
+                if self._supabase is None:
+                    self._supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+                # Test connection by trying to get a simple response
+                self._supabase.table('usuarios').select('*').limit(1).execute()
+                if self._backend != 'supabase':
+                    logger.info("✅ Conectado ao Supabase PostgreSQL")
+                return 'supabase'
+            except Exception as e:
+                logger.warning(f"⚠️ Supabase não disponível: {e}")
+                self._supabase = None
+
+        if self._backend != 'sqlite':
+            logger.info("✅ Conectado ao SQLite local")
+        return 'sqlite'
+
+    def _pool(self, caminho):
+        with self._lock:
+            if caminho not in self._pools:
+                self._pools[caminho] = queue.LifoQueue(maxsize=self.tamanho_pool)
+            return self._pools[caminho]
+
+    def nova_conexao_sqlite(self, caminho=None):
+        """Abre uma conexão SQLite nova (fora do pool)"""
+        caminho = caminho or DB_PATH
+        # Garantir que o diretório existe
+        db_dir = os.path.dirname(caminho)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        return sqlite3.connect(caminho, check_same_thread=False)
+
+    def _obter_sqlite(self, caminho):
+        try:
+            return self._pool(caminho).get_nowait()
+        except queue.Empty:
+            return self.nova_conexao_sqlite(caminho)
+
+    def _devolver_sqlite(self, conn, caminho):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool(caminho).put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+    def versao_sqlite(self, caminho=None):
+        """
+        (geração da sonda, PRAGMA data_version) do banco SQLite. A sonda é uma
+        conexão dedicada que nunca grava: data_version muda nela a cada commit de
+        outra conexão, inclusive de outros processos, e não muda em checkpoints do
+        WAL. Como data_version só é comparável na mesma conexão, a geração muda
+        quando a sonda é reaberta.
+        """
+        caminho = os.path.abspath(caminho or DB_PATH)
+        with self._lock:
+            if caminho not in self._sondas:
+                self._geracao_sonda += 1
+                sonda = sqlite3.connect(pathlib.Path(caminho).as_uri() + '?mode=ro', uri=True,
+                                        check_same_thread=False)
+                self._sondas[caminho] = (self._geracao_sonda, sonda)
+            geracao, sonda = self._sondas[caminho]
+            return geracao, sonda.execute("PRAGMA data_version").fetchone()[0]
+
+    @contextmanager
+    def conexao(self):
+        """
+        Context manager que entrega (conn, db_type).
+        No SQLite, confirma a transação ao sair sem erros, desfaz em caso de exceção
+        e devolve a conexão ao pool.
+        """
+        if self.backend() == 'supabase' and self._supabase is not None:
+            yield self._supabase, 'supabase'
+            return
+
+        caminho = DB_PATH
         try:
-            supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-            # Test connection by trying to get a simple response
-            test_response = supabase.table('usuarios').select('*').limit(1).execute()
-            logger.info("✅ Conectado ao Supabase PostgreSQL")
-            return supabase, 'supabase'
+            conn = self._obter_sqlite(caminho)
         except Exception as e:
-            logger.warning(f"⚠️ Supabase não disponível: {e}")
+            logger.error(f"❌ Erro ao conectar com SQLite: {e}")
+            raise
+
+        try:
+            yield conn, 'sqlite'
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._devolver_sqlite(conn, caminho)
+
+    def fechar(self):
+        """Fecha todas as conexões SQLite mantidas no pool (e as sondas de versão)"""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+            sondas, self._sondas = self._sondas, {}
+        for _, sonda in sondas.values():
+            sonda.close()
+        for pool in pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+gerenciador_conexoes = ConnectionManager()
+
+def db_connection():
+    """
+    Context manager de conexão usado por todas as funções deste módulo:
+
+        with db_connection() as (conn, db_type):
+            ...
+    """
+    return gerenciador_conexoes.conexao()
+
+def get_db_connection():
+    """
+    Retorna conexão com o banco - prioriza Supabase PostgreSQL, fallback para SQLite.
+    O backend vem do gerenciador de conexões (sem teste a cada chamada).
+    Conexões SQLite retornadas aqui são exclusivas do chamador, que deve fechá-las.
+    """
+    if gerenciador_conexoes.backend() == 'supabase' and gerenciador_conexoes._supabase is not None:
+        return gerenciador_conexoes._supabase, 'supabase'
 
     # Fallback para SQLite
     try:
-        # Garantir que o diretório existe
-        db_dir = os.path.dirname(DB_PATH)
-        os.makedirs(db_dir, exist_ok=True)
-
-        conn = sqlite3.connect(DB_PATH)
-        logger.info("✅ Conectado ao SQLite local")
-        return conn, 'sqlite'
+        return gerenciador_conexoes.nova_conexao_sqlite(), 'sqlite'
     except Exception as e:
         logger.error(f"❌ Erro ao conectar com SQLite: {e}")
         raise
@@ -80,398 +283,1264 @@ def criar_tabela(schema_path=None):
     """
     Ensure database and tables exist - compatível com PostgreSQL e SQLite
     """
-    conn, db_type = get_db_connection()
-
     try:
-        # Verificar se tabelas já existem
-        if db_type == 'supabase':
-            # For Supabase, assume tables exist if we can connect
-            logger.info('✅ Supabase conectado - assumindo tabelas existem')
-            return True
-        elif db_type == 'postgresql':
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT table_name
-                FROM information_schema.tables
-                WHERE table_schema = 'public'
-            """)
-            tabelas_existentes = [row[0] for row in cursor.fetchall()]
-        else:  # sqlite
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-            tabelas_existentes = [row[0] for row in cursor.fetchall()]
-
-        # Se já existem tabelas, não recriar
-        if tabelas_existentes:
-            logger.info(f'✅ Banco já contém {len(tabelas_existentes)} tabelas')
-            if db_type != 'supabase':
-                conn.close()
-            return True
+        with db_connection() as (conn, db_type):
+            # Verificar se tabelas já existem
+            if db_type == 'supabase':
+                # For Supabase, assume tables exist if we can connect
+                logger.info('✅ Supabase conectado - assumindo tabelas existem')
+                return True
+            elif db_type == 'postgresql':
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT table_name
+                    FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                """)
+                tabelas_existentes = [row[0] for row in cursor.fetchall()]
+            else:  # sqlite
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+                tabelas_existentes = [row[0] for row in cursor.fetchall()]
+
+            # Se já existem tabelas, não recriar (apenas completar colunas novas no SQLite)
+            if tabelas_existentes:
+                if db_type == 'sqlite' and 'vendas' in tabelas_existentes:
+                    _garantir_datas_iso(conn)
+                    conn.commit()
+                    try:
+                        _atualizar_resumo_vendas(conn)
+                        conn.commit()
+                    except sqlite3.Error as e:
+                        conn.rollback()
+                        logger.warning(f'⚠️ Resumo diário de vendas não atualizado: {e}')
+                logger.info(f'✅ Banco já contém {len(tabelas_existentes)} tabelas')
+                return True
             
-        # Criar tabelas (schema básico para ambos)
-        if db_type == 'postgresql':
-            # Schema PostgreSQL
-            schema = """
-            CREATE TABLE produtos (
-                codigo_produto TEXT PRIMARY KEY,
-                nome_produto TEXT NOT NULL,
-                valor_produto REAL NOT NULL CHECK(valor_produto >= 0)
-            );
-
-            CREATE TABLE lojas (
-                codigo_loja TEXT PRIMARY KEY,
-                nome_loja TEXT NOT NULL
-            );
-
-            CREATE TABLE vendedores (
-                codigo_vendedor TEXT PRIMARY KEY,
-                nome_vendedor TEXT NOT NULL
-            );
-
-            CREATE TABLE vendas (
-                id_venda SERIAL PRIMARY KEY,
-                id_cliente INTEGER NOT NULL,
-                nome_cliente TEXT NOT NULL,
-                data_nascimento TEXT,
-                rg TEXT,
-                cpf TEXT NOT NULL,
-                endereco TEXT,
-                numero TEXT,
-                complemento TEXT,
-                bairro TEXT,
-                cidade TEXT,
-                estado TEXT,
-                cep TEXT,
-                telefone TEXT,
-                codigo_produto TEXT NOT NULL,
-                quantidade INTEGER NOT NULL CHECK(quantidade > 0),
-                data_venda TEXT NOT NULL,
-                data_compra TEXT NOT NULL,
-                forma_pagamento TEXT,
-                codigo_loja TEXT NOT NULL,
-                nome_vendedor TEXT,
-                codigo_vendedor TEXT NOT NULL,
-                FOREIGN KEY(codigo_produto) REFERENCES produtos(codigo_produto),
-                FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
-                FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
-            );
-
-            CREATE TABLE loja_vendedor (
-                id SERIAL PRIMARY KEY,
-                codigo_loja TEXT NOT NULL,
-                codigo_vendedor TEXT NOT NULL,
-                UNIQUE(codigo_loja, codigo_vendedor),
-                FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
-                FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
-            );
-
-            CREATE TABLE usuarios (
-                login TEXT PRIMARY KEY,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL,
-                nome TEXT NOT NULL,
-                loja TEXT NOT NULL,
-                codigo_vendedor TEXT,
-                permissions TEXT NOT NULL,
-                ativo BOOLEAN DEFAULT true
-            );
-            """
-        else:
-            # Schema SQLite (seu original)
-            schema = """
-            CREATE TABLE IF NOT EXISTS produtos (
-                codigo_produto TEXT PRIMARY KEY,
-                nome_produto TEXT NOT NULL,
-                valor_produto REAL NOT NULL CHECK(valor_produto >= 0)
-            );
+            # Criar tabelas (schema básico para ambos)
+            if db_type == 'postgresql':
+                # Schema PostgreSQL
+                schema = """
+                CREATE TABLE produtos (
+                    codigo_produto TEXT PRIMARY KEY,
+                    nome_produto TEXT NOT NULL,
+                    valor_produto REAL NOT NULL CHECK(valor_produto >= 0)
+                );
+
+                CREATE TABLE lojas (
+                    codigo_loja TEXT PRIMARY KEY,
+                    nome_loja TEXT NOT NULL
+                );
+
+                CREATE TABLE vendedores (
+                    codigo_vendedor TEXT PRIMARY KEY,
+                    nome_vendedor TEXT NOT NULL
+                );
+
+                CREATE TABLE vendas (
+                    id_venda SERIAL PRIMARY KEY,
+                    id_cliente INTEGER NOT NULL,
+                    nome_cliente TEXT NOT NULL,
+                    data_nascimento TEXT,
+                    rg TEXT,
+                    cpf TEXT NOT NULL,
+                    endereco TEXT,
+                    numero TEXT,
+                    complemento TEXT,
+                    bairro TEXT,
+                    cidade TEXT,
+                    estado TEXT,
+                    cep TEXT,
+                    telefone TEXT,
+                    codigo_produto TEXT NOT NULL,
+                    quantidade INTEGER NOT NULL CHECK(quantidade > 0),
+                    data_venda TEXT NOT NULL,
+                    data_compra TEXT NOT NULL,
+                    data_venda_iso TEXT,
+                    data_compra_iso TEXT,
+                    forma_pagamento TEXT,
+                    codigo_loja TEXT NOT NULL,
+                    nome_vendedor TEXT,
+                    codigo_vendedor TEXT NOT NULL,
+                    FOREIGN KEY(codigo_produto) REFERENCES produtos(codigo_produto),
+                    FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
+                    FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
+                );
+
+                CREATE TABLE loja_vendedor (
+                    id SERIAL PRIMARY KEY,
+                    codigo_loja TEXT NOT NULL,
+                    codigo_vendedor TEXT NOT NULL,
+                    UNIQUE(codigo_loja, codigo_vendedor),
+                    FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
+                    FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
+                );
+
+                CREATE TABLE usuarios (
+                    login TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    nome TEXT NOT NULL,
+                    loja TEXT NOT NULL,
+                    codigo_vendedor TEXT,
+                    permissions TEXT NOT NULL,
+                    ativo BOOLEAN DEFAULT true
+                );
+
+                CREATE TABLE importacoes (
+                    id SERIAL PRIMARY KEY,
+                    nome_arquivo TEXT NOT NULL,
+                    total_registros INTEGER NOT NULL,
+                    registros_importados INTEGER NOT NULL,
+                    registros_com_erro INTEGER DEFAULT 0,
+                    usuario_importacao TEXT,
+                    data_importacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT DEFAULT 'CONCLUIDA',
+                    hash_arquivo TEXT,
+                    tamanho_bytes BIGINT
+                );
+
+                CREATE INDEX idx_importacoes_hash ON importacoes(hash_arquivo);
+                CREATE INDEX idx_vendas_data_venda_iso ON vendas(data_venda_iso);
+                CREATE INDEX idx_vendas_data_compra_iso ON vendas(data_compra_iso);
+                """
+            else:
+                # Schema SQLite (seu original)
+                schema = """
+                CREATE TABLE IF NOT EXISTS produtos (
+                    codigo_produto TEXT PRIMARY KEY,
+                    nome_produto TEXT NOT NULL,
+                    valor_produto REAL NOT NULL CHECK(valor_produto >= 0)
+                );
             
-            CREATE TABLE IF NOT EXISTS lojas (
-                codigo_loja TEXT PRIMARY KEY,
-                nome_loja TEXT NOT NULL
-            );
+                CREATE TABLE IF NOT EXISTS lojas (
+                    codigo_loja TEXT PRIMARY KEY,
+                    nome_loja TEXT NOT NULL
+                );
             
-            CREATE TABLE IF NOT EXISTS vendedores (
-                codigo_vendedor TEXT PRIMARY KEY,
-                nome_vendedor TEXT NOT NULL
-            );
+                CREATE TABLE IF NOT EXISTS vendedores (
+                    codigo_vendedor TEXT PRIMARY KEY,
+                    nome_vendedor TEXT NOT NULL
+                );
             
-            CREATE TABLE IF NOT EXISTS vendas (
-                id_venda INTEGER PRIMARY KEY AUTOINCREMENT,
-                id_cliente INTEGER NOT NULL,
-                nome_cliente TEXT NOT NULL,
-                data_nascimento TEXT,
-                rg TEXT,
-                cpf TEXT NOT NULL,
-                endereco TEXT,
-                numero TEXT,
-                complemento TEXT,
-                bairro TEXT,
-                cidade TEXT,
-                estado TEXT,
-                cep TEXT,
-                telefone TEXT,
-                codigo_produto TEXT NOT NULL,
-                quantidade INTEGER NOT NULL CHECK(quantidade > 0),
-                data_venda TEXT NOT NULL,
-                data_compra TEXT NOT NULL,
-                forma_pagamento TEXT,
-                codigo_loja TEXT NOT NULL,
-                nome_vendedor TEXT,
-                codigo_vendedor TEXT NOT NULL,
-                FOREIGN KEY(codigo_produto) REFERENCES produtos(codigo_produto),
-                FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
-                FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
-            );
+                CREATE TABLE IF NOT EXISTS vendas (
+                    id_venda INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id_cliente INTEGER NOT NULL,
+                    nome_cliente TEXT NOT NULL,
+                    data_nascimento TEXT,
+                    rg TEXT,
+                    cpf TEXT NOT NULL,
+                    endereco TEXT,
+                    numero TEXT,
+                    complemento TEXT,
+                    bairro TEXT,
+                    cidade TEXT,
+                    estado TEXT,
+                    cep TEXT,
+                    telefone TEXT,
+                    codigo_produto TEXT NOT NULL,
+                    quantidade INTEGER NOT NULL CHECK(quantidade > 0),
+                    data_venda TEXT NOT NULL,
+                    data_compra TEXT NOT NULL,
+                    data_venda_iso TEXT,
+                    data_compra_iso TEXT,
+                    forma_pagamento TEXT,
+                    codigo_loja TEXT NOT NULL,
+                    nome_vendedor TEXT,
+                    codigo_vendedor TEXT NOT NULL,
+                    FOREIGN KEY(codigo_produto) REFERENCES produtos(codigo_produto),
+                    FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
+                    FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
+                );
             
-            CREATE TABLE IF NOT EXISTS loja_vendedor (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                codigo_loja TEXT NOT NULL,
-                codigo_vendedor TEXT NOT NULL,
-                UNIQUE(codigo_loja, codigo_vendedor),
-                FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
-                FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
-            );
+                CREATE TABLE IF NOT EXISTS loja_vendedor (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    codigo_loja TEXT NOT NULL,
+                    codigo_vendedor TEXT NOT NULL,
+                    UNIQUE(codigo_loja, codigo_vendedor),
+                    FOREIGN KEY(codigo_loja) REFERENCES lojas(codigo_loja),
+                    FOREIGN KEY(codigo_vendedor) REFERENCES vendedores(codigo_vendedor)
+                );
             
-            CREATE TABLE IF NOT EXISTS usuarios (
-                login TEXT PRIMARY KEY,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL,
-                nome TEXT NOT NULL,
-                loja TEXT NOT NULL,
-                codigo_vendedor TEXT,
-                permissions TEXT NOT NULL,
-                ativo INTEGER DEFAULT 1
-            );
-            """
+                CREATE TABLE IF NOT EXISTS usuarios (
+                    login TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    nome TEXT NOT NULL,
+                    loja TEXT NOT NULL,
+                    codigo_vendedor TEXT,
+                    permissions TEXT NOT NULL,
+                    ativo INTEGER DEFAULT 1
+                );
+                """
         
-        # Executar schema
-        if db_type == 'postgresql':
-            conn.cursor().execute(schema)
-        else:
-            conn.executescript(schema)
+            # Executar schema
+            if db_type == 'postgresql':
+                conn.cursor().execute(schema)
+            else:
+                conn.executescript(schema)
+                _garantir_tabela_importacoes(conn)
+                _garantir_datas_iso(conn)
+                _garantir_resumo_vendas(conn)
         
-        conn.commit()
-        conn.close()
-        logger.info('✅ Tabelas criadas com sucesso')
-        return True
+            conn.commit()
+            logger.info('✅ Tabelas criadas com sucesso')
+            return True
         
     except Exception as e:
         logger.error(f'❌ Erro ao criar tabelas: {e}')
-        conn.close()
         return False
 
+# Colunas de data ordenáveis (aaaa-mm-dd) derivadas de data_venda/data_compra
+COLUNAS_DATA_ISO = ('data_venda_iso', 'data_compra_iso')
+
+# Colunas gravadas em vendas pelas rotinas de inserção (ordem do INSERT)
+COLUNAS_INSERCAO_VENDAS = [
+    'id_cliente', 'nome_cliente', 'data_nascimento', 'rg', 'cpf', 'endereco', 'numero', 'complemento',
+    'bairro', 'cidade', 'estado', 'cep', 'telefone', 'codigo_produto', 'quantidade', 'data_venda',
+    'data_compra', 'forma_pagamento', 'codigo_loja', 'nome_vendedor', 'codigo_vendedor',
+    *COLUNAS_DATA_ISO
+]
+
+SQL_INSERIR_VENDA = f"""
+    INSERT INTO vendas ({', '.join(COLUNAS_INSERCAO_VENDAS)})
+    VALUES ({', '.join('?' for _ in COLUNAS_INSERCAO_VENDAS)})
+"""
+
+def data_iso(valor):
+    """
+    Data de venda/compra como texto ISO (aaaa-mm-dd), ordenável e usada nos índices
+    de intervalo; aceita d/m/aaaa ou dd/mm/aaaa (formato gravado) e aaaa-mm-dd
+    (seguido ou não de horário). None se não reconhecer ou se a data não existir.
+    """
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    data = (re.fullmatch(r'([0-9]{1,2})/([0-9]{1,2})/([0-9]{4})', texto)
+            or re.match(r'([0-9]{4})-([0-9]{2})-([0-9]{2})(?![0-9])', texto))
+    if not data:
+        return None
+    partes = [int(parte) for parte in data.groups()]
+    ano, mes, dia = partes if '-' in data.group(0) else partes[::-1]
+    try:
+        return datetime(ano, mes, dia).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+def _sql_data_iso(coluna):
+    """Expressão SQL (SQLite) equivalente a data_iso() para uma coluna de data"""
+    texto = f"trim({coluna})"
+    # (padrão GLOB, posição do dia, do mês e do ano) para dia/mês com um ou dois dígitos
+    formatos = [
+        ('[0-9][0-9]/[0-9][0-9]/', 1, 4, 7),
+        ('[0-9]/[0-9][0-9]/', 1, 3, 6),
+        ('[0-9][0-9]/[0-9]/', 1, 4, 6),
+        ('[0-9]/[0-9]/', 1, 3, 5),
+    ]
+    casos = []
+    for padrao, dia, mes, ano in formatos:
+        tam_dia, tam_mes = mes - dia - 1, ano - mes - 1
+        casos.append(
+            f"WHEN {texto} GLOB '{padrao}[0-9][0-9][0-9][0-9]' THEN substr({texto}, {ano}, 4) || '-' || "
+            f"substr('0' || substr({texto}, {mes}, {tam_mes}), -2) || '-' || "
+            f"substr('0' || substr({texto}, {dia}, {tam_dia}), -2)"
+        )
+    iso = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+    casos.append(f"WHEN {texto} GLOB '{iso}' OR {texto} GLOB '{iso}[^0-9]*' THEN substr({texto}, 1, 10)")
+    # date(d, '+0 days') devolve NULL para mês/dia fora da faixa e normaliza dias
+    # inexistentes (31/02 vira 02/03): só datas que voltam iguais são aceitas
+    return f"(SELECT CASE WHEN date(d, '+0 days') = d THEN d END FROM (SELECT CASE {' '.join(casos)} END AS d))"
+
+def _garantir_datas_iso(conn):
+    """
+    Cria (em bancos antigos) as colunas data_venda_iso/data_compra_iso de vendas,
+    preenche as linhas que ainda não as têm e cria os índices de intervalo - SQLite
+    """
+    colunas = {row[1] for row in conn.execute("PRAGMA table_info(vendas)")}
+    for coluna in ('data_venda', 'data_compra'):
+        if f'{coluna}_iso' not in colunas:
+            conn.execute(f"ALTER TABLE vendas ADD COLUMN {coluna}_iso TEXT")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_vendas_{coluna}_iso ON vendas({coluna}_iso)")
+        cursor = conn.execute(f"""
+            UPDATE vendas SET {coluna}_iso = {_sql_data_iso(coluna)}
+            WHERE {coluna}_iso IS NULL AND {coluna} IS NOT NULL AND ({_sql_data_iso(coluna)}) IS NOT NULL
+        """)
+        if cursor.rowcount > 0:
+            logger.info(f'📅 {coluna}_iso preenchida em {cursor.rowcount} vendas')
+            if coluna == 'data_venda' and conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vendas_resumo_controle'").fetchone():
+                # vendas já agregadas sem dia entram no resumo só com a reconstrução
+                conn.execute("DELETE FROM vendas_resumo_diario")
+                conn.execute("UPDATE vendas_resumo_controle SET ultimo_id_venda = 0 WHERE id = 1")
+
+def _preparar_parametros_venda(dados):
+    """Normaliza um dicionário de venda, preenchendo valores padrão dos campos obrigatórios"""
+    # Parâmetros esperados pelo pipeline.py
+    expected_params = [
+        'id_cliente', 'nome_cliente', 'data_nascimento', 'rg', 'cpf',
+        'endereco', 'numero', 'complemento', 'bairro', 'cidade', 'estado',
+        'cep', 'telefone', 'codigo_produto', 'nome_produto', 'quantidade', 'valor_produto', 'data_venda',
+        'data_compra', 'forma_pagamento', 'codigo_loja', 'codigo_vendedor', 'nome_vendedor'
+    ]
+
+    # Preparar parâmetros com valores padrão
+    params = {}
+    for key in expected_params:
+        value = dados.get(key) if isinstance(dados, dict) else None
+        # Valores padrão para campos obrigatórios
+        if key == 'id_cliente' and (value is None or value == ''):
+            value = 0
+        elif key == 'quantidade' and (value is None or value == ''):
+            value = 1
+        elif key == 'valor_produto' and (value is None or value == ''):
+            value = 0.0
+        elif key == 'data_compra' and (value is None or value == '') and dados.get('data_venda'):
+            value = dados.get('data_venda')
+        elif key in ['nome_cliente', 'cpf', 'codigo_produto', 'nome_produto', 'codigo_loja', 'codigo_vendedor', 'nome_vendedor']:
+            value = value or ''
+
+        params[key] = value
+
+    params['data_venda_iso'] = data_iso(params['data_venda'])
+    params['data_compra_iso'] = data_iso(params['data_compra'])
+    return params
+
+def _valores_venda(params):
+    """Tupla de valores na ordem de COLUNAS_INSERCAO_VENDAS"""
+    return tuple(params[col] for col in COLUNAS_INSERCAO_VENDAS)
+
+def _registro_supabase(params, colunas=COLUNAS_INSERCAO_VENDAS):
+    """Dicionário de venda no formato esperado pela tabela vendas do Supabase"""
+    return {col: params[col] for col in colunas}
+
+def _cpfs_existentes(conn, cpfs):
+    """Retorna o subconjunto de CPFs que já existem em vendas (SQLite), em lotes de 500 parâmetros"""
+    cpfs = list(cpfs)
+    existentes = set()
+    for inicio in range(0, len(cpfs), 500):
+        parte = cpfs[inicio:inicio + 500]
+        marcadores = ', '.join('?' for _ in parte)
+        cursor = conn.execute(f"SELECT DISTINCT cpf FROM vendas WHERE cpf IN ({marcadores})", parte)
+        existentes.update(row[0] for row in cursor.fetchall())
+    return existentes
+
+def _registrar_duplicata_venda(params):
+    """Registra e sinaliza no log uma venda rejeitada por CPF duplicado"""
+    log_duplicata(params['cpf'], params.get('codigo_loja'), params.get('codigo_vendedor'))
+    logger.warning(f'CPF duplicado detectado: {params["cpf"]}')
+
 def inserir_linha(dados):
     """
     Insere uma linha no banco de vendas - COMPATÍVEL com pipeline.py
     Versão robusta com tratamento de erros para PostgreSQL e SQLite
     """
-    conn, db_type = get_db_connection()
+    try:
+        with db_connection() as (conn, db_type):
+            params = _preparar_parametros_venda(dados)
+
+            # Verificar duplicata de CPF (apenas para SQLite, PostgreSQL tem constraints)
+            if db_type == 'sqlite':
+                cpf_val = params.get('cpf')
+                if cpf_val:
+                    try:
+                        cursor = conn.cursor()
+                        if db_type == 'postgresql':
+                            cursor.execute("SELECT 1 FROM vendas WHERE cpf = %s LIMIT 1", (cpf_val,))
+                        else:
+                            cursor.execute("SELECT 1 FROM vendas WHERE cpf = ? LIMIT 1", (cpf_val,))
+                        if cursor.fetchone():
+                            _registrar_duplicata_venda(params)
+                            flush_duplicatas()
+                            return False
+                    except Exception as e:
+                        logger.debug(f'Erro ao verificar CPF duplicado: {e}')
+
+            # Inserir venda
+            if db_type == 'supabase':
+                # Supabase insert
+                colunas = gerenciador_conexoes.colunas_vendas_supabase(conn)
+                response = conn.table('vendas').insert(_registro_supabase(params, colunas)).execute()
+            else:
+                # SQLite insert
+                cursor = conn.cursor()
+                cursor.execute(SQL_INSERIR_VENDA, _valores_venda(params))
+
+                conn.commit()
+
+            logger.info(f'✅ Venda inserida - CPF: {params.get("cpf")}, Loja: {params.get("codigo_loja")}')
+            return True
+
+    except Exception as e:
+        logger.error(f'❌ Erro ao inserir venda: {e}')
+        return False
+
+def carregar_indice_cpf(usar_bloom=False):
+    """
+    Carrega o índice de CPFs existentes para uma execução do pipeline (apenas SQLite;
+    retorna None nos demais backends). Com `usar_bloom`, usa o filtro de Bloom
+    persistido ao lado do banco, em data/db/.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type != 'sqlite':
+                return None
+            caminho_bloom = os.path.join(os.path.dirname(DB_PATH), 'cpfs_vendas.bloom') if usar_bloom else None
+            return IndiceCPF.carregar(conn, caminho_bloom)
+    except Exception as e:
+        logger.error(f'❌ Erro ao carregar índice de CPFs: {e}')
+        return None
+
+# Triggers de vendas reproduzidos em SQL pela carga em bloco (nome -> mensagem do RAISE)
+TRIGGER_VENDEDOR_DA_LOJA = 'trg_vendas_vendedor_must_belong_to_loja'
+TRIGGER_CPF_POR_DATA = 'trg_vendas_cpf_unique_per_date'
+MOTIVOS_TRIGGERS_VENDAS = {
+    TRIGGER_VENDEDOR_DA_LOJA: 'Vendedor não está atribuído à loja informada',
+    TRIGGER_CPF_POR_DATA: 'CPF duplicado para a mesma data de venda',
+}
+
+SQL_STAGING_VENDAS = f"""
+    CREATE TEMP TABLE IF NOT EXISTS vendas_staging (
+        pos INTEGER PRIMARY KEY,
+        {', '.join(f"{col} {'INTEGER' if col in ('id_cliente', 'quantidade') else 'TEXT'}" for col in COLUNAS_INSERCAO_VENDAS)},
+        motivo TEXT
+    )
+"""
+
+# Verificações feitas pelo próprio SQLite na inserção, reproduzidas sobre a staging
+# Restrições de vendas na ordem em que o SQLite as verifica numa inserção, depois
+# dos triggers BEFORE INSERT: NOT NULL (na ordem das colunas) e então CHECK
+VERIFICACOES_STAGING = [
+    (f"{col} IS NULL", f'NOT NULL constraint failed: vendas.{col}')
+    for col in ('id_cliente', 'nome_cliente', 'cpf', 'codigo_produto', 'quantidade', 'data_venda', 'data_compra',
+                'codigo_loja', 'codigo_vendedor')
+] + [
+    ("quantidade <= 0", 'CHECK constraint failed: quantidade > 0'),
+]
+
+def _gravar_lote_via_staging(conn, params_lote, candidatos):
+    """
+    Carga em bloco (SQLite) das posições `candidatos` de `params_lote`:
+    1. as linhas vão para a tabela temporária vendas_staging (executemany);
+    2. as regras dos triggers existentes em vendas (vendedor da loja, CPF por data)
+       e as restrições NOT NULL/CHECK/FK são verificadas com UPDATE ... EXISTS na
+       ordem do SQLite (triggers BEFORE INSERT primeiro, o mais recente antes),
+       marcando em `motivo` a mesma mensagem que a inserção linha a linha daria;
+    3. entre as linhas válidas, só a primeira de cada CPF entra (GROUP BY cpf);
+    4. as válidas (motivo IS NULL) vão para vendas com um único INSERT ... SELECT;
+       os triggers continuam ativos (inclusive o log em sistema_logs) e já não
+       barram nenhuma delas.
+    Deve ser chamada dentro de uma transação. Retorna (inseridos, repetidos, {pos: motivo}).
+    Erros inesperados (sqlite3.Error) sobem para o chamador, que refaz o lote pelo caminho padrão.
+    """
+    cursor = conn.cursor()
+    cursor.execute(SQL_STAGING_VENDAS)
+    cursor.execute("DELETE FROM temp.vendas_staging")
+    cursor.executemany(
+        f"INSERT INTO temp.vendas_staging (pos, {', '.join(COLUNAS_INSERCAO_VENDAS)}) "
+        f"VALUES (?, {', '.join('?' for _ in COLUNAS_INSERCAO_VENDAS)})",
+        [(pos,) + _valores_venda(params_lote[pos]) for pos in candidatos]
+    )
+
+    # Triggers de regra existentes, em ordem de criação
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'vendas' ORDER BY rowid")
+    triggers = [nome for (nome,) in cursor.fetchall() if nome in MOTIVOS_TRIGGERS_VENDAS]
+    condicoes_triggers = {
+        TRIGGER_VENDEDOR_DA_LOJA: """NOT EXISTS (
+            SELECT 1 FROM loja_vendedor lv
+            WHERE lv.codigo_loja = s.codigo_loja AND lv.codigo_vendedor = s.codigo_vendedor AND lv.ativo = 1
+        )""",
+        TRIGGER_CPF_POR_DATA: """s.cpf != '' AND EXISTS (
+            SELECT 1 FROM vendas v WHERE v.cpf = s.cpf AND v.data_venda = s.data_venda
+        )""",
+    }
+    # O SQLite dispara os triggers BEFORE INSERT do mais recente ao mais antigo,
+    # antes de verificar NOT NULL/CHECK; as chaves estrangeiras vêm por último
+    verificacoes = [(condicoes_triggers[nome], MOTIVOS_TRIGGERS_VENDAS[nome])
+                    for nome in reversed(triggers) if nome in condicoes_triggers]
+    verificacoes += VERIFICACOES_STAGING
+    if cursor.execute("PRAGMA foreign_keys").fetchone()[0]:
+        for coluna, tabela in (('codigo_produto', 'produtos'), ('codigo_loja', 'lojas'), ('codigo_vendedor', 'vendedores')):
+            verificacoes.append((f"NOT EXISTS (SELECT 1 FROM {tabela} t WHERE t.{coluna} = s.{coluna})",
+                                 'FOREIGN KEY constraint failed'))
+
+    for condicao, motivo in verificacoes:
+        cursor.execute(f"UPDATE temp.vendas_staging AS s SET motivo = ? WHERE motivo IS NULL AND ({condicao})", (motivo,))
+
+    # CPF repetido no lote: só a primeira ocorrência válida é gravada
+    cursor.execute("""
+        UPDATE temp.vendas_staging SET motivo = 'CPF duplicado'
+        WHERE motivo IS NULL AND cpf != '' AND pos NOT IN (
+            SELECT MIN(pos) FROM temp.vendas_staging WHERE motivo IS NULL AND cpf != '' GROUP BY cpf
+        )
+    """)
+
+    cursor.execute(f"""
+        INSERT INTO vendas ({', '.join(COLUNAS_INSERCAO_VENDAS)})
+        SELECT {', '.join(COLUNAS_INSERCAO_VENDAS)} FROM temp.vendas_staging WHERE motivo IS NULL ORDER BY pos
+    """)
+
+    inseridos, repetidos, rejeitados = [], [], {}
+    for pos, motivo in cursor.execute("SELECT pos, motivo FROM temp.vendas_staging ORDER BY pos"):
+        if motivo is None:
+            inseridos.append(pos)
+        elif motivo == 'CPF duplicado':
+            repetidos.append(pos)
+        else:
+            rejeitados[pos] = motivo
+    cursor.execute("DELETE FROM temp.vendas_staging")
+    return inseridos, repetidos, rejeitados
+
+def inserir_lote(linhas, indice_cpf=None, carga_em_bloco=False):
+    """
+    Insere um lote de vendas em uma única transação.
+    - SQLite: verifica CPFs duplicados com uma única consulta (ou no `indice_cpf`
+      carregado por carregar_indice_cpf, atualizado com os CPFs gravados) e grava com executemany
+    - Supabase: um único insert() com várias linhas
+    - PostgreSQL (psycopg2): execute_values
+    Se a gravação em bloco falhar, o lote é refeito linha a linha para identificar
+    quais registros foram rejeitados. Duplicatas são gravadas no log ao fim do lote.
+
+    Com `carga_em_bloco` (SQLite), o lote passa por uma tabela temporária e as
+    regras dos triggers de vendas são aplicadas em SQL sobre o lote inteiro
+    (ver _gravar_lote_via_staging).
+
+    Retorna uma lista de booleanos (sucesso/falha) na mesma ordem de `linhas`.
+    """
+    if not linhas:
+        return []
+
+    resultados = [False] * len(linhas)
 
     try:
-        # Parâmetros esperados pelo pipeline.py
-        expected_params = [
-            'id_cliente', 'nome_cliente', 'data_nascimento', 'rg', 'cpf',
-            'endereco', 'numero', 'complemento', 'bairro', 'cidade', 'estado',
-            'cep', 'telefone', 'codigo_produto', 'nome_produto', 'quantidade', 'valor_produto', 'data_venda',
-            'data_compra', 'forma_pagamento', 'codigo_loja', 'codigo_vendedor', 'nome_vendedor'
-        ]
-
-        # Preparar parâmetros com valores padrão
-        params = {}
-        for key in expected_params:
-            value = dados.get(key) if isinstance(dados, dict) else None
-            # Valores padrão para campos obrigatórios
-            if key == 'id_cliente' and (value is None or value == ''):
-                value = 0
-            elif key == 'quantidade' and (value is None or value == ''):
-                value = 1
-            elif key == 'valor_produto' and (value is None or value == ''):
-                value = 0.0
-            elif key == 'data_compra' and (value is None or value == '') and dados.get('data_venda'):
-                value = dados.get('data_venda')
-            elif key in ['nome_cliente', 'cpf', 'codigo_produto', 'nome_produto', 'codigo_loja', 'codigo_vendedor', 'nome_vendedor']:
-                value = value or ''
-
-            params[key] = value
-
-        # Verificar duplicata de CPF (apenas para SQLite, PostgreSQL tem constraints)
-        if db_type == 'sqlite':
-            cpf_val = params.get('cpf')
-            if cpf_val:
+        with db_connection() as (conn, db_type):
+            params_lote = [_preparar_parametros_venda(dados) for dados in linhas]
+
+            if db_type == 'supabase':
+                colunas = gerenciador_conexoes.colunas_vendas_supabase(conn)
+                registros = [_registro_supabase(params, colunas) for params in params_lote]
+                try:
+                    conn.table('vendas').insert(registros).execute()
+                    resultados = [True] * len(linhas)
+                except Exception as e:
+                    logger.warning(f'⚠️ Insert em lote falhou no Supabase, refazendo linha a linha: {e}')
+                    for pos, registro in enumerate(registros):
+                        try:
+                            conn.table('vendas').insert(registro).execute()
+                            resultados[pos] = True
+                        except Exception as e_linha:
+                            logger.error(f'❌ Erro ao inserir venda: {e_linha}')
+
+            elif db_type == 'postgresql':
+                from psycopg2.extras import execute_values
+
+                valores = [_valores_venda(params) for params in params_lote]
+                cursor = conn.cursor()
+                sql = f"INSERT INTO vendas ({', '.join(COLUNAS_INSERCAO_VENDAS)}) VALUES %s"
+                try:
+                    execute_values(cursor, sql, valores)
+                    conn.commit()
+                    resultados = [True] * len(linhas)
+                except Exception as e:
+                    conn.rollback()
+                    logger.warning(f'⚠️ Insert em lote falhou no PostgreSQL, refazendo linha a linha: {e}')
+                    sql_linha = f"INSERT INTO vendas ({', '.join(COLUNAS_INSERCAO_VENDAS)}) VALUES ({', '.join('%s' for _ in COLUNAS_INSERCAO_VENDAS)})"
+                    for pos, valores_linha in enumerate(valores):
+                        cursor.execute("SAVEPOINT linha")
+                        try:
+                            cursor.execute(sql_linha, valores_linha)
+                            cursor.execute("RELEASE SAVEPOINT linha")
+                            resultados[pos] = True
+                        except Exception as e_linha:
+                            cursor.execute("ROLLBACK TO SAVEPOINT linha")
+                            logger.error(f'❌ Erro ao inserir venda: {e_linha}')
+                    conn.commit()
+
+            else:
+                # SQLite: CPFs já gravados são rejeitados, assim como em inserir_linha
+                cpfs_lote = {params['cpf'] for params in params_lote if params['cpf']}
                 try:
-                    cursor = conn.cursor()
-                    if db_type == 'postgresql':
-                        cursor.execute("SELECT 1 FROM vendas WHERE cpf = %s LIMIT 1", (cpf_val,))
+                    if indice_cpf is not None:
+                        cpfs_no_banco = indice_cpf.existentes(conn, cpfs_lote, _cpfs_existentes)
                     else:
-                        cursor.execute("SELECT 1 FROM vendas WHERE cpf = ? LIMIT 1", (cpf_val,))
-                    if cursor.fetchone():
-                        # Log duplicate
-                        log_duplicata(cpf_val, params.get('codigo_loja'), params.get('codigo_vendedor'))
-                        logger.warning(f'CPF duplicado detectado: {cpf_val}')
-                        conn.close()
-                        return False
+                        cpfs_no_banco = _cpfs_existentes(conn, cpfs_lote)
                 except Exception as e:
                     logger.debug(f'Erro ao verificar CPF duplicado: {e}')
+                    cpfs_no_banco = set()
+
+                # Mesma semântica de chamadas sucessivas a inserir_linha: um CPF repetido
+                # no lote só é duplicata se a ocorrência anterior foi gravada.
+                candidatos = []
+                for pos, params in enumerate(params_lote):
+                    cpf_val = params['cpf']
+                    if cpf_val and cpf_val in cpfs_no_banco:
+                        _registrar_duplicata_venda(params)
+                    else:
+                        candidatos.append(pos)
 
-        # Inserir venda
-        if db_type == 'supabase':
-            # Supabase insert
-            data = {
-                'id_cliente': params['id_cliente'],
-                'nome_cliente': params['nome_cliente'],
-                'data_nascimento': params['data_nascimento'],
-                'rg': params['rg'],
-                'cpf': params['cpf'],
-                'endereco': params['endereco'],
-                'numero': params['numero'],
-                'complemento': params['complemento'],
-                'bairro': params['bairro'],
-                'cidade': params['cidade'],
-                'estado': params['estado'],
-                'cep': params['cep'],
-                'telefone': params['telefone'],
-                'codigo_produto': params['codigo_produto'],
-                'quantidade': params['quantidade'],
-                'data_venda': params['data_venda'],
-                'data_compra': params['data_compra'],
-                'forma_pagamento': params['forma_pagamento'],
-                'codigo_loja': params['codigo_loja'],
-                'nome_vendedor': params.get('nome_vendedor', ''),
-                'codigo_vendedor': params['codigo_vendedor']
-            }
-            response = conn.table('vendas').insert(data).execute()
-        else:
-            # SQLite insert
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO vendas (
-                    id_cliente, nome_cliente, data_nascimento, rg, cpf, endereco, numero, complemento,
-                    bairro, cidade, estado, cep, telefone, codigo_produto, quantidade, data_venda,
-                    data_compra, forma_pagamento, codigo_loja, nome_vendedor, codigo_vendedor
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                params['id_cliente'], params['nome_cliente'], params['data_nascimento'], params['rg'],
-                params['cpf'], params['endereco'], params['numero'], params['complemento'],
-                params['bairro'], params['cidade'], params['estado'], params['cep'], params['telefone'],
-                params['codigo_produto'], params['quantidade'], params['data_venda'], params['data_compra'],
-                params['forma_pagamento'], params['codigo_loja'], params.get('nome_vendedor', ''),
-                params['codigo_vendedor']
-            ))
+                cursor = conn.cursor()
+                cursor.execute("BEGIN")
+                gravado_em_bloco = False
+                if carga_em_bloco:
+                    cursor.execute("SAVEPOINT carga")
+                    try:
+                        inseridos, repetidos, rejeitados = _gravar_lote_via_staging(conn, params_lote, candidatos)
+                        cursor.execute("RELEASE SAVEPOINT carga")
+                        gravado_em_bloco = True
+                        for pos in inseridos:
+                            resultados[pos] = True
+                        for pos in repetidos:
+                            _registrar_duplicata_venda(params_lote[pos])
+                        for pos, motivo in rejeitados.items():
+                            logger.error(f'❌ Erro ao inserir venda: {motivo}')
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT carga")
+                        cursor.execute("RELEASE SAVEPOINT carga")
+                        logger.warning(f'⚠️ Carga em bloco falhou no SQLite, usando a inserção padrão: {e}')
+
+                if not gravado_em_bloco:
+                    primeiros, repetidos, vistos = [], [], set()
+                    for pos in candidatos:
+                        cpf_val = params_lote[pos]['cpf']
+                        if cpf_val and cpf_val in vistos:
+                            repetidos.append(pos)
+                        else:
+                            primeiros.append(pos)
+                            if cpf_val:
+                                vistos.add(cpf_val)
 
-            conn.commit()
-            conn.close()
+                    cursor.execute("SAVEPOINT lote")
+                    try:
+                        cursor.executemany(SQL_INSERIR_VENDA, [_valores_venda(params_lote[pos]) for pos in primeiros])
+                        cursor.execute("RELEASE SAVEPOINT lote")
+                        for pos in primeiros:
+                            resultados[pos] = True
+                        for pos in repetidos:
+                            _registrar_duplicata_venda(params_lote[pos])
+                    except sqlite3.Error as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT lote")
+                        cursor.execute("RELEASE SAVEPOINT lote")
+                        logger.warning(f'⚠️ Insert em lote falhou no SQLite, refazendo linha a linha: {e}')
+                        # Cada INSERT com erro é desfeito isoladamente (ABORT), sem perder o restante da transação
+                        cpfs_gravados = set()
+                        for pos in candidatos:
+                            params = params_lote[pos]
+                            cpf_val = params['cpf']
+                            if cpf_val and cpf_val in cpfs_gravados:
+                                _registrar_duplicata_venda(params)
+                                continue
+                            try:
+                                cursor.execute(SQL_INSERIR_VENDA, _valores_venda(params))
+                                resultados[pos] = True
+                                if cpf_val:
+                                    cpfs_gravados.add(cpf_val)
+                            except sqlite3.Error as e_linha:
+                                logger.error(f'❌ Erro ao inserir venda: {e_linha}')
+
+                conn.commit()
+                if indice_cpf is not None:
+                    indice_cpf.adicionar(params_lote[pos]['cpf'] for pos, ok in enumerate(resultados) if ok)
+
+            logger.info(f'✅ Lote gravado - {sum(resultados)} de {len(linhas)} vendas inseridas ({db_type})')
+            return resultados
 
-        logger.info(f'✅ Venda inserida - CPF: {params.get("cpf")}, Loja: {params.get("codigo_loja")}')
-        return True
+    except Exception as e:
+        logger.error(f'❌ Erro ao inserir lote de vendas: {e}')
+        return [False] * len(linhas)
+    finally:
+        # fronteira de chunk: duplicatas do lote vão para disco de uma vez
+        flush_duplicatas()
 
+# Índices de vendas que a carga em bloco mantém (usados nas verificações de CPF)
+INDICES_MANTIDOS_NA_CARGA = ('idx_vendas_cpf',)
+
+def _caminho_indices_suspensos():
+    return os.path.join(os.path.dirname(DB_PATH), 'indices_suspensos.json')
+
+def suspender_indices_vendas():
+    """
+    Remove os índices secundários de vendas antes de uma carga grande (apenas SQLite).
+    As definições são guardadas em data/db/indices_suspensos.json, para que
+    restaurar_indices_vendas() os recrie mesmo após uma execução interrompida.
+    Retorna o número de índices removidos.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type != 'sqlite':
+                return 0
+            indices = [
+                (nome, sql) for nome, sql in conn.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'vendas' AND sql IS NOT NULL"
+                ) if nome not in INDICES_MANTIDOS_NA_CARGA
+            ]
+            if not indices:
+                return 0
+            caminho = _caminho_indices_suspensos()
+            pendentes = []
+            if os.path.exists(caminho):
+                with open(caminho, encoding='utf-8') as f:
+                    pendentes = json.load(f)
+            with open(caminho, 'w', encoding='utf-8') as f:
+                json.dump(pendentes + [list(indice) for indice in indices], f, ensure_ascii=False)
+            for nome, _ in indices:
+                conn.execute(f"DROP INDEX IF EXISTS {nome}")
+            conn.commit()
+            logger.info(f'🗜️ {len(indices)} índices de vendas suspensos para a carga em bloco')
+            return len(indices)
     except Exception as e:
-        logger.error(f'❌ Erro ao inserir venda: {e}')
-        if conn and db_type != 'supabase':
-            conn.close()
-        return False
+        logger.error(f'❌ Erro ao suspender índices de vendas: {e}')
+        return 0
+
+def restaurar_indices_vendas():
+    """Recria os índices suspensos por suspender_indices_vendas(); retorna quantos foram recriados"""
+    caminho = _caminho_indices_suspensos()
+    if not os.path.exists(caminho):
+        return 0
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            indices = json.load(f)
+        with db_connection() as (conn, db_type):
+            existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            for nome, sql in indices:
+                if nome not in existentes:
+                    conn.execute(sql)
+            conn.commit()
+        os.remove(caminho)
+        logger.info(f'🗜️ {len(indices)} índices de vendas recriados')
+        return len(indices)
+    except Exception as e:
+        logger.error(f'❌ Erro ao recriar índices de vendas: {e}')
+        return 0
+
+class BufferDuplicatas:
+    """
+    Acumula em memória as duplicatas de CPF e as grava em bloco em DUPLICATE_LOG
+    (JSONL) e DUPLICATE_CSV, abrindo cada arquivo uma vez por descarga.
+    - inserir_lote/inserir_linha descarregam ao fim de cada lote (fronteira de chunk)
+    - também descarrega ao atingir `max_entradas` ou, por um timer (thread daemon),
+      `intervalo` segundos após a primeira entrada pendente, mesmo sem novas
+      duplicatas, limitando o que se perde numa queda
+    - o restante é gravado na saída do processo (atexit)
+    """
+
+    def __init__(self, max_entradas=DUPLICATE_BUFFER_SIZE, intervalo=DUPLICATE_FLUSH_INTERVAL):
+        self.max_entradas = max_entradas
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendentes = []
+        self._timer = None
+
+    def registrar(self, entrada):
+        with self._lock:
+            self._pendentes.append(entrada)
+            if self._timer is None and self.intervalo > 0:
+                self._timer = threading.Timer(self.intervalo, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            limite_atingido = len(self._pendentes) >= self.max_entradas
+        if limite_atingido:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pendentes, self._pendentes = self._pendentes, []
+            if not pendentes:
+                return 0
+            try:
+                os.makedirs(os.path.dirname(DUPLICATE_LOG), exist_ok=True)
+                with open(DUPLICATE_LOG, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(entry, ensure_ascii=False) + "\n" for entry in pendentes)
+
+                os.makedirs(os.path.dirname(DUPLICATE_CSV), exist_ok=True)
+                write_header = not os.path.exists(DUPLICATE_CSV)
+                with open(DUPLICATE_CSV, 'a', newline='', encoding='utf-8') as csvf:
+                    writer = csv.writer(csvf)
+                    if write_header:
+                        writer.writerow(['timestamp', 'cpf', 'codigo_loja', 'codigo_vendedor'])
+                    writer.writerows([entry['timestamp'], entry['cpf'], entry['codigo_loja'], entry['codigo_vendedor']]
+                                     for entry in pendentes)
+            except Exception as e:
+                logger.error(f'Erro ao registrar duplicatas: {e}')
+            return len(pendentes)
+
+_buffer_duplicatas = BufferDuplicatas()
+atexit.register(_buffer_duplicatas.flush)
 
 def log_duplicata(cpf, codigo_loja, codigo_vendedor):
-    """Log de CPFs duplicados - função auxiliar para inserir_linha"""
+    """Log de CPFs duplicados - função auxiliar para inserir_linha/inserir_lote (gravação em bloco)"""
+    _buffer_duplicatas.registrar({
+        'timestamp': datetime.now().isoformat(),
+        'cpf': cpf,
+        'codigo_loja': codigo_loja,
+        'codigo_vendedor': codigo_vendedor
+    })
+
+def flush_duplicatas():
+    """Grava as duplicatas pendentes; retorna quantas foram gravadas"""
+    return _buffer_duplicatas.flush()
+
+# Dimensões sincronizadas a partir das vendas: (tabela, colunas, colunas da chave)
+DIMENSOES_VENDAS = (
+    ('vendedores', ('codigo_vendedor', 'nome_vendedor'), ('codigo_vendedor',)),
+    ('lojas', ('codigo_loja', 'nome_loja'), ('codigo_loja',)),
+    ('loja_vendedor', ('codigo_loja', 'codigo_vendedor'), ('codigo_loja', 'codigo_vendedor')),
+)
+
+def _linhas_dimensao(df, colunas, chave):
+    """Combinações distintas e completas de `colunas` no DataFrame, uma por chave (a primeira vista)"""
+    if not set(colunas) <= set(df.columns):
+        return []
+    linhas = {}
+    for linha in df[list(colunas)].drop_duplicates().itertuples(index=False, name=None):
+        if all(pd.notna(valor) and valor for valor in linha):
+            linhas.setdefault(tuple(linha[colunas.index(col)] for col in chave), linha)
+    return list(linhas.items())
+
+def _inserir_dimensao(conn, db_type, tabela, colunas, chave, linhas):
+    """Insere apenas as linhas cuja chave ainda não existe na tabela; retorna quantas foram criadas"""
+    if db_type == 'supabase':
+        response = conn.table(tabela).select(','.join(chave)).execute()
+        existentes = {tuple(row[col] for col in chave) for row in response.data or []}
+        novas = [dict(zip(colunas, linha)) for k, linha in linhas if k not in existentes]
+        if novas:
+            conn.table(tabela).upsert(novas, on_conflict=','.join(chave), ignore_duplicates=True).execute()
+        return len(novas)
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(chave)} FROM {tabela}")
+    existentes = set(cursor.fetchall())
+    novas = [linha for k, linha in linhas if k not in existentes]
+    if not novas:
+        return 0
+
+    if db_type == 'postgresql':
+        sql = (f"INSERT INTO {tabela}({', '.join(colunas)}) VALUES ({', '.join('%s' for _ in colunas)}) "
+               f"ON CONFLICT ({', '.join(chave)}) DO NOTHING")
+    else:
+        sql = f"INSERT OR IGNORE INTO {tabela}({', '.join(colunas)}) VALUES ({', '.join('?' for _ in colunas)})"
     try:
-        os.makedirs(os.path.dirname(DUPLICATE_LOG), exist_ok=True)
-        
-        # JSONL log
-        entry = {
-            'timestamp': datetime.now().isoformat(),
-            'cpf': cpf,
-            'codigo_loja': codigo_loja,
-            'codigo_vendedor': codigo_vendedor
-        }
-        
-        with open(DUPLICATE_LOG, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-        
-        # CSV log
-        write_header = not os.path.exists(DUPLICATE_CSV)
-        with open(DUPLICATE_CSV, 'a', newline='', encoding='utf-8') as csvf:
-            writer = csv.writer(csvf)
-            if write_header:
-                writer.writerow(['timestamp', 'cpf', 'codigo_loja', 'codigo_vendedor'])
-            writer.writerow([entry['timestamp'], entry['cpf'], entry['codigo_loja'], entry['codigo_vendedor']])
-            
-    except Exception as e:
-        logger.error(f'Erro ao registrar duplicata: {e}')
+        cursor.executemany(sql, novas)
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        # Uma linha barrada por trigger aborta o executemany inteiro: refaz linha a linha
+        logger.debug(f"Inserção em bloco em {tabela} falhou, refazendo linha a linha: {e}")
+        criadas = 0
+        for linha in novas:
+            try:
+                cursor.execute(sql, linha)
+                criadas += cursor.rowcount
+            except sqlite3.Error as e_linha:
+                logger.debug(f"Linha ignorada em {tabela}: {linha} - {e_linha}")
+        return criadas
 
 def ensure_store_sellers_from_df(df):
     """
     Populate lojas, vendedores and loja_vendedor mappings based on a processed DataFrame.
     Versão segura que não causa erros se as relações já existem.
+
+    As chaves existentes de cada tabela são lidas uma vez e apenas as que faltam
+    são inseridas (executemany no SQL, um upsert por tabela no Supabase).
+    Retorna um dict com o número de entidades criadas por tabela, ou False em caso de erro.
     """
     try:
-        conn, db_type = get_db_connection()
-        cursor = conn.cursor()
-
-        # Insert unique vendedores from df
-        if 'codigo_vendedor' in df.columns and 'nome_vendedor' in df.columns:
-            vendedores = df[['codigo_vendedor', 'nome_vendedor']].drop_duplicates().values.tolist()
-            for codigo_vendedor, nome_vendedor in vendedores:
-                if codigo_vendedor and nome_vendedor:
-                    try:
-                        if db_type == 'postgresql':
-                            cursor.execute(
-                                "INSERT INTO vendedores(codigo_vendedor, nome_vendedor) VALUES (%s,%s) ON CONFLICT (codigo_vendedor) DO NOTHING",
-                                (codigo_vendedor, nome_vendedor)
-                            )
-                        else:
-                            cursor.execute(
-                                "INSERT OR IGNORE INTO vendedores(codigo_vendedor, nome_vendedor) VALUES (?,?)",
-                                (codigo_vendedor, nome_vendedor)
-                            )
-                    except Exception as e:
-                        logger.debug(f"Vendedor já existe: {codigo_vendedor} - {e}")
-
-        # Insert unique lojas from df
-        if 'codigo_loja' in df.columns and 'nome_loja' in df.columns:
-            lojas = df[['codigo_loja', 'nome_loja']].drop_duplicates().values.tolist()
-            for codigo_loja, nome_loja in lojas:
-                if codigo_loja and nome_loja:
-                    try:
-                        if db_type == 'postgresql':
-                            cursor.execute(
-                                "INSERT INTO lojas(codigo_loja, nome_loja) VALUES (%s,%s) ON CONFLICT (codigo_loja) DO NOTHING",
-                                (codigo_loja, nome_loja)
-                            )
-                        else:
-                            cursor.execute(
-                                "INSERT OR IGNORE INTO lojas(codigo_loja, nome_loja) VALUES (?,?)",
-                                (codigo_loja, nome_loja)
-                            )
-                    except Exception as e:
-                        logger.debug(f"Loja já existe: {codigo_loja} - {e}")
+        with db_connection() as (conn, db_type):
+            criadas = {}
+            for tabela, colunas, chave in DIMENSOES_VENDAS:
+                linhas = _linhas_dimensao(df, colunas, chave)
+                criadas[tabela] = _inserir_dimensao(conn, db_type, tabela, colunas, chave, linhas) if linhas else 0
 
-        # Build store-seller relationships
-        if 'codigo_loja' in df.columns and 'codigo_vendedor' in df.columns:
-            loja_vendedor_pairs = df[['codigo_loja', 'codigo_vendedor']].drop_duplicates().values.tolist()
-            for codigo_loja, codigo_vendedor in loja_vendedor_pairs:
-                if codigo_loja and codigo_vendedor:
-                    try:
-                        if db_type == 'postgresql':
-                            cursor.execute(
-                                "INSERT INTO loja_vendedor(codigo_loja, codigo_vendedor) VALUES (%s,%s) ON CONFLICT (codigo_loja, codigo_vendedor) DO NOTHING",
-                                (codigo_loja, codigo_vendedor)
-                            )
-                        else:
-                            cursor.execute(
-                                "INSERT OR IGNORE INTO loja_vendedor(codigo_loja, codigo_vendedor) VALUES (?,?)",
-                                (codigo_loja, codigo_vendedor)
-                            )
-                    except Exception as e:
-                        logger.debug(f"Relação já existe: {codigo_loja}-{codigo_vendedor} - {e}")
+            if db_type != 'supabase':
+                conn.commit()
+            logger.info(f"✅ Lojas e vendedores sincronizados com sucesso - novos: {criadas['lojas']} lojas, "
+                        f"{criadas['vendedores']} vendedores, {criadas['loja_vendedor']} relações")
+            return criadas
 
-        conn.commit()
-        conn.close()
-        logger.info('✅ Lojas e vendedores sincronizados com sucesso')
-        return True
-        
     except Exception as e:
         logger.error(f'❌ Erro ao sincronizar lojas e vendedores: {e}')
         return False
 
+# Colunas da tabela importacoes usadas para reconhecer arquivos já carregados
+SQL_TABELA_IMPORTACOES = """
+    CREATE TABLE IF NOT EXISTS importacoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome_arquivo TEXT NOT NULL,
+        total_registros INTEGER NOT NULL,
+        registros_importados INTEGER NOT NULL,
+        registros_com_erro INTEGER DEFAULT 0,
+        usuario_importacao TEXT,
+        data_importacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'CONCLUIDA',
+        hash_arquivo TEXT,
+        tamanho_bytes INTEGER
+    )
+"""
+
+def _garantir_tabela_importacoes(conn):
+    """Cria importacoes (ou as colunas hash_arquivo/tamanho_bytes em bancos antigos) - SQLite"""
+    conn.execute(SQL_TABELA_IMPORTACOES)
+    colunas = {row[1] for row in conn.execute("PRAGMA table_info(importacoes)")}
+    for coluna, tipo in (('hash_arquivo', 'TEXT'), ('tamanho_bytes', 'INTEGER')):
+        if coluna not in colunas:
+            conn.execute(f"ALTER TABLE importacoes ADD COLUMN {coluna} {tipo}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_importacoes_hash ON importacoes(hash_arquivo)")
+
+def buscar_importacao_por_hash(hash_arquivo):
+    """Retorna a importação concluída do arquivo com esse hash (ou None)"""
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                response = conn.table('importacoes').select('*').eq('hash_arquivo', hash_arquivo) \
+                    .eq('status', 'CONCLUIDA').order('id', desc=True).limit(1).execute()
+                return response.data[0] if response.data else None
+
+            _garantir_tabela_importacoes(conn)
+            cursor = conn.execute("""
+                SELECT * FROM importacoes
+                WHERE hash_arquivo = ? AND status = 'CONCLUIDA'
+                ORDER BY id DESC LIMIT 1
+            """, (hash_arquivo,))
+            row = cursor.fetchone()
+            return dict(zip([col[0] for col in cursor.description], row)) if row else None
+    except Exception as e:
+        logger.error(f'❌ Erro ao buscar importação: {e}')
+        return None
+
+def buscar_importacoes_menores(tamanho_bytes):
+    """
+    Importações concluídas de arquivos menores que `tamanho_bytes`: candidatas a
+    serem o início de um arquivo que recebeu novas linhas.
+    Retorna lista de dicts com hash_arquivo, tamanho_bytes e total_registros.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                response = conn.table('importacoes').select('hash_arquivo, tamanho_bytes, total_registros') \
+                    .eq('status', 'CONCLUIDA').gt('tamanho_bytes', 0).lt('tamanho_bytes', tamanho_bytes).execute()
+                return response.data or []
+
+            _garantir_tabela_importacoes(conn)
+            cursor = conn.execute("""
+                SELECT hash_arquivo, tamanho_bytes, total_registros FROM importacoes
+                WHERE status = 'CONCLUIDA' AND tamanho_bytes > 0 AND tamanho_bytes < ?
+            """, (tamanho_bytes,))
+            return [
+                {'hash_arquivo': h, 'tamanho_bytes': t, 'total_registros': n}
+                for h, t, n in cursor.fetchall()
+            ]
+    except Exception as e:
+        logger.error(f'❌ Erro ao buscar importações anteriores: {e}')
+        return []
+
+def registrar_importacao(nome_arquivo, hash_arquivo, tamanho_bytes, total_registros, registros_importados,
+                         registros_com_erro=0, usuario_importacao=None, status='CONCLUIDA'):
+    """Registra um arquivo importado (com sua impressão digital) na tabela importacoes"""
+    try:
+        registro = {
+            'nome_arquivo': nome_arquivo,
+            'hash_arquivo': hash_arquivo,
+            'tamanho_bytes': tamanho_bytes,
+            'total_registros': total_registros,
+            'registros_importados': registros_importados,
+            'registros_com_erro': registros_com_erro,
+            'usuario_importacao': usuario_importacao,
+            'status': status
+        }
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                conn.table('importacoes').insert(registro).execute()
+            else:
+                _garantir_tabela_importacoes(conn)
+                conn.execute(f"""
+                    INSERT INTO importacoes ({', '.join(registro)})
+                    VALUES ({', '.join('?' for _ in registro)})
+                """, tuple(registro.values()))
+                conn.commit()
+
+            logger.info(f'✅ Importação registrada: {nome_arquivo} ({status})')
+            return True
+    except Exception as e:
+        logger.error(f'❌ Erro ao registrar importação {nome_arquivo}: {e}')
+        return False
+
+SQL_TABELA_SISTEMA_LOGS = """
+    CREATE TABLE IF NOT EXISTS sistema_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL CHECK(tipo IN ('INFO', 'WARNING', 'ERROR', 'SUCCESS', 'DEBUG')),
+        modulo TEXT NOT NULL,
+        mensagem TEXT NOT NULL,
+        usuario TEXT,
+        ip_address TEXT,
+        user_agent TEXT,
+        data_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+def ultimo_id_venda():
+    """Maior id_venda gravado (0 se vendas está vazia; None em caso de erro)"""
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                response = conn.table('vendas').select('id_venda').order('id_venda', desc=True).limit(1).execute()
+                return response.data[0]['id_venda'] if response.data else 0
+            return conn.execute("SELECT COALESCE(MAX(id_venda), 0) FROM vendas").fetchone()[0]
+    except Exception as e:
+        logger.error(f'❌ Erro ao consultar último id de venda: {e}')
+        return None
+
+def versao_dados_vendas():
+    """
+    Identificador da versão dos dados, para chaves de cache: muda quando o banco é
+    gravado e só então. SQLite: PRAGMA data_version da sonda do gerenciador de
+    conexões (qualquer commit, de qualquer processo) + maior id_venda; Supabase:
+    total e maior id_venda de vendas + última importação registrada. None em
+    caso de erro.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                response = conn.table('vendas').select('id_venda', count='exact') \
+                    .order('id_venda', desc=True).limit(1).execute()
+                importacao = conn.table('importacoes').select('id').order('id', desc=True).limit(1).execute()
+                return ('supabase', response.count, response.data[0]['id_venda'] if response.data else 0,
+                        importacao.data[0]['id'] if importacao.data else 0)
+            maior_id = conn.execute("SELECT COALESCE(MAX(id_venda), 0) FROM vendas").fetchone()[0]
+        return ('sqlite', os.path.abspath(DB_PATH)) + gerenciador_conexoes.versao_sqlite(DB_PATH) + (maior_id,)
+    except Exception as e:
+        logger.error(f'❌ Erro ao consultar versão dos dados: {e}')
+        return None
+
+def registrar_auditoria_vendas(descricao, inseridos, rejeitados, id_inicial=None, id_final=None, usuario=None):
+    """
+    Grava em sistema_logs uma entrada de resumo da ingestão (um chunk ou uma
+    importação inteira), no lugar de uma linha por venda: faixa de id_venda
+    gravada e contagem de vendas inseridas e rejeitadas.
+    """
+    faixa = f"IDs {id_inicial}-{id_final}" if inseridos and id_inicial is not None else "nenhum ID"
+    registro = {
+        'tipo': 'INFO' if not rejeitados else 'WARNING',
+        'modulo': 'IMPORTACAO',
+        'mensagem': f"{descricao}: {inseridos} vendas inseridas ({faixa}), {rejeitados} rejeitadas",
+        'usuario': usuario or 'SISTEMA'
+    }
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                conn.table('sistema_logs').insert(registro).execute()
+            else:
+                conn.execute(SQL_TABELA_SISTEMA_LOGS)
+                conn.execute(f"""
+                    INSERT INTO sistema_logs ({', '.join(registro)})
+                    VALUES ({', '.join('?' for _ in registro)})
+                """, tuple(registro.values()))
+                conn.commit()
+            return True
+    except Exception as e:
+        logger.error(f'❌ Erro ao registrar auditoria da importação: {e}')
+        return False
+
+# Resumo diário de vendas: uma linha por (dia, loja, vendedor, produto, forma de pagamento)
+# com contagem e somas de quantidade e valor. As leituras de KPIs percorrem os grupos,
+# não as vendas. vendas_resumo_controle guarda o último id_venda já agregado.
+CHAVES_RESUMO_VENDAS = ('dia', 'codigo_loja', 'codigo_vendedor', 'codigo_produto', 'forma_pagamento')
+
+SQL_TABELA_RESUMO_VENDAS = """
+    CREATE TABLE IF NOT EXISTS vendas_resumo_diario (
+        dia TEXT NOT NULL,
+        codigo_loja TEXT NOT NULL,
+        codigo_vendedor TEXT NOT NULL,
+        codigo_produto TEXT NOT NULL,
+        forma_pagamento TEXT NOT NULL DEFAULT '',
+        total_vendas INTEGER NOT NULL DEFAULT 0,
+        quantidade_total INTEGER NOT NULL DEFAULT 0,
+        valor_total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (dia, codigo_loja, codigo_vendedor, codigo_produto, forma_pagamento)
+    ) WITHOUT ROWID
+"""
+
+SQL_TABELA_RESUMO_CONTROLE = """
+    CREATE TABLE IF NOT EXISTS vendas_resumo_controle (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        ultimo_id_venda INTEGER NOT NULL DEFAULT 0,
+        atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+def _garantir_resumo_vendas(conn):
+    """Cria as tabelas do resumo diário (vazias, marca d'água em 0) - SQLite"""
+    conn.execute(SQL_TABELA_RESUMO_VENDAS)
+    conn.execute(SQL_TABELA_RESUMO_CONTROLE)
+    conn.execute("INSERT OR IGNORE INTO vendas_resumo_controle (id, ultimo_id_venda) VALUES (1, 0)")
+
+def _sql_valor_venda(conn):
+    """
+    (expressão, JOIN) do valor de uma venda conforme as colunas de vendas: valor_total
+    (schema.sql), valor_produto * quantidade, ou o preço do cadastro de produtos
+    """
+    # table_xinfo inclui colunas geradas (valor_total), que table_info omite
+    colunas = {row[1] for row in conn.execute("PRAGMA table_xinfo(vendas)")}
+    if 'valor_total' in colunas:
+        return "v.valor_total", ""
+    if 'valor_produto' in colunas:
+        return "v.valor_produto * v.quantidade", ""
+    return ("COALESCE(p.valor_produto, 0) * v.quantidade",
+            "LEFT JOIN produtos p ON p.codigo_produto = v.codigo_produto")
+
+def _atualizar_resumo_vendas(conn):
+    """
+    Agrega no resumo as vendas com id_venda acima da marca d'água e avança a marca,
+    na transação corrente (o chamador faz o commit). Retorna os grupos afetados.
+    Vendas sem data reconhecida (data_venda_iso nula) ficam fora do resumo.
+    """
+    _garantir_resumo_vendas(conn)
+    ultimo = conn.execute("SELECT ultimo_id_venda FROM vendas_resumo_controle WHERE id = 1").fetchone()[0]
+    maximo = conn.execute("SELECT COALESCE(MAX(id_venda), 0) FROM vendas").fetchone()[0]
+    if maximo <= ultimo:
+        return 0
+
+    valor, juncao = _sql_valor_venda(conn)
+    cursor = conn.execute(f"""
+        INSERT INTO vendas_resumo_diario ({', '.join(CHAVES_RESUMO_VENDAS)},
+                                          total_vendas, quantidade_total, valor_total)
+        SELECT v.data_venda_iso, v.codigo_loja, v.codigo_vendedor, v.codigo_produto,
+               COALESCE(v.forma_pagamento, ''), COUNT(*), SUM(v.quantidade), COALESCE(SUM({valor}), 0)
+        FROM vendas v {juncao}
+        WHERE v.id_venda > ? AND v.id_venda <= ? AND v.data_venda_iso IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT ({', '.join(CHAVES_RESUMO_VENDAS)}) DO UPDATE SET
+            total_vendas = total_vendas + excluded.total_vendas,
+            quantidade_total = quantidade_total + excluded.quantidade_total,
+            valor_total = valor_total + excluded.valor_total
+    """, (ultimo, maximo))
+    conn.execute("""
+        UPDATE vendas_resumo_controle SET ultimo_id_venda = ?, atualizado_em = CURRENT_TIMESTAMP WHERE id = 1
+    """, (maximo,))
+    return max(cursor.rowcount, 0)
+
+def atualizar_resumo_vendas():
+    """
+    Atualiza o resumo diário com as vendas gravadas desde a última atualização
+    (chamado pelo pipeline ao fim de cada chunk). Retorna o número de grupos
+    afetados, ou None se o banco não for SQLite ou em caso de erro.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type != 'sqlite':
+                return None
+            grupos = _atualizar_resumo_vendas(conn)
+            conn.commit()
+            return grupos
+    except Exception as e:
+        logger.error(f'❌ Erro ao atualizar resumo diário de vendas: {e}')
+        return None
+
+def reconstruir_resumo_vendas():
+    """
+    Recria o resumo diário do zero a partir de vendas (após exclusões/correções
+    de vendas, que a atualização incremental não enxerga). Retorna o número de
+    grupos, ou None se o banco não for SQLite ou em caso de erro.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type != 'sqlite':
+                logger.warning(f'⚠️ Resumo diário de vendas disponível apenas no SQLite (banco: {db_type})')
+                return None
+            _garantir_resumo_vendas(conn)
+            conn.execute("DELETE FROM vendas_resumo_diario")
+            conn.execute("UPDATE vendas_resumo_controle SET ultimo_id_venda = 0 WHERE id = 1")
+            grupos = _atualizar_resumo_vendas(conn)
+            conn.commit()
+            logger.info(f'📈 Resumo diário de vendas reconstruído: {grupos} grupos')
+            return grupos
+    except Exception as e:
+        logger.error(f'❌ Erro ao reconstruir resumo diário de vendas: {e}')
+        return None
+
+def _consulta_resumo_com_nomes(origem):
+    """SELECT dos grupos de `origem` (tabela ou subconsulta no formato do resumo diário) com os nomes dos cadastros"""
+    return f"""
+        SELECT r.*, l.nome_loja, vd.nome_vendedor, p.nome_produto
+        FROM {origem} r
+        LEFT JOIN lojas l ON l.codigo_loja = r.codigo_loja
+        LEFT JOIN vendedores vd ON vd.codigo_vendedor = r.codigo_vendedor
+        LEFT JOIN produtos p ON p.codigo_produto = r.codigo_produto
+    """
+
+def buscar_vendas_agrupadas(desde_id=None):
+    """
+    Vendas agrupadas como o resumo diário (colunas de buscar_resumo_vendas) e o
+    maior id_venda coberto, lidos no mesmo snapshot - SQLite.
+    - `desde_id` None: resumo diário + vendas acima da marca d'água do resumo
+      + vendas sem data (que o resumo não guarda);
+    - `desde_id` N: só as vendas com id_venda > N, agrupadas na consulta
+      (carga incremental: custo proporcional às vendas novas).
+    Vendas sem data_venda_iso vêm com dia nulo, para que os totais sem filtro de
+    período batam com COUNT(*) de vendas.
+    Retorna (DataFrame, maior id_venda); (DataFrame vazio, None) fora do SQLite ou em erro.
+    """
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type != 'sqlite':
+                return pd.DataFrame(), None
+            if desde_id is None:
+                _garantir_resumo_vendas(conn)
+                conn.commit()
+
+            conn.execute("BEGIN")
+            maximo = conn.execute("SELECT COALESCE(MAX(id_venda), 0) FROM vendas").fetchone()[0]
+            partes = []
+            carga_completa = desde_id is None
+            condicao = "v.id_venda > ?"
+            if carga_completa:
+                desde_id = conn.execute("SELECT ultimo_id_venda FROM vendas_resumo_controle WHERE id = 1").fetchone()[0]
+                partes.append(pd.read_sql_query(_consulta_resumo_com_nomes("vendas_resumo_diario"), conn))
+                # Vendas sem data nunca entram no resumo: lidas de vendas em toda carga completa
+                condicao = "(v.id_venda > ? OR v.data_venda_iso IS NULL)"
+            if maximo > desde_id or carga_completa:
+                valor, juncao = _sql_valor_venda(conn)
+                novas = f"""(
+                    SELECT v.data_venda_iso AS dia, v.codigo_loja, v.codigo_vendedor, v.codigo_produto,
+                           COALESCE(v.forma_pagamento, '') AS forma_pagamento, COUNT(*) AS total_vendas,
+                           SUM(v.quantidade) AS quantidade_total, COALESCE(SUM({valor}), 0) AS valor_total
+                    FROM vendas v {juncao}
+                    WHERE {condicao} AND v.id_venda <= ?
+                    GROUP BY 1, 2, 3, 4, 5
+                )"""
+                partes.append(pd.read_sql_query(_consulta_resumo_com_nomes(novas), conn, params=(desde_id, maximo)))
+            partes = [parte for parte in partes if not parte.empty]
+            return (pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()), maximo
+    except Exception as e:
+        logger.error(f'❌ Erro ao buscar vendas agrupadas: {e}')
+        return pd.DataFrame(), None
+
+def buscar_resumo_vendas(data_inicio=None, data_fim=None):
+    """
+    Retorna os grupos do resumo diário (com nomes de loja, vendedor e produto),
+    filtrados pelo intervalo fechado de dias. DataFrame vazio fora do SQLite.
+    """
+    try:
+        inicio = data_iso(data_inicio.isoformat() if hasattr(data_inicio, 'isoformat') else data_inicio)
+        fim = data_iso(data_fim.isoformat() if hasattr(data_fim, 'isoformat') else data_fim)
+        with db_connection() as (conn, db_type):
+            if db_type != 'sqlite':
+                return pd.DataFrame()
+            _garantir_resumo_vendas(conn)
+            condicoes, params = [], []
+            if inicio:
+                condicoes.append("r.dia >= ?")
+                params.append(inicio)
+            if fim:
+                condicoes.append("r.dia <= ?")
+                params.append(fim)
+            query = _consulta_resumo_com_nomes("vendas_resumo_diario")
+            if condicoes:
+                query += " WHERE " + " AND ".join(condicoes)
+            return pd.read_sql_query(query + " ORDER BY r.dia", conn, params=params)
+    except Exception as e:
+        logger.error(f'❌ Erro ao buscar resumo diário de vendas: {e}')
+        return pd.DataFrame()
+
 def conectar():
     """Compatibilidade - retorna conexão e cursor"""
     conn, db_type = get_db_connection()
@@ -486,48 +1555,219 @@ def fechar(conn):
         conn.commit()
         conn.close()
 
-def buscar_vendas(limit=None):
-    """Retorna todas as vendas - compatível com Supabase e SQLite"""
-    try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase query
-            query = conn.table('vendas').select('*').order('data_venda', desc=True)
-            if limit:
-                query = query.limit(limit)
-            response = query.execute()
-            df = pd.DataFrame(response.data)
+# Filtros de vendas do dashboard: chave -> (coluna com o nome, coluna de código em vendas, cadastro)
+FILTROS_VENDAS = {
+    'lojas': ('nome_loja', 'codigo_loja', 'lojas'),
+    'vendedores': ('nome_vendedor', 'codigo_vendedor', 'vendedores'),
+    'produtos': ('nome_produto', 'codigo_produto', 'produtos'),
+    'formas_pagamento': ('forma_pagamento', None, None),
+}
+
+# Ordenação da tabela de vendas do dashboard: chave -> (expressão SQLite sobre as colunas
+# da consulta, colunas no Supabase - que não ordena por expressão)
+ORDENACAO_VENDAS = {
+    'data_venda': ('data_venda_iso', ('data_venda_iso',)),
+    'valor_total': ('valor_produto * quantidade', ('valor_produto', 'quantidade')),
+    'quantidade': ('quantidade', ('quantidade',)),
+    'nome_cliente': ('nome_cliente', ('nome_cliente',)),
+    'nome_loja': ('nome_loja', ('nome_loja',)),
+    'nome_vendedor': ('nome_vendedor', ('nome_vendedor',)),
+    'nome_produto': ('nome_produto', ('nome_produto',)),
+    'forma_pagamento': ('forma_pagamento', ('forma_pagamento',)),
+}
+
+def restricoes_perfil(role, loja_usuario=None, nome_usuario=None):
+    """
+    Filtros impostos pelo perfil: 'user' vê apenas as próprias vendas (sua loja e
+    seu nome de vendedor); 'manager' com loja definida vê apenas a sua loja.
+    """
+    if role == 'user':
+        return {'lojas': [loja_usuario], 'vendedores': [nome_usuario]}
+    if role == 'manager' and loja_usuario and loja_usuario != 'Todas lojas':
+        return {'lojas': [loja_usuario]}
+    return {}
+
+def combinar_filtros(filtros, restricoes):
+    """Filtros escolhidos limitados pelas restrições do perfil (interseção por chave)"""
+    combinados = dict(filtros or {})
+    for chave, permitidos in (restricoes or {}).items():
+        escolhidos = combinados.get(chave)
+        combinados[chave] = list(permitidos) if escolhidos is None else [v for v in escolhidos if v in set(permitidos)]
+    return combinados
+
+def _consulta_vendas_sqlite(conn):
+    """
+    SELECT de vendas com nome de loja, vendedor e produto tirados dos cadastros e
+    valor_produto da venda (ou do cadastro, se vendas não tem a coluna) - SQLite
+    """
+    colunas = [row[1] for row in conn.execute("PRAGMA table_xinfo(vendas)") if row[6] != 1]
+    dos_cadastros = {'nome_loja': 'l.nome_loja', 'nome_vendedor': 'vd.nome_vendedor', 'nome_produto': 'p.nome_produto'}
+    selecao = []
+    for coluna in colunas:
+        if coluna in dos_cadastros:
+            selecao.append(f"COALESCE({dos_cadastros[coluna]}, v.{coluna}) AS {coluna}")
+        elif coluna == 'valor_produto':
+            selecao.append("COALESCE(v.valor_produto, p.valor_produto) AS valor_produto")
         else:
-            # SQLite query
-            query = "SELECT v.* FROM vendas v ORDER BY v.data_venda DESC"
-            if limit:
-                query += f" LIMIT {limit}"
-
-            df = pd.read_sql_query(query, conn)
-            conn.close()
+            selecao.append(f"v.{coluna}")
+    selecao += [f"{expressao} AS {coluna}" for coluna, expressao in dos_cadastros.items() if coluna not in colunas]
+    if 'valor_produto' not in colunas:
+        selecao.append("p.valor_produto AS valor_produto")
+    return f"""
+        SELECT {', '.join(selecao)}
+        FROM vendas v
+        LEFT JOIN lojas l ON l.codigo_loja = v.codigo_loja
+        LEFT JOIN vendedores vd ON vd.codigo_vendedor = v.codigo_vendedor
+        LEFT JOIN produtos p ON p.codigo_produto = v.codigo_produto
+    """
 
-        logger.info(f'📊 {len(df)} vendas carregadas do banco ({db_type})')
-        return df
+def _condicoes_filtros_sqlite(filtros, inicio, fim):
+    """WHERE parametrizado: nomes resolvidos para códigos (índices de vendas) e faixa de data_venda_iso"""
+    condicoes, params = [], []
+    for chave, (coluna, codigo, cadastro) in FILTROS_VENDAS.items():
+        valores = filtros.get(chave)
+        if valores is None:
+            continue
+        marcadores = ', '.join('?' for _ in valores)
+        if codigo:
+            condicoes.append(f"v.{codigo} IN (SELECT {codigo} FROM {cadastro} WHERE {coluna} IN ({marcadores}))")
+        else:
+            condicoes.append(f"v.{coluna} IN ({marcadores})")
+        params.extend(valores)
+    if inicio:
+        condicoes.append("v.data_venda_iso >= ?")
+        params.append(inicio)
+    if fim:
+        condicoes.append("v.data_venda_iso <= ?")
+        params.append(fim)
+    return condicoes, params
+
+def _filtros_supabase(query, filtros, inicio, fim):
+    for chave, (coluna, _, _) in FILTROS_VENDAS.items():
+        valores = filtros.get(chave)
+        if valores is not None:
+            query = query.in_(coluna, list(valores))
+    if inicio:
+        query = query.gte('data_venda_iso', inicio)
+    if fim:
+        query = query.lte('data_venda_iso', fim)
+    return query
+
+def _intervalo_iso(filtros):
+    inicio, fim = filtros.get('data_inicio'), filtros.get('data_fim')
+    return (data_iso(inicio.isoformat() if hasattr(inicio, 'isoformat') else inicio),
+            data_iso(fim.isoformat() if hasattr(fim, 'isoformat') else fim))
+
+def buscar_vendas_filtradas(filtros=None, restricoes=None, limit=None, offset=None, desde_id=None,
+                            ordenar_por='data_venda', decrescente=True):
+    """
+    Vendas que atendem aos filtros do dashboard, filtradas, ordenadas e paginadas
+    no banco - compatível com Supabase e SQLite.
+
+    `filtros`: listas de nomes em 'lojas', 'vendedores', 'produtos' e
+    'formas_pagamento' (None = sem filtro; lista vazia = nenhuma venda) e
+    'data_inicio'/'data_fim' (intervalo fechado sobre data_venda_iso).
+    `restricoes` (ver restricoes_perfil) limitam os filtros escolhidos.
+    `desde_id`: só vendas com id_venda acima dele (carga incremental).
+    `ordenar_por` (chave de ORDENACAO_VENDAS; padrão: mais recentes primeiro),
+    `decrescente`, `limit` e `offset` definem a página; id_venda desempata.
+    """
+    filtros = combinar_filtros(filtros, restricoes)
+    if any(filtros.get(chave) is not None and len(filtros[chave]) == 0 for chave in FILTROS_VENDAS):
+        return pd.DataFrame()
+    try:
+        inicio, fim = _intervalo_iso(filtros)
+        expressao, colunas_ordem = ORDENACAO_VENDAS.get(ordenar_por, ORDENACAO_VENDAS['data_venda'])
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                query = _filtros_supabase(conn.table('vendas').select('*'), filtros, inicio, fim)
+                if desde_id is not None:
+                    query = query.gt('id_venda', desde_id)
+                for coluna in colunas_ordem + ('id_venda',):
+                    query = query.order(coluna, desc=decrescente)
+                if limit:
+                    query = query.range(offset or 0, (offset or 0) + limit - 1)
+                elif offset:
+                    query = query.offset(offset)
+                response = query.execute()
+                df = pd.DataFrame(response.data)
+            else:
+                condicoes, params = _condicoes_filtros_sqlite(filtros, inicio, fim)
+                if desde_id is not None:
+                    condicoes.append("v.id_venda > ?")
+                    params.append(desde_id)
+                query = _consulta_vendas_sqlite(conn)
+                if condicoes:
+                    query += " WHERE " + " AND ".join(condicoes)
+                direcao = 'DESC' if decrescente else 'ASC'
+                query = f"SELECT * FROM ({query}) AS filtradas ORDER BY {expressao} {direcao}, id_venda {direcao}"
+                if limit or offset:
+                    query += f" LIMIT {int(limit) if limit else -1} OFFSET {int(offset or 0)}"
+
+                df = pd.read_sql_query(query, conn, params=params)
+
+            logger.info(f'📊 {len(df)} vendas carregadas do banco ({db_type})')
+            return df
     except Exception as e:
         logger.error(f'❌ Erro ao buscar vendas: {e}')
         return pd.DataFrame()
 
+def buscar_vendas(limit=None, data_inicio=None, data_fim=None):
+    """
+    Retorna as vendas (mais recentes primeiro) - compatível com Supabase e SQLite.
+    `data_inicio`/`data_fim` (date, datetime ou texto) filtram data_venda pelo
+    intervalo fechado, usando o índice de data_venda_iso.
+    """
+    return buscar_vendas_filtradas({'data_inicio': data_inicio, 'data_fim': data_fim}, limit=limit)
+
+def buscar_opcoes_filtros(restricoes=None):
+    """
+    Valores disponíveis para os filtros do dashboard (listas ordenadas por chave de
+    FILTROS_VENDAS) e o intervalo de data_venda ('data_min'/'data_max', aaaa-mm-dd),
+    considerando apenas as vendas permitidas pelas `restricoes` do perfil.
+    """
+    filtros = combinar_filtros({}, restricoes)
+    opcoes = dict({chave: [] for chave in FILTROS_VENDAS}, data_min=None, data_max=None)
+    if any(filtros.get(chave) is not None and len(filtros[chave]) == 0 for chave in FILTROS_VENDAS):
+        return opcoes
+    try:
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                colunas = [coluna for coluna, _, _ in FILTROS_VENDAS.values()] + ['data_venda_iso']
+                response = _filtros_supabase(conn.table('vendas').select(','.join(colunas)), filtros, None, None).execute()
+                df = pd.DataFrame(response.data, columns=colunas)
+                for chave, (coluna, _, _) in FILTROS_VENDAS.items():
+                    opcoes[chave] = sorted(df[coluna].dropna().unique().tolist())
+                datas = df['data_venda_iso'].dropna()
+                if not datas.empty:
+                    opcoes.update(data_min=datas.min(), data_max=datas.max())
+            else:
+                condicoes, params = _condicoes_filtros_sqlite(filtros, None, None)
+                where = " WHERE " + " AND ".join(condicoes) if condicoes else ""
+                consulta = f"SELECT * FROM ({_consulta_vendas_sqlite(conn)}{where})"
+                for chave, (coluna, _, _) in FILTROS_VENDAS.items():
+                    opcoes[chave] = [row[0] for row in conn.execute(
+                        f"SELECT DISTINCT {coluna} FROM ({consulta}) WHERE {coluna} IS NOT NULL ORDER BY 1", params)]
+                opcoes['data_min'], opcoes['data_max'] = conn.execute(
+                    f"SELECT MIN(v.data_venda_iso), MAX(v.data_venda_iso) FROM vendas v{where}", params).fetchone()
+            return opcoes
+    except Exception as e:
+        logger.error(f'❌ Erro ao buscar opções de filtros: {e}')
+        return opcoes
+
 def buscar_produtos():
     """Retorna todos os produtos"""
     try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase query
-            response = conn.table('produtos').select('*').order('nome_produto').execute()
-            df = pd.DataFrame(response.data)
-        else:
-            # SQLite query
-            df = pd.read_sql_query("SELECT * FROM produtos ORDER BY nome_produto", conn)
-            conn.close()
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase query
+                response = conn.table('produtos').select('*').order('nome_produto').execute()
+                df = pd.DataFrame(response.data)
+            else:
+                # SQLite query
+                df = pd.read_sql_query("SELECT * FROM produtos ORDER BY nome_produto", conn)
 
-        return df
+            return df
     except Exception as e:
         logger.error(f'Erro ao buscar produtos: {e}')
         return pd.DataFrame()
@@ -535,18 +1775,16 @@ def buscar_produtos():
 def buscar_lojas():
     """Retorna todas as lojas"""
     try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase query
-            response = conn.table('lojas').select('*').order('nome_loja').execute()
-            df = pd.DataFrame(response.data)
-        else:
-            # SQLite query
-            df = pd.read_sql_query("SELECT * FROM lojas ORDER BY nome_loja", conn)
-            conn.close()
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase query
+                response = conn.table('lojas').select('*').order('nome_loja').execute()
+                df = pd.DataFrame(response.data)
+            else:
+                # SQLite query
+                df = pd.read_sql_query("SELECT * FROM lojas ORDER BY nome_loja", conn)
 
-        return df
+            return df
     except Exception as e:
         logger.error(f'Erro ao buscar lojas: {e}')
         return pd.DataFrame()
@@ -554,18 +1792,16 @@ def buscar_lojas():
 def buscar_vendedores():
     """Retorna todos os vendedores"""
     try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase query
-            response = conn.table('vendedores').select('*').order('nome_vendedor').execute()
-            df = pd.DataFrame(response.data)
-        else:
-            # SQLite query
-            df = pd.read_sql_query("SELECT * FROM vendedores ORDER BY nome_vendedor", conn)
-            conn.close()
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase query
+                response = conn.table('vendedores').select('*').order('nome_vendedor').execute()
+                df = pd.DataFrame(response.data)
+            else:
+                # SQLite query
+                df = pd.read_sql_query("SELECT * FROM vendedores ORDER BY nome_vendedor", conn)
 
-        return df
+            return df
     except Exception as e:
         logger.error(f'Erro ao buscar vendedores: {e}')
         return pd.DataFrame()
@@ -573,71 +1809,69 @@ def buscar_vendedores():
 def carregar_usuarios():
     """Carrega usuários do banco de dados"""
     try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase query - get all users and filter in Python
-            response = conn.table('usuarios').select('*').execute()
-            rows = [row for row in response.data if row.get('ativo', True)]
-        else:
-            # SQLite query
-            cursor = conn.cursor()
-            cursor.execute("SELECT login, password, role, nome, loja, codigo_vendedor, permissions, ativo FROM usuarios WHERE ativo = 1")
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase query - get all users and filter in Python
+                response = conn.table('usuarios').select('*').execute()
+                rows = [row for row in response.data if row.get('ativo', True)]
+            else:
+                # SQLite query
+                cursor = conn.cursor()
+                cursor.execute("SELECT login, password, role, nome, loja, codigo_vendedor, permissions, ativo FROM usuarios WHERE ativo = 1")
 
-            try:
-                rows = cursor.fetchall()
-            except Exception as e:
-                if "no such column: ativo" in str(e):
-                    # Fallback query without ativo column
-                    cursor.execute("SELECT login, password, role, nome, loja, codigo_vendedor, permissions FROM usuarios")
+                try:
                     rows = cursor.fetchall()
-                    # Add default ativo value
-                    rows = [row + (1,) for row in rows]
+                except Exception as e:
+                    if "no such column: ativo" in str(e):
+                        # Fallback query without ativo column
+                        cursor.execute("SELECT login, password, role, nome, loja, codigo_vendedor, permissions FROM usuarios")
+                        rows = cursor.fetchall()
+                        # Add default ativo value
+                        rows = [row + (1,) for row in rows]
+                    else:
+                        raise
+
+
+            usuarios = {}
+            for row in rows:
+                if db_type == 'supabase':
+                    # Supabase returns dict
+                    login = row['login']
+                    password = row['password']
+                    role = row['role']
+                    nome = row['nome']
+                    loja = row['loja']
+                    codigo_vendedor = row.get('codigo_vendedor')
+                    permissions_str = row['permissions']
+                    ativo = row.get('ativo', True)
                 else:
-                    raise
-
-            conn.close()
-
-        usuarios = {}
-        for row in rows:
-            if db_type == 'supabase':
-                # Supabase returns dict
-                login = row['login']
-                password = row['password']
-                role = row['role']
-                nome = row['nome']
-                loja = row['loja']
-                codigo_vendedor = row.get('codigo_vendedor')
-                permissions_str = row['permissions']
-                ativo = row.get('ativo', True)
-            else:
-                # SQLite returns tuple
-                login, password, role, nome, loja, codigo_vendedor, permissions_str, ativo = row
+                    # SQLite returns tuple
+                    login, password, role, nome, loja, codigo_vendedor, permissions_str, ativo = row
 
-            try:
-                permissions = json.loads(permissions_str)
-            except:
-                permissions = {
-                    "ver_filtros": False,
-                    "ver_indicadores": True,
-                    "ver_graficos": True,
-                    "executar_pipeline": False,
-                    "analisar_todas_lojas": False,
-                    "upload_csv": False
+                try:
+                    permissions = json.loads(permissions_str)
+                except:
+                    permissions = {
+                        "ver_filtros": False,
+                        "ver_indicadores": True,
+                        "ver_graficos": True,
+                        "executar_pipeline": False,
+                        "analisar_todas_lojas": False,
+                        "upload_csv": False
+                    }
+
+                usuarios[login] = {
+                    "password": password,
+                    "role": role,
+                    "nome": nome,
+                    "loja": loja,
+                    "codigo_vendedor": codigo_vendedor,
+                    "permissions": permissions,
+                    "ativo": ativo if ativo is not None else True
                 }
 
-            usuarios[login] = {
-                "password": password,
-                "role": role,
-                "nome": nome,
-                "loja": loja,
-                "codigo_vendedor": codigo_vendedor,
-                "permissions": permissions,
-                "ativo": ativo if ativo is not None else True
-            }
-
-        logger.info(f'👥 {len(usuarios)} usuários carregados')
-        return usuarios
+            logger.info(f'👥 {len(usuarios)} usuários carregados')
+            return usuarios
 
     except Exception as e:
         logger.error(f'❌ Erro ao carregar usuários: {e}')
@@ -647,41 +1881,39 @@ def salvar_usuario(login, password, role, nome, loja, permissions, codigo_vended
     """Salva ou atualiza um usuário no banco"""
     try:
         permissions_str = json.dumps(permissions)
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase upsert
-            data = {
-                'login': login,
-                'password': password,
-                'role': role,
-                'nome': nome,
-                'loja': loja,
-                'codigo_vendedor': codigo_vendedor,
-                'permissions': permissions_str,
-                'ativo': ativo
-            }
-            response = conn.table('usuarios').upsert(data).execute()
-        else:
-            # SQLite
-            cursor = conn.cursor()
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase upsert
+                data = {
+                    'login': login,
+                    'password': password,
+                    'role': role,
+                    'nome': nome,
+                    'loja': loja,
+                    'codigo_vendedor': codigo_vendedor,
+                    'permissions': permissions_str,
+                    'ativo': ativo
+                }
+                response = conn.table('usuarios').upsert(data).execute()
+            else:
+                # SQLite
+                cursor = conn.cursor()
 
-            # Se codigo_vendedor é fornecido, garantir que existe
-            if codigo_vendedor:
-                cursor.execute("INSERT OR IGNORE INTO vendedores(codigo_vendedor, nome_vendedor) VALUES (?,?)",
-                            (codigo_vendedor, nome))
+                # Se codigo_vendedor é fornecido, garantir que existe
+                if codigo_vendedor:
+                    cursor.execute("INSERT OR IGNORE INTO vendedores(codigo_vendedor, nome_vendedor) VALUES (?,?)",
+                                (codigo_vendedor, nome))
 
-            # Inserir ou atualizar usuário
-            cursor.execute("""
-                INSERT OR REPLACE INTO usuarios (login, password, role, nome, loja, codigo_vendedor, permissions, ativo)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (login, password, role, nome, loja, codigo_vendedor, permissions_str, 1 if ativo else 0))
+                # Inserir ou atualizar usuário
+                cursor.execute("""
+                    INSERT OR REPLACE INTO usuarios (login, password, role, nome, loja, codigo_vendedor, permissions, ativo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (login, password, role, nome, loja, codigo_vendedor, permissions_str, 1 if ativo else 0))
 
-            conn.commit()
-            conn.close()
+                conn.commit()
 
-        logger.info(f'✅ Usuário {login} salvo/atualizado')
-        return True
+            logger.info(f'✅ Usuário {login} salvo/atualizado')
+            return True
 
     except Exception as e:
         logger.error(f'❌ Erro ao salvar usuário {login}: {e}')
@@ -690,20 +1922,18 @@ def salvar_usuario(login, password, role, nome, loja, permissions, codigo_vended
 def deletar_usuario(login):
     """Deleta um usuário do banco"""
     try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase delete
-            response = conn.table('usuarios').delete().eq('login', login).execute()
-        else:
-            # SQLite delete
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM usuarios WHERE login = ?", (login,))
-            conn.commit()
-            conn.close()
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase delete
+                response = conn.table('usuarios').delete().eq('login', login).execute()
+            else:
+                # SQLite delete
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM usuarios WHERE login = ?", (login,))
+                conn.commit()
 
-        logger.info(f'✅ Usuário {login} deletado')
-        return True
+            logger.info(f'✅ Usuário {login} deletado')
+            return True
     except Exception as e:
         logger.error(f'❌ Erro ao deletar usuário {login}: {e}')
         return False
@@ -711,35 +1941,34 @@ def deletar_usuario(login):
 def gerar_proximo_codigo_vendedor():
     """Gera o próximo código de vendedor sequencial (V001, V002, etc.)"""
     try:
-        conn, db_type = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as (conn, db_type):
+            cursor = conn.cursor()
         
-        if db_type == 'postgresql':
-            cursor.execute("SELECT codigo_vendedor FROM vendedores WHERE codigo_vendedor LIKE 'V%'")
-        else:
-            cursor.execute("SELECT codigo_vendedor FROM vendedores WHERE codigo_vendedor LIKE 'V%'")
+            if db_type == 'postgresql':
+                cursor.execute("SELECT codigo_vendedor FROM vendedores WHERE codigo_vendedor LIKE 'V%'")
+            else:
+                cursor.execute("SELECT codigo_vendedor FROM vendedores WHERE codigo_vendedor LIKE 'V%'")
         
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
         
-        if not rows:
-            return "V001"
+            if not rows:
+                return "V001"
         
-        # Extrai os números
-        nums = []
-        for row in rows:
-            if row[0] and row[0].startswith('V'):
-                try:
-                    num = int(row[0][1:])
-                    nums.append(num)
-                except ValueError:
-                    pass
+            # Extrai os números
+            nums = []
+            for row in rows:
+                if row[0] and row[0].startswith('V'):
+                    try:
+                        num = int(row[0][1:])
+                        nums.append(num)
+                    except ValueError:
+                        pass
         
-        if not nums:
-            return "V001"
+            if not nums:
+                return "V001"
         
-        next_num = max(nums) + 1
-        return f"V{next_num:03d}"
+            next_num = max(nums) + 1
+            return f"V{next_num:03d}"
         
     except Exception as e:
         logger.error(f'Erro ao gerar código vendedor: {e}')
@@ -748,40 +1977,38 @@ def gerar_proximo_codigo_vendedor():
 def verificar_estado_banco():
     """Verifica o estado atual do banco e retorna estatísticas"""
     try:
-        conn, db_type = get_db_connection()
-
-        if db_type == 'supabase':
-            # Supabase - get table counts
-            tabelas = ['vendas', 'produtos', 'lojas', 'vendedores', 'usuarios', 'loja_vendedor']
-            estatisticas = {}
+        with db_connection() as (conn, db_type):
+            if db_type == 'supabase':
+                # Supabase - get table counts
+                tabelas = ['vendas', 'produtos', 'lojas', 'vendedores', 'usuarios', 'loja_vendedor']
+                estatisticas = {}
 
-            for table_name in tabelas:
-                try:
-                    response = conn.table(table_name).select('*', count='exact').execute()
-                    estatisticas[table_name] = response.count
-                except Exception as e:
-                    logger.debug(f"Erro ao contar {table_name}: {e}")
-                    estatisticas[table_name] = 0
-        else:
-            # SQLite
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-            tabelas = cursor.fetchall()
+                for table_name in tabelas:
+                    try:
+                        response = conn.table(table_name).select('*', count='exact').execute()
+                        estatisticas[table_name] = response.count
+                    except Exception as e:
+                        logger.debug(f"Erro ao contar {table_name}: {e}")
+                        estatisticas[table_name] = 0
+            else:
+                # SQLite
+                cursor = conn.cursor()
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+                tabelas = cursor.fetchall()
 
-            estatisticas = {}
-            for tabela in tabelas:
-                table_name = tabela[0]
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                estatisticas[table_name] = count
+                estatisticas = {}
+                for tabela in tabelas:
+                    table_name = tabela[0]
+                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                    count = cursor.fetchone()[0]
+                    estatisticas[table_name] = count
 
-            conn.close()
 
-        logger.info("📊 Estatísticas do banco:")
-        for tabela, count in estatisticas.items():
-            logger.info(f"   - {tabela}: {count} registros")
+            logger.info("📊 Estatísticas do banco:")
+            for tabela, count in estatisticas.items():
+                logger.info(f"   - {tabela}: {count} registros")
 
-        return estatisticas
+            return estatisticas
 
     except Exception as e:
         logger.error(f'Erro ao verificar estado do banco: {e}')
@@ -1,6 +1,14 @@
 import pandas as pd
 import os
 
+# Colunas esperadas
+COLUNAS_ESPERADAS = [
+    "id_cliente", "nome_cliente", "data_nascimento", "rg", "cpf", "endereco",
+    "numero", "complemento", "bairro", "cidade", "estado", "cep", "telefone",
+    "codigo_produto", "nome_produto", "quantidade", "valor_produto", "forma_pagamento",
+    "codigo_loja", "nome_loja", "codigo_vendedor", "nome_vendedor"
+]
+
 def carregar_dados(caminho_csv="data/raw/vendas.csv"):
     """
     Carrega os dados do CSV original.
@@ -32,15 +40,8 @@ def tratar_dados(df):
     # Remove duplicatas
     df = df.drop_duplicates()
 
-    # Colunas esperadas
-    colunas_esperadas = [
-        "id_cliente", "nome_cliente", "data_nascimento", "rg", "cpf", "endereco",
-        "numero", "complemento", "bairro", "cidade", "estado", "cep", "telefone",
-        "codigo_produto", "nome_produto", "quantidade", "valor_produto", "forma_pagamento",
-        "codigo_loja", "nome_loja", "codigo_vendedor", "nome_vendedor"
-    ]
-
     # Adiciona colunas faltantes
+    colunas_esperadas = COLUNAS_ESPERADAS
     for col in colunas_esperadas:
         if col not in df.columns:
             df[col] = ""
@@ -54,3 +55,23 @@ def tratar_dados(df):
 
     print("✅ Dados tratados e colunas padronizadas.")
     return df
+
+
+def tratar_chunk(df):
+    """
+    Tratamento de tratar_dados para um chunk de um CSV lido em streaming:
+    - Remove duplicatas dentro do chunk (a memória não cresce com o arquivo;
+      repetições entre chunks são barradas pelo índice de CPFs na gravação)
+    - Adiciona colunas esperadas faltantes
+    A ordenação por id_cliente exigiria o arquivo inteiro e não é feita; as
+    demais colunas do arquivo (datas da venda, status...) são mantidas.
+    """
+    if df.empty:
+        return df
+
+    df = df.drop_duplicates()
+
+    faltantes = {col: "" for col in COLUNAS_ESPERADAS if col not in df.columns}
+    if faltantes:
+        df = df.assign(**faltantes)
+    return df
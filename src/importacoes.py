@@ -0,0 +1,141 @@
+# src/importacoes.py
+"""
+Impressão digital de arquivos importados (sha256 do conteúdo + tamanho).
+
+Permite ao pipeline:
+- pular arquivos já carregados (busca do hash na tabela importacoes);
+- carregar apenas as linhas novas de um arquivo que foi estendido, quando o
+  início dele é idêntico (byte a byte) a um arquivo importado anteriormente.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from src.db_utils import buscar_importacao_por_hash, buscar_importacoes_menores, registrar_importacao
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO = 1024 * 1024
+
+def _abrir_fonte(fonte):
+    """
+    Retorna (arquivo, nome, deve_fechar) para caminho, bytes ou objeto de arquivo.
+    Arquivos abertos em modo texto são lidos pelo buffer binário (os bytes do
+    disco, como em tamanho_bytes); texto só em memória (StringIO) é lido como
+    texto e codificado em UTF-8 por calcular_impressao.
+    """
+    if isinstance(fonte, (str, os.PathLike)):
+        return open(fonte, 'rb'), os.path.basename(os.fspath(fonte)), True
+    if isinstance(fonte, (bytes, bytearray)):
+        return io.BytesIO(fonte), 'upload.csv', True
+    nome = os.path.basename(getattr(fonte, 'name', '') or 'upload.csv')
+    if isinstance(fonte, io.TextIOBase) and hasattr(fonte, 'buffer'):
+        fonte.seek(0)  # descarta o que o wrapper de texto já leu do buffer
+        return fonte.buffer, nome, False
+    return fonte, nome, False
+
+def calcular_impressao(fonte, tamanhos_prefixo=()):
+    """
+    Calcula sha256 e tamanho da fonte em uma única leitura.
+
+    Para cada tamanho em `tamanhos_prefixo` também calcula o hash dos primeiros
+    bytes até aquele tamanho (usado para reconhecer arquivos estendidos).
+    Tamanhos e prefixos são sempre contados em bytes, também para objetos de
+    arquivo em modo texto. Objetos de arquivo são devolvidos à posição inicial.
+    """
+    arquivo, nome, deve_fechar = _abrir_fonte(fonte)
+    try:
+        if not deve_fechar:
+            arquivo.seek(0)
+        hasher = hashlib.sha256()
+        pendentes = sorted(set(t for t in tamanhos_prefixo if t > 0))
+        hashes_prefixo = {}
+        lidos = 0
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            if isinstance(bloco, str):
+                bloco = bloco.encode('utf-8')
+            # Prefixos que terminam dentro do bloco: hash até o byte exato
+            while pendentes and lidos + len(bloco) >= pendentes[0]:
+                corte = pendentes[0] - lidos
+                hasher.update(bloco[:corte])
+                lidos += corte
+                bloco = bloco[corte:]
+                hashes_prefixo[pendentes.pop(0)] = hasher.copy().hexdigest()
+            hasher.update(bloco)
+            lidos += len(bloco)
+        return {
+            'nome_arquivo': nome,
+            'hash_arquivo': hasher.hexdigest(),
+            'tamanho_bytes': lidos,
+            'hashes_prefixo': hashes_prefixo
+        }
+    finally:
+        if deve_fechar:
+            arquivo.close()
+        else:
+            arquivo.seek(0)
+            if arquivo is not fonte:
+                fonte.seek(0)
+
+def _tamanho_fonte(fonte):
+    if isinstance(fonte, (str, os.PathLike)):
+        return os.path.getsize(fonte)
+    if isinstance(fonte, (bytes, bytearray)):
+        return len(fonte)
+    if isinstance(fonte, io.TextIOBase):
+        if hasattr(fonte, 'buffer'):
+            fonte.seek(0)
+            return _tamanho_fonte(fonte.buffer)
+        # Texto em memória: tamanho em bytes UTF-8, como calcular_impressao o conta
+        posicao = fonte.tell()
+        fonte.seek(0)
+        tamanho = sum(len(bloco.encode('utf-8')) for bloco in iter(lambda: fonte.read(TAMANHO_BLOCO), ''))
+        fonte.seek(posicao)
+        return tamanho
+    posicao = fonte.tell()
+    fonte.seek(0, os.SEEK_END)
+    tamanho = fonte.tell()
+    fonte.seek(posicao)
+    return tamanho
+
+def planejar_importacao(fonte):
+    """
+    Decide o que fazer com um arquivo de entrada:
+    - 'pular': o mesmo conteúdo já foi importado;
+    - 'incremental': o arquivo começa com um arquivo já importado; apenas as
+      linhas após `linhas_ja_importadas` precisam ser carregadas;
+    - 'completa': arquivo novo.
+    """
+    candidatas = buscar_importacoes_menores(_tamanho_fonte(fonte))
+    impressao = calcular_impressao(fonte, [c['tamanho_bytes'] for c in candidatas])
+    hashes_prefixo = impressao.pop('hashes_prefixo')
+
+    plano = dict(impressao, acao='completa', linhas_ja_importadas=0)
+
+    anterior = buscar_importacao_por_hash(impressao['hash_arquivo'])
+    if anterior:
+        logger.info(f"⏭️ Arquivo {impressao['nome_arquivo']} já importado em {anterior.get('data_importacao')}")
+        plano.update(acao='pular', linhas_ja_importadas=anterior.get('total_registros') or 0)
+        return plano
+
+    # Maior arquivo importado que é prefixo exato deste
+    prefixos = [c for c in candidatas if hashes_prefixo.get(c['tamanho_bytes']) == c['hash_arquivo']]
+    if prefixos:
+        prefixo = max(prefixos, key=lambda c: c['tamanho_bytes'])
+        plano.update(acao='incremental', linhas_ja_importadas=prefixo['total_registros'] or 0)
+        logger.info(f"➕ Arquivo {impressao['nome_arquivo']} estendido: "
+                    f"{plano['linhas_ja_importadas']} linhas já importadas serão ignoradas")
+    return plano
+
+def registrar_resultado(plano, total_registros, registros_importados, registros_com_erro=0,
+                        usuario=None, status='CONCLUIDA'):
+    """Grava em importacoes o resultado da importação planejada por planejar_importacao"""
+    return registrar_importacao(
+        plano['nome_arquivo'], plano['hash_arquivo'], plano['tamanho_bytes'],
+        total_registros, registros_importados, registros_com_erro,
+        usuario_importacao=usuario or plano.get('usuario_importacao'), status=status
+    )
@@ -0,0 +1,157 @@
+# src/indice_cpf.py
+"""
+Índice de CPFs já gravados em vendas, carregado uma vez por execução do pipeline.
+
+- Modo memória: conjunto com todos os CPFs do banco; duplicatas são detectadas
+  sem nenhuma consulta por linha.
+- Modo Bloom: um filtro de Bloom persistido em data/db/ descarta em memória os
+  CPFs certamente novos; apenas os "talvez existentes" são confirmados no banco.
+  Serve para históricos grandes demais para carregar CPF a CPF.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+class FiltroBloom:
+    """Filtro de Bloom simples (bytearray + hash duplo sobre blake2b)"""
+
+    def __init__(self, capacidade, taxa_falso_positivo=0.001):
+        capacidade = max(int(capacidade), 1000)
+        self.capacidade = capacidade
+        self.taxa_falso_positivo = taxa_falso_positivo
+        self.num_bits = max(8, int(-capacidade * math.log(taxa_falso_positivo) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacidade * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.quantidade = 0
+
+    def _posicoes(self, valor):
+        digest = hashlib.blake2b(str(valor).encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def adicionar(self, valor):
+        for pos in self._posicoes(valor):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.quantidade += 1
+
+    def __contains__(self, valor):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posicoes(valor))
+
+    @property
+    def cheio(self):
+        return self.quantidade > self.capacidade
+
+    def salvar(self, caminho, metadados=None):
+        """Grava uma linha JSON de metadados seguida dos bits (escrita atômica)"""
+        cabecalho = dict(metadados or {}, capacidade=self.capacidade, taxa_falso_positivo=self.taxa_falso_positivo,
+                         num_bits=self.num_bits, num_hashes=self.num_hashes, quantidade=self.quantidade)
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(json.dumps(cabecalho).encode('utf-8') + b'\n')
+            f.write(self.bits)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Retorna (filtro, metadados) ou (None, None) se o arquivo não existe ou é inválido"""
+        try:
+            with open(caminho, 'rb') as f:
+                cabecalho = json.loads(f.readline().decode('utf-8'))
+                bits = f.read()
+            filtro = cls(cabecalho['capacidade'], cabecalho['taxa_falso_positivo'])
+            if filtro.num_bits != cabecalho['num_bits'] or len(bits) != len(filtro.bits):
+                raise ValueError('tamanho do filtro não confere')
+            filtro.num_hashes = cabecalho['num_hashes']
+            filtro.bits = bytearray(bits)
+            filtro.quantidade = cabecalho['quantidade']
+            return filtro, cabecalho
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Filtro de Bloom inválido em {caminho}, será reconstruído: {e}")
+            return None, None
+
+class IndiceCPF:
+    """
+    CPFs existentes em vendas (SQLite). Use `IndiceCPF.carregar(conn)` no início
+    da execução, `existentes(conn, cpfs)` para checar um lote e `adicionar(cpfs)`
+    após confirmar a gravação. No modo Bloom, `salvar()` persiste o filtro.
+    """
+
+    def __init__(self, cpfs=None, bloom=None, caminho_bloom=None, ultimo_id=0):
+        self.cpfs = cpfs
+        self.bloom = bloom
+        self.caminho_bloom = caminho_bloom
+        self.ultimo_id = ultimo_id
+        self.consultas_banco = 0
+
+    @classmethod
+    def carregar(cls, conn, caminho_bloom=None, taxa_falso_positivo=0.001):
+        """
+        Sem `caminho_bloom`, carrega todos os CPFs em memória. Com ele, carrega o
+        filtro persistido e acrescenta apenas as vendas com id_venda maior que o
+        último já incluído (ou reconstrói o filtro se não existir / estiver cheio).
+        """
+        if caminho_bloom is None:
+            cpfs = {row[0] for row in conn.execute("SELECT DISTINCT cpf FROM vendas WHERE cpf IS NOT NULL")}
+            logger.info(f"🗂️ Índice de CPFs carregado: {len(cpfs)} CPFs")
+            return cls(cpfs=cpfs)
+
+        bloom, metadados = FiltroBloom.carregar(caminho_bloom)
+        ultimo_id = metadados.get('ultimo_id', 0) if metadados else 0
+        total = conn.execute("SELECT COUNT(*) FROM vendas").fetchone()[0]
+        if bloom is None or bloom.cheio or bloom.capacidade < total:
+            bloom = FiltroBloom(max(total * 2, 100000), taxa_falso_positivo)
+            ultimo_id = 0
+            logger.info(f"🌸 Construindo filtro de Bloom de CPFs ({total} vendas)")
+
+        novos = 0
+        for id_venda, cpf in conn.execute("SELECT id_venda, cpf FROM vendas WHERE id_venda > ? ORDER BY id_venda",
+                                          (ultimo_id,)):
+            if cpf:
+                bloom.adicionar(cpf)
+            ultimo_id = id_venda
+            novos += 1
+        logger.info(f"🌸 Filtro de Bloom de CPFs pronto ({novos} vendas novas incluídas)")
+
+        indice = cls(bloom=bloom, caminho_bloom=caminho_bloom, ultimo_id=ultimo_id)
+        indice.salvar()
+        return indice
+
+    def existentes(self, conn, cpfs, consultar_banco=None):
+        """
+        Subconjunto de `cpfs` já gravados. No modo Bloom, os candidatos que passam
+        pelo filtro são confirmados com `consultar_banco(conn, candidatos)`.
+        """
+        if self.cpfs is not None:
+            return {cpf for cpf in cpfs if cpf in self.cpfs}
+
+        candidatos = [cpf for cpf in cpfs if cpf in self.bloom]
+        if not candidatos:
+            return set()
+        self.consultas_banco += 1
+        return consultar_banco(conn, candidatos)
+
+    def adicionar(self, cpfs):
+        """
+        Inclui CPFs recém-gravados. No modo Bloom o último id_venda coberto não
+        avança: na próxima carga essas vendas são relidas (inclusão idempotente),
+        o que também cobre vendas gravadas por fora do pipeline.
+        """
+        for cpf in cpfs:
+            if not cpf:
+                continue
+            if self.cpfs is not None:
+                self.cpfs.add(cpf)
+            else:
+                self.bloom.adicionar(cpf)
+
+    def salvar(self):
+        if self.bloom is not None and self.caminho_bloom:
+            self.bloom.salvar(self.caminho_bloom, {'ultimo_id': self.ultimo_id})
@@ -3,13 +3,29 @@
 Migration script to ensure loja_vendedor relationship and triggers are present
 and that the lojas table has a sellers_finalized column.
 
-This script is idempotent: it will add the column if missing, drop and recreate
-relevant triggers, execute the SQL in data/db/schema.sql to create the
-junction table and triggers, and set sellers_finalized=1 for stores that
-already have 2 sellers.
+This script is idempotent: it will add the column if missing, add the file
+fingerprint columns to importacoes, drop and recreate relevant triggers,
+execute the SQL in data/db/schema.sql to create the junction table and
+triggers, and set sellers_finalized=1 for stores that already have 2 sellers.
+
+The per-sale audit trigger (trg_vendas_after_insert_log, one sistema_logs row
+per inserted sale) is optional: the pipeline writes one summary entry per
+import/chunk instead. Use --sale-log-trigger off to drop it, on to (re)create
+it; the default (keep) preserves the current state of an existing database.
+
+Dates are stored as dd/mm/yyyy text; the sortable data_venda_iso/data_compra_iso
+columns (yyyy-mm-dd) are added and backfilled here, the old text-date indexes
+are replaced by indexes on the ISO columns, and the report views that group or
+filter by date are recreated on top of them.
+
+The daily summary table (vendas_resumo_diario) is rebuilt from vendas on every
+run. The seller, product and store performance views and vw_dashboard_resumo
+read it through vw_vendas_resumo_atual, which also groups the sales written
+after the summary watermark, so they stay current between refreshes.
 
 Usage:
     python src/migrations/ensure_loja_vendedor.py [--db /path/to/vendas.db] [--schema path/to/schema.sql]
+        [--sale-log-trigger {keep,on,off}]
 
 Defaults assume the repository layout and will use:
     data/db/vendas.db
@@ -24,6 +40,12 @@ import sys
 
 DEFAULT_DB = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'db', 'vendas.db'))
 DEFAULT_SCHEMA = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'db', 'schema.sql'))
+SALE_LOG_TRIGGER = 'trg_vendas_after_insert_log'
+DATE_COLUMNS = ('data_venda', 'data_compra')
+# Views recreated from schema.sql (their definitions use the ISO date columns or the daily summary);
+# views reading vw_vendas_resumo_atual are listed before it
+DATE_VIEWS = ('vw_vendas_consolidadas', 'vw_performance_vendedores', 'vw_performance_lojas',
+              'vw_produtos_mais_vendidos', 'vw_vendas_mensais', 'vw_dashboard_resumo', 'vw_vendas_resumo_atual')
 
 
 def read_file(path):
@@ -42,6 +64,76 @@ def column_exists(conn, table_name, column_name):
     return column_name in cols
 
 
+def trigger_exists(conn, trigger_name):
+    cur = conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name=?", (trigger_name,))
+    return cur.fetchone() is not None
+
+
+def iso_date_sql(column):
+    """SQL expression converting a d/m/yyyy, dd/mm/yyyy (or yyyy-mm-dd) text column to yyyy-mm-dd (NULL if invalid)"""
+    text = f"trim({column})"
+    # (GLOB prefix, position of day, month and year) for one- or two-digit day/month
+    formats = [
+        ('[0-9][0-9]/[0-9][0-9]/', 1, 4, 7),
+        ('[0-9]/[0-9][0-9]/', 1, 3, 6),
+        ('[0-9][0-9]/[0-9]/', 1, 4, 6),
+        ('[0-9]/[0-9]/', 1, 3, 5),
+    ]
+    cases = []
+    for prefix, day, month, year in formats:
+        cases.append(
+            f"WHEN {text} GLOB '{prefix}[0-9][0-9][0-9][0-9]' THEN substr({text}, {year}, 4) || '-' || "
+            f"substr('0' || substr({text}, {month}, {year - month - 1}), -2) || '-' || "
+            f"substr('0' || substr({text}, {day}, {month - day - 1}), -2)"
+        )
+    iso = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+    cases.append(f"WHEN {text} GLOB '{iso}' OR {text} GLOB '{iso}[^0-9]*' THEN substr({text}, 1, 10)")
+    # date(d, '+0 days') returns NULL for out-of-range months/days and normalizes
+    # impossible days (Feb 31 -> Mar 2): keep only dates that round-trip unchanged
+    return f"(SELECT CASE WHEN date(d, '+0 days') = d THEN d END FROM (SELECT CASE {' '.join(cases)} END AS d))"
+
+
+def ensure_iso_date_columns(conn):
+    """Add and backfill data_venda_iso/data_compra_iso; drop indexes and views they supersede"""
+    for column in DATE_COLUMNS:
+        if not column_exists(conn, 'vendas', f'{column}_iso'):
+            print(f'Adding {column}_iso column to vendas')
+            conn.execute(f"ALTER TABLE vendas ADD COLUMN {column}_iso TEXT;")
+        cur = conn.execute(f"UPDATE vendas SET {column}_iso = {iso_date_sql(column)} "
+                           f"WHERE {column}_iso IS NULL AND {column} IS NOT NULL "
+                           f"AND ({iso_date_sql(column)}) IS NOT NULL;")
+        print(f'Backfilled {column}_iso in {cur.rowcount} rows')
+        conn.execute(f"DROP INDEX IF EXISTS idx_vendas_{column};")
+    for view in DATE_VIEWS:
+        conn.execute(f"DROP VIEW IF EXISTS {view};")
+
+
+def rebuild_daily_summary(conn):
+    """Recompute vendas_resumo_diario from vendas and reset its id_venda watermark"""
+    # table_xinfo also lists generated columns such as valor_total
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo('vendas')")}
+    if 'valor_total' in columns:
+        value, join = "v.valor_total", ""
+    elif 'valor_produto' in columns:
+        value, join = "v.valor_produto * v.quantidade", ""
+    else:
+        value = "COALESCE(p.valor_produto, 0) * v.quantidade"
+        join = "LEFT JOIN produtos p ON p.codigo_produto = v.codigo_produto"
+    conn.execute("DELETE FROM vendas_resumo_diario;")
+    cur = conn.execute(f"""
+        INSERT INTO vendas_resumo_diario (dia, codigo_loja, codigo_vendedor, codigo_produto, forma_pagamento,
+                                          total_vendas, quantidade_total, valor_total)
+        SELECT v.data_venda_iso, v.codigo_loja, v.codigo_vendedor, v.codigo_produto,
+               COALESCE(v.forma_pagamento, ''), COUNT(*), SUM(v.quantidade), COALESCE(SUM({value}), 0)
+        FROM vendas v {join}
+        WHERE v.data_venda_iso IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5;
+    """)
+    conn.execute("INSERT OR REPLACE INTO vendas_resumo_controle (id, ultimo_id_venda) "
+                 "SELECT 1, COALESCE(MAX(id_venda), 0) FROM vendas;")
+    print(f'Rebuilt daily sales summary ({cur.rowcount} groups)')
+
+
 def drop_triggers(conn, trigger_names):
     for trg in trigger_names:
         try:
@@ -55,6 +147,8 @@ def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('--db', default=DEFAULT_DB, help='Path to vendas.db')
     parser.add_argument('--schema', default=DEFAULT_SCHEMA, help='Path to schema.sql')
+    parser.add_argument('--sale-log-trigger', choices=['keep', 'on', 'off'], default='keep',
+                        help='Per-sale sistema_logs trigger: keep current state (default), on or off')
     args = parser.parse_args(argv)
 
     db_path = os.path.abspath(args.db)
@@ -76,6 +170,11 @@ def main(argv=None):
         conn.execute('PRAGMA foreign_keys = ON;')
         conn.isolation_level = None  # autocommit for executescript sections
 
+        # schema.sql always recreates the per-sale log trigger; remember whether it was disabled
+        sale_log_enabled = args.sale_log_trigger == 'on' or (
+            args.sale_log_trigger == 'keep'
+            and (not table_exists(conn, 'vendas') or trigger_exists(conn, SALE_LOG_TRIGGER)))
+
         # Ensure lojas table exists; if not, applying schema will create everything
         if not table_exists(conn, 'lojas'):
             print('lojas table not found; applying full schema.sql to create base tables/triggers')
@@ -88,6 +187,20 @@ def main(argv=None):
             else:
                 print('lojas.sellers_finalized column already exists')
 
+            # importacoes created before file fingerprints: add the columns the
+            # schema's idx_importacoes_hash index needs
+            if table_exists(conn, 'importacoes'):
+                for column, col_type in (('hash_arquivo', 'TEXT'), ('tamanho_bytes', 'INTEGER')):
+                    if not column_exists(conn, 'importacoes', column):
+                        print(f'Adding {column} column to importacoes')
+                        conn.execute(f"ALTER TABLE importacoes ADD COLUMN {column} {col_type};")
+
+            # ISO date columns must exist before schema.sql creates their indexes
+            if table_exists(conn, 'vendas'):
+                conn.execute("BEGIN;")
+                ensure_iso_date_columns(conn)
+                conn.execute("COMMIT;")
+
             # Drop triggers that we will recreate to ensure updated definitions
             triggers_to_manage = [
                 'trg_loja_vendedor_before_insert',
@@ -109,6 +222,15 @@ def main(argv=None):
             conn.execute("UPDATE lojas SET sellers_finalized = 1 WHERE codigo_loja IN (SELECT codigo_loja FROM loja_vendedor GROUP BY codigo_loja HAVING COUNT(*) = 2);")
             conn.execute("COMMIT;")
 
+        if table_exists(conn, 'vendas_resumo_diario'):
+            conn.execute("BEGIN;")
+            rebuild_daily_summary(conn)
+            conn.execute("COMMIT;")
+
+        if not sale_log_enabled:
+            drop_triggers(conn, [SALE_LOG_TRIGGER])
+            print('Per-sale log trigger disabled (pipeline writes batched audit entries)')
+
         print('Migration completed successfully')
     finally:
         conn.close()
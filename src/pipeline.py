@@ -2,13 +2,27 @@
 import pandas as pd
 import datetime
 import os
-from src.validacao import corrigir_linha, validar_linha
-from src.db_utils import inserir_linha, ensure_store_sellers_from_df, get_db_connection
+from src.validacao import corrigir_df, validar_df
+from src.etl import tratar_chunk
+from src.db_utils import (inserir_lote, ensure_store_sellers_from_df, db_connection, carregar_indice_cpf,
+                          suspender_indices_vendas, restaurar_indices_vendas, ultimo_id_venda,
+                          registrar_auditoria_vendas, atualizar_resumo_vendas,
+                          reconstruir_resumo_vendas)
+from src.importacoes import planejar_importacao, registrar_resultado, calcular_impressao
+from src.acumuladores import AmostraReservatorio, CsvErrosRotativo
+from src.checkpoints import impressao_dataframe, carregar_checkpoint, salvar_checkpoint, remover_checkpoint
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 import logging
 import json
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
 # Configurar logging
 logging.basicConfig(
@@ -18,6 +32,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Quantos chunks podem ficar aguardando entre um estágio e o próximo
+PROFUNDIDADE_FILA = int(os.getenv("PIPELINE_QUEUE_DEPTH", "2"))
+
+# Linhas mantidas na amostra do relatório e linhas por arquivo do CSV de erros
+TAMANHO_AMOSTRA_RELATORIO = 1000
+MAX_LINHAS_CSV_ERROS = int(os.getenv("PIPELINE_ERROR_CSV_MAX_LINES", "100000"))
+
+# Usar filtro de Bloom persistido (em vez de todos os CPFs em memória) na checagem de duplicatas
+USAR_BLOOM_CPF = os.getenv("PIPELINE_CPF_BLOOM", "0") == "1"
+
+# Carga em bloco no SQLite (tabela temporária + regras dos triggers aplicadas em SQL)
+CARGA_EM_BLOCO = os.getenv("PIPELINE_BULK_LOAD", "0") == "1"
+# A partir de quantas linhas a carga em bloco suspende e recria os índices secundários de vendas
+MIN_LINHAS_RECRIAR_INDICES = int(os.getenv("PIPELINE_BULK_INDEX_REBUILD_MIN_ROWS", "100000"))
+
+# Auditoria em sistema_logs: 'importacao' (um resumo por execução), 'chunk' (também um por chunk) ou 'nenhuma'
+NIVEL_AUDITORIA = os.getenv("PIPELINE_AUDIT_LEVEL", "importacao")
+
 def validar_e_padronizar_csv(df):
     """Valida estrutura do CSV e padroniza colunas obrigatórias"""
 
@@ -219,19 +251,30 @@ def preparar_dados_para_insercao(row):
     
     return dados_insercao
 
-def processar_chunk(df_chunk, start_idx):
-    """Processa um chunk de dados e retorna estatísticas"""
-    linhas_corrigidas = []
+def corrigir_e_validar(df_chunk):
+    """Corrige e valida um DataFrame inteiro (vetorizado); retorna (df_corrigido, erros_por_linha)"""
+    df_corrigido = corrigir_df(df_chunk)
+    return df_corrigido, validar_df(df_corrigido)
+
+def validar_chunk(df_chunk, start_idx=0):
+    """
+    Etapa de CPU do chunk: corrige, valida e prepara as linhas para inserção.
+    Não acessa o banco, podendo rodar em outro processo.
+    Retorna (lote, erros_chunk, falhas_preparo, tempos), com lote = [(indice, dados_insercao), ...]
+    e tempos = segundos gastos em {'correcao', 'validacao'}.
+    """
     erros_chunk = {}
-    inseridos_chunk = 0
-    erros_insercao_chunk = 0
-    
-    for idx, row in df_chunk.iterrows():
-        try:
-            # Corrigir e validar linha
-            row_corrigida = corrigir_linha(row)
-            erros = validar_linha(row_corrigida)
+    falhas_preparo = 0
 
+    # Corrigir e validar o chunk inteiro de uma vez (vetorizado)
+    inicio = time.perf_counter()
+    df_corrigido = corrigir_df(df_chunk)
+    fim_correcao = time.perf_counter()
+    erros_por_linha = validar_df(df_corrigido)
+
+    lote = []
+    for idx, row_corrigida, erros in zip(df_corrigido.index, df_corrigido.to_dict('records'), erros_por_linha):
+        try:
             # Preparar dados para inserção
             dados_insercao = preparar_dados_para_insercao(row_corrigida)
             dados_insercao['erros'] = ", ".join(erros) if erros else ""
@@ -240,33 +283,466 @@ def processar_chunk(df_chunk, start_idx):
             for erro in erros:
                 erros_chunk[erro] = erros_chunk.get(erro, 0) + 1
 
-            # Inserir no banco
-            sucesso_insercao = inserir_linha(dados_insercao)
-            if sucesso_insercao:
-                inseridos_chunk += 1
-            else:
-                erros_insercao_chunk += 1
-
-            # Manter para relatório
-            linha_relatorio = dados_insercao.copy()
-            linha_relatorio['indice_original'] = idx
-            linhas_corrigidas.append(linha_relatorio)
+            lote.append((idx, dados_insercao))
 
         except Exception as e:
-            erros_insercao_chunk += 1
+            falhas_preparo += 1
             logger.error(f"❌ Erro ao processar linha {idx}: {e}")
             continue
-    
-    return linhas_corrigidas, erros_chunk, inseridos_chunk, erros_insercao_chunk
 
-def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv", chunk_size=500):
+    tempos = {'correcao': fim_correcao - inicio, 'validacao': time.perf_counter() - fim_correcao}
+    return lote, erros_chunk, falhas_preparo, tempos
+
+def gravar_chunk(lote, indice_cpf=None, carga_em_bloco=False):
+    """
+    Etapa de I/O do chunk: insere o lote no banco em uma única transação.
+    Com `indice_cpf`, duplicatas de CPF são detectadas em memória; com
+    `carga_em_bloco`, o lote é gravado via tabela temporária (SQLite).
+    Retorna (linhas_corrigidas, inseridos_chunk, erros_insercao_chunk).
+    """
+    linhas_corrigidas = []
+    inseridos_chunk = 0
+    erros_insercao_chunk = 0
+
+    resultados = inserir_lote([dados for _, dados in lote], indice_cpf=indice_cpf, carga_em_bloco=carga_em_bloco)
+    for (idx, dados_insercao), sucesso_insercao in zip(lote, resultados):
+        if sucesso_insercao:
+            inseridos_chunk += 1
+        else:
+            erros_insercao_chunk += 1
+
+        # Manter para relatório
+        linha_relatorio = dados_insercao.copy()
+        linha_relatorio['indice_original'] = idx
+        linha_relatorio['inserido'] = sucesso_insercao
+        linhas_corrigidas.append(linha_relatorio)
+
+    return linhas_corrigidas, inseridos_chunk, erros_insercao_chunk
+
+def processar_chunk(df_chunk, start_idx):
+    """Processa um chunk de dados e retorna estatísticas"""
+    lote, erros_chunk, falhas_preparo, _ = validar_chunk(df_chunk, start_idx)
+    linhas_corrigidas, inseridos_chunk, erros_insercao_chunk = gravar_chunk(lote)
+    return linhas_corrigidas, erros_chunk, inseridos_chunk, erros_insercao_chunk + falhas_preparo
+
+def _mapear_em_processos(funcao, itens, workers):
+    """
+    Aplica `funcao(*item)` a cada item, em ordem. Com workers > 1 usa um
+    ProcessPoolExecutor, mantendo no máximo 2 tarefas por worker em andamento
+    para que a leitura não se adiante demais (memória limitada).
+    Gera (item, resultado) na mesma ordem de entrada.
+    """
+    if workers <= 1:
+        for item in itens:
+            yield item, funcao(*item)
+        return
+
+    # "spawn": as threads de leitura/gravação já estão rodando, e fork com threads
+    # ativas pode herdar locks (ex.: do logging) travados no processo filho
+    pendentes = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for item in itens:
+            pendentes.append((item, executor.submit(funcao, *item)))
+            if len(pendentes) >= workers * 2:
+                item_pronto, futuro = pendentes.popleft()
+                yield item_pronto, futuro.result()
+        while pendentes:
+            item_pronto, futuro = pendentes.popleft()
+            yield item_pronto, futuro.result()
+
+def corrigir_e_validar_paralelo(df, workers=1, chunk_size=5000):
+    """Versão de corrigir_e_validar que distribui o DataFrame em chunks entre `workers` processos"""
+    if workers <= 1 or len(df) <= chunk_size:
+        return corrigir_e_validar(df)
+
+    partes = [(df_chunk,) for _, df_chunk, _ in _chunks_dataframe(df, chunk_size)]
+    resultados = [resultado for _, resultado in _mapear_em_processos(corrigir_e_validar, partes, workers)]
+    df_corrigido = pd.concat([corrigido for corrigido, _ in resultados])
+    erros_por_linha = pd.concat([erros for _, erros in resultados])
+    return df_corrigido, erros_por_linha
+
+def _chunks_dataframe(df, chunk_size, inicio=0):
+    """
+    Fatia um DataFrame já carregado em chunks (posição inicial, chunk, linhas lidas),
+    a partir da linha `inicio`
+    """
+    for start_idx in range(inicio, len(df), chunk_size):
+        df_chunk = df.iloc[start_idx:start_idx + chunk_size].copy()
+        yield start_idx, df_chunk, len(df_chunk)
+
+def _chunks_csv(fonte, chunk_size, sep=",", pular_linhas=0):
+    """
+    Lê um CSV (caminho ou objeto de arquivo) em chunks com read_csv(chunksize=...).
+    Todas as colunas são lidas como texto, para que o tipo não varie entre chunks.
+    As primeiras `pular_linhas` linhas de dados (já importadas ou já processadas
+    numa execução retomada) são ignoradas.
+
+    Cada chunk passa por etl.tratar_chunk (o tratamento de tratar_dados do modo
+    não streaming): linhas idênticas dentro do chunk são descartadas.
+    Gera (posição inicial, chunk, linhas lidas do arquivo).
+    """
+    start_idx = pular_linhas
+    skiprows = range(1, pular_linhas + 1) if pular_linhas else None
+    with pd.read_csv(fonte, sep=sep, dtype=str, chunksize=chunk_size, skiprows=skiprows) as leitor:
+        for df_chunk in leitor:
+            linhas_lidas = len(df_chunk)
+            yield start_idx, tratar_chunk(df_chunk), linhas_lidas
+            start_idx += linhas_lidas
+
+def sincronizar_lojas_vendedores(df_chunk, ja_sincronizados):
+    """
+    Garante lojas, vendedores e relações do chunk no banco, enviando apenas as
+    combinações ainda não vistas nesta execução (registradas em `ja_sincronizados`).
+    Retorna o número de entidades criadas por tabela (vazio se nada foi enviado).
+    """
+    colunas = [col for col in ['codigo_loja', 'nome_loja', 'codigo_vendedor', 'nome_vendedor'] if col in df_chunk.columns]
+    if not colunas:
+        return {}
+
+    distintos = df_chunk[colunas].drop_duplicates()
+    chaves = list(distintos.itertuples(index=False, name=None))
+    novas = [pos for pos, chave in enumerate(chaves) if chave not in ja_sincronizados]
+    if not novas:
+        return {}
+    criadas = ensure_store_sellers_from_df(distintos.iloc[novas])
+    ja_sincronizados.update(chaves[pos] for pos in novas)
+    return criadas if isinstance(criadas, dict) else {}
+
+class MedidorEtapas:
+    """Acumula o tempo (em segundos) gasto em cada etapa do pipeline; pode ser usado por várias threads"""
+
+    ETAPAS = ('leitura', 'indice_cpf', 'sincronizacao', 'correcao', 'validacao', 'insercao', 'indices',
+              'resumo', 'relatorio_csv', 'pdf', 'arquivamento')
+
+    def __init__(self):
+        self.tempos = dict.fromkeys(self.ETAPAS, 0.0)
+        self._lock = threading.Lock()
+
+    def adicionar(self, etapa, segundos):
+        with self._lock:
+            self.tempos[etapa] += segundos
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.adicionar(etapa, time.perf_counter() - inicio)
+
+_FIM_FILA = object()
+
+def _colocar(fila, item, parar):
+    """Coloca `item` na fila limitada, desistindo se `parar` for sinalizado"""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _ler_em_thread(itens, profundidade, medidor=None):
+    """
+    Estágio de leitura: consome `itens` em uma thread própria e os entrega por
+    uma fila de até `profundidade` elementos. Erros de leitura são relançados aqui.
+    O tempo gasto produzindo cada item é somado à etapa 'leitura' do `medidor`.
+    """
+    fila = queue.Queue(maxsize=max(1, profundidade))
+    parar = threading.Event()
+    medidor = medidor or MedidorEtapas()
+
+    def produzir():
+        try:
+            iterador = iter(itens)
+            while True:
+                with medidor.medir('leitura'):
+                    item = next(iterador, _FIM_FILA)
+                if item is _FIM_FILA:
+                    break
+                if not _colocar(fila, item, parar):
+                    return
+        except Exception as e:
+            _colocar(fila, e, parar)
+            return
+        _colocar(fila, _FIM_FILA, parar)
+
+    leitor = threading.Thread(target=produzir, name="pipeline-leitura", daemon=True)
+    leitor.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM_FILA:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        parar.set()
+        leitor.join()
+
+class _EscritorChunks:
+    """
+    Estágio de gravação: uma thread dedicada sincroniza lojas/vendedores, insere
+    os lotes validados e acumula as estatísticas, na ordem em que os chunks chegam.
+    """
+
+    # Estado persistido no checkpoint após cada chunk gravado
+    CONTADORES = ('total_linhas', 'total_chunks', 'registros_com_erros_validacao', 'todos_erros',
+                  'total_inseridos', 'total_erros_insercao', 'linhas_duplicadas', 'novas_entidades')
+
+    def __init__(self, profundidade, total_esperado=None, chunk_size=500, checkpoint=None, estado=None,
+                 medidor=None, csv_erros=None, indice_cpf=None, carga_em_bloco=False, auditar_chunks=False):
+        self.fila = queue.Queue(maxsize=max(1, profundidade))
+        self.erro = None
+        self.medidor = medidor or MedidorEtapas()
+        self.csv_erros = csv_erros
+        self.indice_cpf = indice_cpf
+        self.carga_em_bloco = carga_em_bloco
+        self.auditar_chunks = auditar_chunks
+        self.linhas_por_segundo_chunks = []
+        self.chunks_previstos = (total_esperado + chunk_size - 1) // chunk_size if total_esperado is not None else None
+        self.checkpoint = checkpoint
+
+        # Estatísticas (acumuladas chunk a chunk)
+        self.total_linhas = 0  # linhas lidas da origem (posição de retomada)
+        self.linhas_duplicadas = 0  # linhas idênticas descartadas na leitura (dentro do chunk)
+        self.total_chunks = 0
+        self.amostra_relatorio = AmostraReservatorio(TAMANHO_AMOSTRA_RELATORIO)
+        self.registros_com_erros_validacao = 0
+        self.todos_erros = {}
+        self.total_inseridos = 0
+        self.total_erros_insercao = 0
+        self.lojas_vendedores_sincronizados = set()
+        self.novas_entidades = {'lojas': 0, 'vendedores': 0, 'loja_vendedor': 0}
+
+        # Execução retomada: continua a partir dos contadores e da amostra do
+        # relatório do checkpoint (ausentes em checkpoints antigos: valor inicial)
+        for contador in self.CONTADORES if estado else ():
+            setattr(self, contador, estado.get(contador, getattr(self, contador)))
+        if estado and 'amostra_relatorio' in estado:
+            self.amostra_relatorio.restaurar(estado['amostra_relatorio'])
+
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="pipeline-escrita", daemon=True)
+        self._thread.start()
+
+    def enviar(self, item):
+        """Entrega um chunk validado; bloqueia enquanto a fila estiver cheia"""
+        if not _colocar(self.fila, item, self._parar):
+            raise self.erro
+
+    def concluir(self):
+        """Espera a gravação dos chunks pendentes e relança erro da thread, se houver"""
+        _colocar(self.fila, _FIM_FILA, self._parar)
+        self._thread.join()
+        if self.csv_erros is not None:
+            self.csv_erros.fechar()
+        if self.erro is not None:
+            raise self.erro
+
+    def _executar(self):
+        try:
+            while True:
+                item = self.fila.get()
+                if item is _FIM_FILA:
+                    return
+                self._gravar(*item)
+        except Exception as e:
+            self.erro = e
+            self._parar.set()
+
+    def _gravar(self, df_chunk, start_idx, validacao, linhas_lidas):
+        lote, erros_chunk, falhas_preparo, tempos = validacao
+        inicio_gravacao = time.perf_counter()
+        self.total_chunks += 1
+        end_idx = start_idx + linhas_lidas
+        progresso = f"{self.total_chunks}/{self.chunks_previstos}" if self.chunks_previstos else f"{self.total_chunks}"
+        logger.info(f"📦 Processando chunk {progresso} (linhas {start_idx}-{end_idx})...")
+
+        # Garantir que lojas e vendedores do chunk existem no banco
+        with self.medidor.medir('sincronizacao'):
+            criadas = sincronizar_lojas_vendedores(df_chunk, self.lojas_vendedores_sincronizados)
+        for tabela, quantidade in criadas.items():
+            self.novas_entidades[tabela] = self.novas_entidades.get(tabela, 0) + quantidade
+
+        with self.medidor.medir('insercao'):
+            id_anterior = ultimo_id_venda() if self.auditar_chunks else None
+            linhas_corrigidas, inseridos_chunk, erros_insercao_chunk = gravar_chunk(lote, self.indice_cpf, self.carga_em_bloco)
+        erros_insercao_chunk += falhas_preparo
+
+        # Uma entrada de auditoria para o chunk inteiro (faixa de IDs gravada)
+        if self.auditar_chunks and id_anterior is not None:
+            registrar_auditoria_vendas(f"Chunk {self.total_chunks} (linhas {start_idx}-{end_idx})", inseridos_chunk,
+                                       erros_insercao_chunk, id_anterior + 1, ultimo_id_venda())
+
+        # Resumo diário (dia/loja/vendedor/produto/pagamento) com as vendas deste chunk
+        if inseridos_chunk:
+            with self.medidor.medir('resumo'):
+                atualizar_resumo_vendas()
+
+        # Vazão do chunk: linhas / (correção + validação + sincronização + inserção)
+        for etapa, segundos in tempos.items():
+            self.medidor.adicionar(etapa, segundos)
+        segundos_chunk = sum(tempos.values()) + time.perf_counter() - inicio_gravacao
+        linhas_por_segundo = len(df_chunk) / segundos_chunk if segundos_chunk > 0 else 0.0
+        self.linhas_por_segundo_chunks.append(round(linhas_por_segundo, 1))
+
+        # Acumular resultados
+        self.total_linhas += linhas_lidas
+        self.linhas_duplicadas += linhas_lidas - len(df_chunk)
+        self.amostra_relatorio.extend(linhas_corrigidas)
+        self.registros_com_erros_validacao += sum(1 for r in linhas_corrigidas if r.get('erros', ''))
+        for erro, count in erros_chunk.items():
+            self.todos_erros[erro] = self.todos_erros.get(erro, 0) + count
+        self.total_inseridos += inseridos_chunk
+        self.total_erros_insercao += erros_insercao_chunk
+
+        logger.info(f"   ✅ Chunk {self.total_chunks} processado: {inseridos_chunk} inseridos, {erros_insercao_chunk} erros "
+                    f"({linhas_por_segundo:.0f} linhas/s)")
+
+        # Linhas com erro de validação ou rejeitadas pelo banco vão para o CSV de erros
+        if self.csv_erros is not None:
+            with self.medidor.medir('relatorio_csv'):
+                self.csv_erros.escrever(l for l in linhas_corrigidas if l.get('erros') or not l.get('inserido'))
+                self.csv_erros.flush()
+
+        # Chunk confirmado no banco: registrar o ponto de retomada
+        if self.checkpoint:
+            estado = {contador: getattr(self, contador) for contador in self.CONTADORES}
+            estado['amostra_relatorio'] = self.amostra_relatorio.estado()
+            salvar_checkpoint(self.checkpoint['chave'], dict(self.checkpoint, ultimo_chunk=self.total_chunks, **estado))
+
+def _resultado_importacao_ignorada(importacao):
+    """Resultado do pipeline para um arquivo que já havia sido importado"""
+    logger.info(f"⏭️ Nada a processar: {importacao['nome_arquivo']} já foi importado")
+    return {
+        "sucesso": True,
+        "importacao": importacao['acao'],
+        "resumo_csv": None,
+        "relatorio_csv": None,
+        "pdf": None,
+        "csv_processado": None,
+        "csv_arquivado": None,
+        "link_publico": None,
+        "estatisticas": {"total_processado": 0, "inseridos": 0, "erros_insercao": 0, "erros_validacao": 0}
+    }
+
+def _preparar_checkpoint(chave, chunk_size, inicio, retomar):
+    """Retorna (checkpoint, estado salvo ou None, linhas já processadas) para a execução"""
+    checkpoint = {'chave': chave, 'chunk_size': chunk_size, 'inicio': inicio}
+    estado = carregar_checkpoint(chave, chunk_size, inicio) if retomar else None
+    return checkpoint, estado, estado['total_linhas'] if estado else 0
+
+def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv", chunk_size=500, workers=1,
+                      profundidade_fila=PROFUNDIDADE_FILA, importacao=None, retomar=False,
+                      usar_bloom_cpf=USAR_BLOOM_CPF, carga_em_bloco=CARGA_EM_BLOCO, recriar_indices=None,
+                      nivel_auditoria=NIVEL_AUDITORIA):
     """
     Executa o pipeline completo com processamento em chunks para economia de memória:
-    - Corrige e valida os dados
+    - Corrige e valida os dados (em `workers` processos quando workers > 1)
     - Insere no banco
     - Gera relatório CSV e PDF
     - Retorna caminhos dos relatórios
+
+    `importacao` é o plano de src.importacoes.planejar_importacao para o arquivo
+    de origem: `df` deve conter apenas as linhas ainda não importadas, e o
+    resultado é registrado na tabela importacoes ao final.
+
+    Um checkpoint é salvo após cada chunk gravado; com `retomar`, a execução
+    continua do último chunk confirmado de uma execução interrompida.
+
+    CPFs já gravados são carregados uma vez em um índice em memória; com
+    `usar_bloom_cpf`, um filtro de Bloom persistido em data/db/ é usado no lugar.
+
+    Com `carga_em_bloco` (SQLite), cada chunk é gravado via tabela temporária e as
+    regras dos triggers são verificadas em SQL para o chunk inteiro. Os índices
+    secundários de vendas são suspensos durante a carga quando `recriar_indices`
+    é True, ou, se None, quando há pelo menos MIN_LINHAS_RECRIAR_INDICES linhas.
+
+    `nivel_auditoria` controla o resumo gravado em sistema_logs: 'importacao'
+    (uma entrada por execução, com a faixa de IDs e as contagens), 'chunk'
+    (também uma entrada por chunk) ou 'nenhuma'.
+    """
+    if importacao and importacao['acao'] == 'pular':
+        return _resultado_importacao_ignorada(importacao)
+
+    chave = importacao['hash_arquivo'] if importacao else impressao_dataframe(df)
+    inicio = importacao['linhas_ja_importadas'] if importacao else 0
+    checkpoint, estado, ja_processadas = _preparar_checkpoint(chave, chunk_size, inicio, retomar)
+
+    logger.info(f"📊 Total de linhas para processar: {len(df) - ja_processadas}")
+    return _executar_chunks(_chunks_dataframe(df, chunk_size, ja_processadas), enviar_dropbox, caminho_raw,
+                            chunk_size, total_esperado=len(df), workers=workers,
+                            profundidade_fila=profundidade_fila, importacao=importacao,
+                            checkpoint=checkpoint, estado=estado, usar_bloom_cpf=usar_bloom_cpf,
+                            carga_em_bloco=carga_em_bloco, recriar_indices=recriar_indices,
+                            nivel_auditoria=nivel_auditoria)
+
+def executar_pipeline_stream(fonte, enviar_dropbox=False, caminho_raw=None, chunk_size=5000, sep=",", workers=1,
+                             profundidade_fila=PROFUNDIDADE_FILA, verificar_importacao=True, retomar=False,
+                             usar_bloom_cpf=USAR_BLOOM_CPF, carga_em_bloco=CARGA_EM_BLOCO, recriar_indices=None,
+                             nivel_auditoria=NIVEL_AUDITORIA):
+    """
+    Executa o pipeline lendo o CSV em streaming (read_csv com chunksize), sem carregar
+    o arquivo inteiro: o uso de memória depende do tamanho do chunk, não do arquivo.
+
+    `fonte` pode ser um caminho ou um objeto de arquivo. Quando é um caminho e
+    `caminho_raw` não é informado, o próprio arquivo é arquivado ao final.
+
+    Com `verificar_importacao`, arquivos já importados são ignorados e, em
+    arquivos estendidos, apenas as linhas novas são carregadas. Com `retomar`,
+    continua do último chunk confirmado de uma execução interrompida.
+
+    `carga_em_bloco`, `recriar_indices` e `nivel_auditoria` funcionam como em
+    executar_pipeline; como o total de linhas não é conhecido de antemão, os
+    índices só são suspensos com `recriar_indices=True`.
     """
+    if caminho_raw is None and isinstance(fonte, (str, os.PathLike)):
+        caminho_raw = fonte
+    logger.info(f"📂 Lendo CSV em streaming: {fonte if isinstance(fonte, (str, os.PathLike)) else 'objeto de arquivo'}")
+
+    importacao = planejar_importacao(fonte) if verificar_importacao else None
+    if importacao and importacao['acao'] == 'pular':
+        return _resultado_importacao_ignorada(importacao)
+    inicio = importacao['linhas_ja_importadas'] if importacao else 0
+
+    chave = importacao['hash_arquivo'] if importacao else calcular_impressao(fonte)['hash_arquivo']
+    checkpoint, estado, ja_processadas = _preparar_checkpoint(chave, chunk_size, inicio, retomar)
+
+    return _executar_chunks(_chunks_csv(fonte, chunk_size, sep, inicio + ja_processadas), enviar_dropbox,
+                            caminho_raw, chunk_size, workers=workers, profundidade_fila=profundidade_fila,
+                            importacao=importacao, checkpoint=checkpoint, estado=estado,
+                            usar_bloom_cpf=usar_bloom_cpf, carga_em_bloco=carga_em_bloco,
+                            recriar_indices=recriar_indices, nivel_auditoria=nivel_auditoria)
+
+def _restaurar_indices_medindo(medidor):
+    with medidor.medir('indices'):
+        restaurar_indices_vendas()
+
+def _encerrar_etapas(etapas, erro_principal=None):
+    """
+    Executa todas as etapas de encerramento, mesmo que alguma falhe (os índices
+    suspensos são recriados ainda que a gravação tenha falhado). Sem `erro_principal`,
+    a primeira falha é relançada ao final; com ele, as falhas são só registradas,
+    para que a exceção original (leitura/validação) não seja mascarada.
+    """
+    primeira_falha = None
+    for etapa in etapas:
+        try:
+            etapa()
+        except Exception as e:
+            logger.error(f"❌ Erro ao encerrar o pipeline: {e}")
+            if primeira_falha is None:
+                primeira_falha = e
+    if primeira_falha is not None and erro_principal is None:
+        raise primeira_falha
+
+def _executar_chunks(chunks, enviar_dropbox, caminho_raw, chunk_size, total_esperado=None, workers=1,
+                     profundidade_fila=PROFUNDIDADE_FILA, importacao=None, checkpoint=None, estado=None,
+                     usar_bloom_cpf=USAR_BLOOM_CPF, carga_em_bloco=CARGA_EM_BLOCO, recriar_indices=None,
+                     nivel_auditoria=NIVEL_AUDITORIA):
+    """Núcleo do pipeline: consome os chunks, acumula estatísticas e gera os relatórios"""
     try:
         # Criar diretórios necessários
         os.makedirs("data/reports", exist_ok=True)
@@ -274,64 +750,133 @@ def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv
         os.makedirs("data/archived", exist_ok=True)
 
         logger.info("🚀 Iniciando pipeline de processamento...")
-        logger.info(f"📊 Total de linhas para processar: {len(df)}")
         logger.info(f"🔢 Tamanho do chunk: {chunk_size}")
+        if workers > 1:
+            logger.info(f"🧵 Validação em {workers} processos")
+        logger.info(f"📥 Profundidade das filas entre estágios: {profundidade_fila}")
 
-        # Primeiro, garantir que lojas e vendedores existem no banco
-        logger.info("🔄 Sincronizando lojas e vendedores com o banco...")
-        ensure_store_sellers_from_df(df)
+        # Estágios ligados por filas limitadas: leitura (thread) → correção/validação
+        # (este processo ou `workers` processos) → gravação (thread dedicada).
+        # O chunk seguinte é validado enquanto o anterior é gravado; filas cheias
+        # seguram os estágios anteriores, limitando a memória.
+        inicio_pipeline = time.perf_counter()
+        medidor = MedidorEtapas()
+        # Todas as linhas com erro são gravadas durante o processamento (sem acumular em memória)
+        stamp_inicio = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        csv_erros = CsvErrosRotativo(f"data/reports/linhas_com_erro_{stamp_inicio}", MAX_LINHAS_CSV_ERROS)
+        # CPFs existentes carregados uma única vez (duplicatas detectadas sem consulta por linha)
+        with medidor.medir('indice_cpf'):
+            indice_cpf = carregar_indice_cpf(usar_bloom=usar_bloom_cpf)
+        # Carga em bloco grande: índices secundários de vendas recriados só no final
+        if recriar_indices is None:
+            recriar_indices = total_esperado is not None and total_esperado >= MIN_LINHAS_RECRIAR_INDICES
+        indices_suspensos = False
+        if carga_em_bloco:
+            logger.info("🚚 Carga em bloco ativada (tabela temporária + verificações em SQL)")
+            with medidor.medir('indices'):
+                restaurar_indices_vendas()  # sobra de uma execução interrompida
+                if recriar_indices:
+                    indices_suspensos = suspender_indices_vendas() > 0
+        id_antes_da_carga = ultimo_id_venda() if nivel_auditoria in ('importacao', 'chunk') else None
+        escritor = _EscritorChunks(profundidade_fila, total_esperado, chunk_size, checkpoint, estado, medidor,
+                                   csv_erros, indice_cpf, carga_em_bloco, auditar_chunks=nivel_auditoria == 'chunk')
+        erro_principal = None
+        try:
+            lidos = _ler_em_thread(chunks, profundidade_fila, medidor)
+            # linhas lidas da origem por chunk, na ordem em que os chunks são validados
+            linhas_lidas = deque()
 
-        # Variáveis para estatísticas
-        total_linhas = len(df)
-        todas_linhas_corrigidas = []
-        todos_erros = {}
-        total_inseridos = 0
-        total_erros_insercao = 0
+            def tarefas():
+                for start_idx, df_chunk, lidas in lidos:
+                    linhas_lidas.append(lidas)
+                    yield df_chunk, start_idx
 
-        # Processar em chunks para reduzir uso de memória
-        total_chunks = (total_linhas + chunk_size - 1) // chunk_size
-        
-        for chunk_num in range(total_chunks):
-            start_idx = chunk_num * chunk_size
-            end_idx = min(start_idx + chunk_size, total_linhas)
-            
-            logger.info(f"📦 Processando chunk {chunk_num + 1}/{total_chunks} (linhas {start_idx}-{end_idx})...")
-            
-            df_chunk = df.iloc[start_idx:end_idx].copy()
-            
-            linhas_corrigidas, erros_chunk, inseridos_chunk, erros_insercao_chunk = processar_chunk(df_chunk, start_idx)
-            
-            # Acumular resultados
-            todas_linhas_corrigidas.extend(linhas_corrigidas)
-            for erro, count in erros_chunk.items():
-                todos_erros[erro] = todos_erros.get(erro, 0) + count
-            total_inseridos += inseridos_chunk
-            total_erros_insercao += erros_insercao_chunk
-            
-            logger.info(f"   ✅ Chunk {chunk_num + 1} processado: {inseridos_chunk} inseridos, {erros_insercao_chunk} erros")
+            for (df_chunk, start_idx), validacao in _mapear_em_processos(validar_chunk, tarefas(), workers):
+                escritor.enviar((df_chunk, start_idx, validacao, linhas_lidas.popleft()))
+        except BaseException as e:
+            erro_principal = e
+            raise
+        finally:
+            etapas = [escritor.concluir]
+            if indice_cpf is not None:
+                etapas.append(indice_cpf.salvar)
+            if indices_suspensos:
+                etapas.append(lambda: _restaurar_indices_medindo(medidor))
+            _encerrar_etapas(etapas, erro_principal)
+
+        total_linhas = escritor.total_linhas
+        linhas_duplicadas = escritor.linhas_duplicadas
+        total_chunks = escritor.total_chunks
+        amostra = escritor.amostra_relatorio
+        registros_com_erros_validacao = escritor.registros_com_erros_validacao
+        todos_erros = escritor.todos_erros
+        total_inseridos = escritor.total_inseridos
+        total_erros_insercao = escritor.total_erros_insercao
+        novas_entidades = escritor.novas_entidades
+        segundos_chunks = time.perf_counter() - inicio_pipeline
+
+        # Registrar o arquivo em importacoes (total_registros = linhas do arquivo inteiro)
+        if importacao:
+            total_registros = importacao.get('total_registros') or importacao['linhas_ja_importadas'] + total_linhas
+            registrar_resultado(importacao, total_registros, total_inseridos, total_erros_insercao)
+
+        # Resumo da ingestão em sistema_logs (substitui o log por venda do trigger)
+        if id_antes_da_carga is not None:
+            descricao = f"Importação de {importacao['nome_arquivo']}" if importacao else "Execução do pipeline"
+            registrar_auditoria_vendas(descricao, total_inseridos, total_erros_insercao, id_antes_da_carga + 1,
+                                       ultimo_id_venda(), usuario=(importacao or {}).get('usuario_importacao'))
+
+        # Execução completa: o checkpoint não é mais necessário
+        if checkpoint:
+            remover_checkpoint(checkpoint['chave'])
 
         # Gerar relatórios
         data_stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Criar DataFrame com amostra para relatório (últimas 1000 linhas)
-        amostra_relatorio = todas_linhas_corrigidas[-1000:] if len(todas_linhas_corrigidas) > 1000 else todas_linhas_corrigidas
+        # Criar DataFrame com amostra para relatório (amostra uniforme de até 1000 linhas)
+        amostra_relatorio = sorted(amostra, key=lambda linha: linha['indice_original'])
         
-        if amostra_relatorio:
-            df_relatorio = pd.DataFrame(amostra_relatorio)
-            relatorio_completo_path = f"data/reports/vendas_corrigido_{data_stamp}.csv"
-            df_relatorio.to_csv(relatorio_completo_path, index=False, encoding='utf-8')
-            logger.info(f"✅ Relatório completo salvo: {relatorio_completo_path}")
-        else:
-            relatorio_completo_path = None
-            logger.warning("⚠️ Nenhum dado para gerar relatório completo")
+        with medidor.medir('relatorio_csv'):
+            if amostra_relatorio:
+                df_relatorio = pd.DataFrame(amostra_relatorio)
+                relatorio_completo_path = f"data/reports/vendas_corrigido_{data_stamp}.csv"
+                df_relatorio.to_csv(relatorio_completo_path, index=False, encoding='utf-8')
+                logger.info(f"✅ Relatório completo salvo: {relatorio_completo_path}")
+            else:
+                relatorio_completo_path = None
+                logger.warning("⚠️ Nenhum dado para gerar relatório completo")
+
+            # Salvar CSV processado (apenas amostra)
+            caminho_processed = None
+            if amostra_relatorio:
+                caminho_processed = f"data/processed/vendas_tratado_{data_stamp}.csv"
+                df_relatorio.to_csv(caminho_processed, index=False, encoding='utf-8')
+                logger.info(f"✅ CSV processado salvo: {caminho_processed}")
+
+        # Mover CSV original para archived se existir
+        destino = None
+        with medidor.medir('arquivamento'):
+            if caminho_raw and os.path.exists(caminho_raw):
+                destino = f"data/archived/vendas_{data_stamp}.csv"
+                try:
+                    os.rename(caminho_raw, destino)
+                    logger.info(f"✅ CSV original arquivado: {destino}")
+                except Exception as e:
+                    logger.error(f"❌ Erro ao arquivar CSV original: {e}")
+                    destino = None
 
         # Resumo de processamento
+        # Linhas duplicadas descartadas na leitura não contam como processadas
+        # (como no modo não streaming, que as remove antes do pipeline)
+        total_processado = total_linhas - linhas_duplicadas
+        taxa_sucesso = f"{(total_inseridos/total_processado*100):.1f}%" if total_processado > 0 else "0%"
         resumo = {
-            "total_processado": [total_linhas],
+            "total_processado": [total_processado],
+            "linhas_duplicadas": [linhas_duplicadas],
             "registros_inseridos": [total_inseridos],
             "erros_insercao": [total_erros_insercao],
-            "registros_com_erros_validacao": [sum(1 for r in todas_linhas_corrigidas if r.get('erros', ''))],
-            "taxa_sucesso": [f"{(total_inseridos/total_linhas*100):.1f}%"] if total_linhas > 0 else ["0%"],
+            "registros_com_erros_validacao": [registros_com_erros_validacao],
+            "taxa_sucesso": [taxa_sucesso],
             "total_chunks_processados": [total_chunks],
             "data_processamento": [datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")]
         }
@@ -341,32 +886,32 @@ def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv
             chave = f"erro_{erro.replace(' ', '_').replace('/', '_').lower()}"
             resumo[chave] = [qtd]
 
+        # Desempenho: tempo por etapa e vazão (o tempo do PDF entra após gerá-lo)
+        taxas_chunks = escritor.linhas_por_segundo_chunks
+        linhas_desta_execucao = total_linhas - (estado['total_linhas'] if estado else 0)
+        resumo["linhas_por_segundo"] = [round(linhas_desta_execucao / segundos_chunks, 1) if segundos_chunks > 0 else 0.0]
+        resumo["linhas_por_segundo_chunk_min"] = [min(taxas_chunks) if taxas_chunks else 0.0]
+        resumo["linhas_por_segundo_chunk_max"] = [max(taxas_chunks) if taxas_chunks else 0.0]
+        for etapa in MedidorEtapas.ETAPAS:
+            if etapa != 'pdf':
+                resumo[f"tempo_{etapa}_s"] = [round(medidor.tempos[etapa], 3)]
+
         df_resumo = pd.DataFrame(resumo)
         resumo_path = f"data/reports/resumo_qualidade_{data_stamp}.csv"
-        df_resumo.to_csv(resumo_path, index=False, encoding='utf-8')
+        with medidor.medir('relatorio_csv'):
+            df_resumo.to_csv(resumo_path, index=False, encoding='utf-8')
         logger.info(f"✅ Resumo salvo: {resumo_path}")
 
         # Gerar PDF
         pdf_path = f"data/reports/relatorio_qualidade_{data_stamp}.pdf"
-        gerar_pdf_relatorio(resumo_path, relatorio_completo_path, pdf_path)
+        with medidor.medir('pdf'):
+            gerar_pdf_relatorio(resumo_path, relatorio_completo_path, pdf_path)
 
-        # Mover CSV original para archived se existir
-        destino = None
-        if os.path.exists(caminho_raw):
-            destino = f"data/archived/vendas_{data_stamp}.csv"
-            try:
-                os.rename(caminho_raw, destino)
-                logger.info(f"✅ CSV original arquivado: {destino}")
-            except Exception as e:
-                logger.error(f"❌ Erro ao arquivar CSV original: {e}")
-                destino = None
-
-        # Salvar CSV processado (apenas amostra)
-        caminho_processed = None
-        if amostra_relatorio:
-            caminho_processed = f"data/processed/vendas_tratado_{data_stamp}.csv"
-            df_relatorio.to_csv(caminho_processed, index=False, encoding='utf-8')
-            logger.info(f"✅ CSV processado salvo: {caminho_processed}")
+        # Completar o resumo com o tempo do PDF e o tempo total
+        tempo_total = time.perf_counter() - inicio_pipeline
+        df_resumo["tempo_pdf_s"] = round(medidor.tempos['pdf'], 3)
+        df_resumo["tempo_total_s"] = round(tempo_total, 3)
+        df_resumo.to_csv(resumo_path, index=False, encoding='utf-8')
 
         link_publico = None
         if enviar_dropbox:
@@ -378,26 +923,42 @@ def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv
         # Log final
         logger.info(f"🎉 Pipeline concluído com sucesso!")
         logger.info(f"📈 Estatísticas finais:")
-        logger.info(f"   • Total processado: {total_linhas}")
+        logger.info(f"   • Total processado: {total_processado}")
+        if linhas_duplicadas:
+            logger.info(f"   • Linhas duplicadas descartadas: {linhas_duplicadas}")
         logger.info(f"   • Registros inseridos: {total_inseridos}")
         logger.info(f"   • Erros de inserção: {total_erros_insercao}")
         logger.info(f"   • Taxa de sucesso: {resumo['taxa_sucesso'][0]}")
         logger.info(f"   • Chunks processados: {total_chunks}")
+        logger.info(f"⏱️ Tempo total: {tempo_total:.2f}s ({resumo['linhas_por_segundo'][0]} linhas/s)")
+        for etapa, segundos in medidor.tempos.items():
+            logger.info(f"   • {etapa}: {segundos:.3f}s")
 
         return {
             "sucesso": True,
+            "importacao": importacao['acao'] if importacao else None,
             "resumo_csv": resumo_path,
             "relatorio_csv": relatorio_completo_path,
             "pdf": pdf_path,
             "csv_processado": caminho_processed,
             "csv_arquivado": destino,
+            "erros_csv": csv_erros.arquivos,
             "link_publico": link_publico,
             "estatisticas": {
-                "total_processado": total_linhas,
+                "total_processado": total_processado,
+                "linhas_duplicadas": linhas_duplicadas,
                 "inseridos": total_inseridos,
                 "erros_insercao": total_erros_insercao,
                 "erros_validacao": len(todos_erros),
+                "linhas_com_erro_csv": csv_erros.total_linhas,
+                "novas_entidades": novas_entidades,
                 "taxa_sucesso": resumo['taxa_sucesso'][0]
+            },
+            "desempenho": {
+                "tempos_etapas": {etapa: round(segundos, 3) for etapa, segundos in medidor.tempos.items()},
+                "tempo_total": round(tempo_total, 3),
+                "linhas_por_segundo": resumo['linhas_por_segundo'][0],
+                "linhas_por_segundo_chunks": taxas_chunks
             }
         }
         
@@ -405,6 +966,9 @@ def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv
         logger.error(f"❌ Erro fatal no pipeline: {e}")
         import traceback
         logger.error(f"🔍 Traceback: {traceback.format_exc()}")
+
+        if importacao:
+            registrar_resultado(importacao, importacao['linhas_ja_importadas'], 0, status='ERRO')
         
         return {
             "sucesso": False,
@@ -414,8 +978,10 @@ def executar_pipeline(df, enviar_dropbox=False, caminho_raw="data/raw/vendas.csv
             "pdf": None,
             "csv_processado": None,
             "csv_arquivado": None,
+            "erros_csv": [],
             "link_publico": None,
-            "estatisticas": {}
+            "estatisticas": {},
+            "desempenho": {}
         }
 
 def executar_pipeline_simples(df):
@@ -481,20 +1047,18 @@ def diagnosticar_pipeline(df):
     
     # 2. Verificar conexão com banco
     try:
-        conn, db_type = get_db_connection()
-        logger.info(f"✅ Conexão com banco: OK ({db_type})")
-        conn.close()
+        with db_connection() as (conn, db_type):
+            logger.info(f"✅ Conexão com banco: OK ({db_type})")
     except Exception as e:
         logger.error(f"❌ Conexão com banco: {e}")
         return False
     
     # 3. Verificar funções de validação
     try:
-        from src.validacao import corrigir_linha, validar_linha
-        linha_teste = df.iloc[0] if not df.empty else None
-        if linha_teste is not None:
-            linha_corrigida = corrigir_linha(linha_teste)
-            erros = validar_linha(linha_corrigida)
+        linha_teste = df.head(1)
+        if not linha_teste.empty:
+            linha_corrigida = corrigir_df(linha_teste)
+            erros = validar_df(linha_corrigida).iloc[0]
             logger.info(f"✅ Funções de validação: OK (erros na linha teste: {len(erros)})")
     except Exception as e:
         logger.error(f"❌ Funções de validação: {e}")
@@ -524,12 +1088,41 @@ if __name__ == "__main__":
     parser.add_argument('--csv', type=str, help='Caminho para o arquivo CSV')
     parser.add_argument('--simples', action='store_true', help='Executar pipeline simplificado')
     parser.add_argument('--diagnostico', action='store_true', help='Executar apenas diagnóstico')
+    parser.add_argument('--stream', action='store_true',
+                        help='Ler o CSV em chunks, sem carregá-lo inteiro (linhas duplicadas no chunk são descartadas, '
+                             'mas a ordem do arquivo é mantida)')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Linhas por chunk no modo streaming')
+    parser.add_argument('--sep', type=str, default=',', help='Separador do CSV')
+    parser.add_argument('--workers', type=int, default=1, help='Processos para correção/validação')
+    parser.add_argument('--profundidade-fila', type=int, default=PROFUNDIDADE_FILA,
+                        help='Chunks em espera entre os estágios leitura/validação/gravação')
+    parser.add_argument('--reimportar', action='store_true', help='Processar mesmo que o arquivo já tenha sido importado')
+    parser.add_argument('--retomar', action='store_true', help='Continuar do último checkpoint de uma execução interrompida')
+    parser.add_argument('--bloom-cpf', action='store_true', default=USAR_BLOOM_CPF,
+                        help='Checar CPFs duplicados com o filtro de Bloom persistido em data/db/')
+    parser.add_argument('--carga-em-bloco', action='store_true', default=CARGA_EM_BLOCO,
+                        help='Gravar via tabela temporária, com as regras dos triggers verificadas em SQL (SQLite)')
+    parser.add_argument('--recriar-indices', action='store_true', default=None,
+                        help='Na carga em bloco, suspender os índices de vendas e recriá-los ao final')
+    parser.add_argument('--auditoria', choices=['importacao', 'chunk', 'nenhuma'], default=NIVEL_AUDITORIA,
+                        help='Resumo gravado em sistema_logs: por importação (padrão), por chunk ou nenhum')
+    parser.add_argument('--reconstruir-resumo', action='store_true',
+                        help='Recriar do zero o resumo diário de vendas e sair')
     
     args = parser.parse_args()
     
-    if args.csv:
+    if args.reconstruir_resumo:
+        reconstruir_resumo_vendas()
+    elif args.csv and args.stream:
+        resultado = executar_pipeline_stream(args.csv, chunk_size=args.chunk_size, sep=args.sep,
+                                             workers=args.workers, profundidade_fila=args.profundidade_fila,
+                                             verificar_importacao=not args.reimportar, retomar=args.retomar,
+                                             usar_bloom_cpf=args.bloom_cpf, carga_em_bloco=args.carga_em_bloco,
+                                             recriar_indices=args.recriar_indices, nivel_auditoria=args.auditoria)
+        logger.info(f"✅ Pipeline em streaming executado: {resultado}")
+    elif args.csv:
         try:
-            df = pd.read_csv(args.csv)
+            df = pd.read_csv(args.csv, sep=args.sep)
             logger.info(f"📊 CSV carregado: {len(df)} linhas")
             
             if args.diagnostico:
@@ -538,10 +1131,16 @@ if __name__ == "__main__":
                 resultado = executar_pipeline_simples(df)
                 logger.info(f"✅ Pipeline simplificado executado: {resultado}")
             else:
-                resultado = executar_pipeline(df)
+                importacao = None if args.reimportar else planejar_importacao(args.csv)
+                if importacao:
+                    df = df.iloc[importacao['linhas_ja_importadas']:]
+                resultado = executar_pipeline(df, workers=args.workers, profundidade_fila=args.profundidade_fila,
+                                              importacao=importacao, retomar=args.retomar,
+                                              usar_bloom_cpf=args.bloom_cpf, carga_em_bloco=args.carga_em_bloco,
+                                              recriar_indices=args.recriar_indices, nivel_auditoria=args.auditoria)
                 logger.info(f"✅ Pipeline completo executado: {resultado}")
                 
         except Exception as e:
             logger.error(f"❌ Erro ao executar pipeline: {e}")
     else:
-        logger.info("💡 Uso: python pipeline.py --csv caminho/arquivo.csv [--simples|--diagnostico]")
\ No newline at end of file
+        logger.info("💡 Uso: python pipeline.py --csv caminho/arquivo.csv [--simples|--diagnostico|--stream]")
\ No newline at end of file
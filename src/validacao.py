@@ -1,6 +1,9 @@
 import re
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
 def corrigir_linha(row):
     """
     Corrige campos comuns com erros:
@@ -65,4 +68,103 @@ def validar_linha(row):
     except (ValueError, TypeError):
         erros.append("Data de compra inválida")
 
-    return erros
\ No newline at end of file
+    return erros
+
+# Mesma gramática aceita por datetime.strptime(valor, "%d/%m/%Y")
+_PADRAO_DATA = r'(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(1[0-2]|0[1-9]|[1-9])/(\d\d\d\d)'
+_DIAS_NO_MES = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _coluna_texto(df, coluna):
+    """Retorna a coluna como StringDtype (ou vazia, se não existir)."""
+    if coluna in df.columns:
+        return df[coluna].astype('string')
+    return pd.Series('', index=df.index, dtype='string')
+
+
+def _datas_como_inteiro(serie):
+    """
+    Converte datas dd/mm/aaaa em inteiros aaaammdd, de forma vetorizada.
+    Valores que strptime rejeitaria (formato, dia inexistente, ano 0, não-string)
+    retornam -1.
+    """
+    partes = serie.str.fullmatch(_PADRAO_DATA)
+    partes = partes.fillna(False).astype(bool)
+    resultado = np.full(len(serie), -1, dtype=np.int64)
+    if not partes.any():
+        return resultado
+
+    componentes = serie[partes].str.extract(_PADRAO_DATA)
+    dia = componentes[0].str.strip().astype(int).to_numpy()
+    mes = componentes[1].astype(int).to_numpy()
+    ano = componentes[2].astype(int).to_numpy()
+
+    bissexto = (ano % 4 == 0) & ((ano % 100 != 0) | (ano % 400 == 0))
+    limite = _DIAS_NO_MES[mes] + ((mes == 2) & bissexto)
+    valida = (ano >= 1) & (dia <= limite)
+
+    posicoes = np.flatnonzero(partes.to_numpy())
+    resultado[posicoes[valida]] = (ano * 10000 + mes * 100 + dia)[valida]
+    return resultado
+
+
+def corrigir_df(df):
+    """
+    Versão vetorizada de corrigir_linha para um DataFrame inteiro.
+    Retorna uma cópia com CPF, telefone e datas corrigidos coluna a coluna,
+    produzindo os mesmos valores que corrigir_linha aplicada linha a linha.
+    """
+    df = df.copy()
+    agora = datetime.now()
+    hoje_str = agora.strftime("%d/%m/%Y")
+    hoje_int = agora.year * 10000 + agora.month * 100 + agora.day
+
+    cpf = _coluna_texto(df, 'cpf').fillna('').str.replace(r'\D', '', regex=True)
+    df['cpf'] = cpf.str.zfill(11).str[:11].astype(object)
+
+    telefone = _coluna_texto(df, 'telefone').fillna('').str.replace(r'\D', '', regex=True)
+    df['telefone'] = telefone.str.zfill(10).str[:11].astype(object)
+
+    nascimento = _datas_como_inteiro(_coluna_texto(df, 'data_nascimento'))
+    if 'data_nascimento' not in df.columns:
+        df['data_nascimento'] = None
+    df['data_nascimento'] = df['data_nascimento'].astype(object)
+    df.loc[nascimento < 0, 'data_nascimento'] = "01/01/2000"
+
+    compra = _datas_como_inteiro(_coluna_texto(df, 'data_compra'))
+    if 'data_compra' not in df.columns:
+        df['data_compra'] = None
+    df['data_compra'] = df['data_compra'].astype(object)
+    df.loc[(compra < 0) | (compra > hoje_int), 'data_compra'] = hoje_str
+
+    return df
+
+
+def validar_df(df):
+    """
+    Versão vetorizada de validar_linha.
+    Retorna uma Series (mesmo índice do DataFrame) com a lista de erros de cada
+    linha, na mesma ordem e com as mesmas mensagens da versão escalar.
+    """
+    agora = datetime.now()
+    hoje_int = agora.year * 10000 + agora.month * 100 + agora.day
+
+    cpf_ok = _coluna_texto(df, 'cpf').str.fullmatch(r'\d{11}').fillna(False).to_numpy(dtype=bool)
+    telefone_ok = _coluna_texto(df, 'telefone').str.fullmatch(r'\d{10,11}').fillna(False).to_numpy(dtype=bool)
+    nascimento = _datas_como_inteiro(_coluna_texto(df, 'data_nascimento'))
+    compra = _datas_como_inteiro(_coluna_texto(df, 'data_compra'))
+
+    verificacoes = [
+        (~cpf_ok, "CPF inválido"),
+        (~telefone_ok, "Telefone inválido"),
+        (nascimento < 0, "Data de nascimento inválida"),
+        (compra > hoje_int, "Data de compra futura"),
+        (compra < 0, "Data de compra inválida"),
+    ]
+
+    erros = [[] for _ in range(len(df))]
+    for mascara, mensagem in verificacoes:
+        for posicao in np.flatnonzero(mascara):
+            erros[posicao].append(mensagem)
+
+    return pd.Series(erros, index=df.index, dtype=object)
@@ -1,7 +1,77 @@
 import sys
 import os
+import sqlite3
+
+import pandas as pd
+import pytest
 
 # ensure repo root is on sys.path for imports
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
+
+from src import db_utils  # noqa: E402
+from src import pipeline  # noqa: E402
+
+
+# Banco temporário, relatórios e dados de vendas compartilhados pelos testes do pipeline
+@pytest.fixture
+def temp_env(tmp_path, monkeypatch):
+    reports_dir = tmp_path / 'reports'
+    reports_dir.mkdir()
+
+    # o pipeline grava relatórios em caminhos relativos (data/reports, data/processed...)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(tmp_path / 'vendas_test.db'))
+    monkeypatch.setattr(db_utils, 'DUPLICATE_LOG', str(reports_dir / 'duplicates.log'))
+    monkeypatch.setattr(db_utils, 'DUPLICATE_CSV', str(reports_dir / 'duplicates.csv'))
+    db_utils.criar_tabela()
+    return tmp_path
+
+
+def montar_vendas(quantidade):
+    linhas = []
+    for i in range(quantidade):
+        linhas.append({
+            'nome_cliente': f'Cliente {i}',
+            'data_nascimento': '31/02/1990' if i % 5 == 0 else '10/05/1990',
+            'cpf': f'{i:011d}',
+            'telefone': '11987654321',
+            'codigo_produto': f'P{i % 3}',
+            'nome_produto': f'Produto {i % 3}',
+            'quantidade': '2',
+            'valor_produto': '10.50',
+            'data_venda': '01/01/2024',
+            'forma_pagamento': 'Pix',
+            'codigo_loja': f'L{i % 2}',
+            'nome_loja': f'Loja {i % 2}',
+            'codigo_vendedor': f'V{i % 4}',
+            'nome_vendedor': f'Vendedor {i % 4}',
+        })
+    return pd.DataFrame(linhas)
+
+
+def resumo_deterministico(caminho):
+    """Resumo sem as colunas que variam entre execuções (data e tempos)"""
+    resumo = pd.read_csv(caminho)
+    variaveis = [c for c in resumo.columns
+                 if c == 'data_processamento' or c.startswith('tempo_') or c.startswith('linhas_por_segundo')]
+    return resumo.drop(columns=variaveis).to_dict('records')
+
+
+def contar_vendas():
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    total = conn.execute("SELECT COUNT(*) FROM vendas").fetchone()[0]
+    conn.close()
+    return total
+
+
+def carregar_vendas(quantidade):
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.executemany("INSERT INTO produtos (codigo_produto, nome_produto, valor_produto) VALUES (?, ?, ?)",
+                     [(f'P{i}', f'Produto {i}', 10.0 * (i + 1)) for i in range(3)])
+    conn.commit()
+    conn.close()
+    df = montar_vendas(quantidade)
+    df['data_venda'] = [f'{1 + i % 4:02d}/01/2024' for i in range(quantidade)]
+    pipeline.executar_pipeline(df, caminho_raw='')
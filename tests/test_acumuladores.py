@@ -0,0 +1,68 @@
+import csv
+import json
+from collections import Counter
+
+import pandas as pd
+
+from src import pipeline
+from src.acumuladores import AmostraReservatorio, CsvErrosRotativo
+from tests.conftest import montar_vendas
+
+
+def test_amostra_reservatorio_limitada_e_uniforme():
+    amostra = AmostraReservatorio(capacidade=10, semente=1)
+    amostra.extend(range(5))
+    assert sorted(amostra) == [0, 1, 2, 3, 4]
+
+    # cada item de 0..99 deve aparecer ~10% das vezes em amostras de 10
+    contagem = Counter()
+    for semente in range(2000):
+        amostra = AmostraReservatorio(capacidade=10, semente=semente)
+        amostra.extend(range(100))
+        assert len(amostra) == 10 and amostra.vistos == 100
+        contagem.update(amostra)
+    assert min(contagem.values()) > 120 and max(contagem.values()) < 290
+
+
+def test_amostra_reservatorio_restaurada_continua_igual():
+    continua = AmostraReservatorio(capacidade=5, semente=1)
+    continua.extend(range(50))
+    restaurada = AmostraReservatorio(capacidade=5)
+    restaurada.restaurar(json.loads(json.dumps(continua.estado())))
+
+    continua.extend(range(50, 100))
+    restaurada.extend(range(50, 100))
+    assert restaurada.vistos == continua.vistos == 100
+    assert list(restaurada) == list(continua)
+
+
+def test_csv_de_erros_rotaciona_por_numero_de_linhas(tmp_path):
+    saida = CsvErrosRotativo(str(tmp_path / 'erros'), max_linhas=3)
+    saida.escrever({'id': i, 'erros': 'x'} for i in range(7))
+    saida.fechar()
+
+    assert [p.rsplit('/', 1)[-1] for p in saida.arquivos] == ['erros_001.csv', 'erros_002.csv', 'erros_003.csv']
+    linhas = []
+    for caminho in saida.arquivos:
+        with open(caminho, encoding='utf-8') as f:
+            linhas.extend(csv.DictReader(f))
+    assert [int(l['id']) for l in linhas] == list(range(7))
+    assert saida.total_linhas == 7
+
+
+def test_pipeline_grava_todas_as_linhas_com_erro(temp_env, monkeypatch):
+    monkeypatch.setattr(pipeline, 'MAX_LINHAS_CSV_ERROS', 2)
+    monkeypatch.setattr(pipeline, 'TAMANHO_AMOSTRA_RELATORIO', 4)
+
+    df = montar_vendas(20)
+    df.loc[7, 'quantidade'] = '0'  # viola CHECK(quantidade > 0)
+    df = pd.concat([df, df.iloc[:3]], ignore_index=True)  # 3 CPFs repetidos: rejeitados pelo banco
+    resultado = pipeline.executar_pipeline(df, caminho_raw='inexistente.csv', chunk_size=6)
+
+    assert resultado['estatisticas']['linhas_com_erro_csv'] == 4
+    assert len(resultado['erros_csv']) == 2
+    linhas = pd.concat([pd.read_csv(caminho) for caminho in resultado['erros_csv']])
+    assert linhas['indice_original'].tolist() == [7, 20, 21, 22]
+    assert not linhas['inserido'].any()
+
+    assert len(pd.read_csv(resultado['relatorio_csv'])) == 4
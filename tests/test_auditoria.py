@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from src import db_utils
+from src import pipeline
+from src.migrations import ensure_loja_vendedor
+from tests.conftest import montar_vendas
+
+
+def mensagens_auditoria():
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    linhas = conn.execute("SELECT mensagem FROM sistema_logs WHERE modulo = 'IMPORTACAO' ORDER BY id").fetchall()
+    conn.close()
+    return [mensagem for (mensagem,) in linhas]
+
+
+def test_resumo_por_importacao(temp_env):
+    df = montar_vendas(10)
+    pipeline.executar_pipeline(df, caminho_raw='', chunk_size=4)
+    pipeline.executar_pipeline(df, caminho_raw='', chunk_size=4)
+
+    assert mensagens_auditoria() == [
+        'Execução do pipeline: 10 vendas inseridas (IDs 1-10), 0 rejeitadas',
+        'Execução do pipeline: 0 vendas inseridas (nenhum ID), 10 rejeitadas',
+    ]
+
+
+def test_resumo_por_chunk(temp_env):
+    pipeline.executar_pipeline(montar_vendas(10), caminho_raw='', chunk_size=4, nivel_auditoria='chunk')
+
+    assert mensagens_auditoria() == [
+        'Chunk 1 (linhas 0-4): 4 vendas inseridas (IDs 1-4), 0 rejeitadas',
+        'Chunk 2 (linhas 4-8): 4 vendas inseridas (IDs 5-8), 0 rejeitadas',
+        'Chunk 3 (linhas 8-10): 2 vendas inseridas (IDs 9-10), 0 rejeitadas',
+        'Execução do pipeline: 10 vendas inseridas (IDs 1-10), 0 rejeitadas',
+    ]
+
+
+def test_sem_auditoria(temp_env):
+    pipeline.executar_pipeline(montar_vendas(3), caminho_raw='', nivel_auditoria='nenhuma')
+    with pytest.raises(sqlite3.OperationalError):
+        mensagens_auditoria()
+
+
+@pytest.mark.parametrize('opcao, esperado', [('keep', True), ('off', False)])
+def test_migracao_torna_trigger_de_log_opcional(tmp_path, opcao, esperado):
+    banco = str(tmp_path / 'vendas.db')
+    ensure_loja_vendedor.main(['--db', banco])
+    ensure_loja_vendedor.main(['--db', banco, '--sale-log-trigger', opcao])
+
+    def trigger_ativo():
+        conn = sqlite3.connect(banco)
+        ativo = ensure_loja_vendedor.trigger_exists(conn, ensure_loja_vendedor.SALE_LOG_TRIGGER)
+        conn.close()
+        return ativo
+
+    assert trigger_ativo() is esperado
+    # rodar de novo sem opção preserva o estado escolhido
+    ensure_loja_vendedor.main(['--db', banco])
+    assert trigger_ativo() is esperado
@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+import sqlite3
+
+import pytest
+
+from src import db_utils
+from src import pipeline
+from tests.conftest import montar_vendas, contar_vendas
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'db', 'schema.sql')
+
+
+def triggers_de_vendas():
+    """CREATE TRIGGER de vendas definidos em schema.sql"""
+    schema = open(SCHEMA_PATH, encoding='utf-8').read()
+    return [bloco for bloco in re.findall(r'^CREATE TRIGGER.*?^END;', schema, re.S | re.M) if ' ON vendas' in bloco]
+
+
+def preparar_banco(caminho, monkeypatch):
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(caminho))
+    db_utils.criar_tabela()
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        ALTER TABLE loja_vendedor ADD COLUMN ativo BOOLEAN DEFAULT 1;
+        CREATE TABLE sistema_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, modulo TEXT,
+                                   mensagem TEXT, usuario TEXT);
+        CREATE INDEX idx_vendas_cpf ON vendas(cpf);
+        CREATE INDEX idx_vendas_loja ON vendas(codigo_loja);
+        INSERT INTO lojas VALUES ('L1', 'Loja 1'), ('L2', 'Loja 2');
+        INSERT INTO vendedores VALUES ('V1', 'Vendedor 1'), ('V2', 'Vendedor 2');
+        INSERT INTO loja_vendedor(codigo_loja, codigo_vendedor) VALUES ('L1', 'V1'), ('L2', 'V2');
+    """)
+    for trigger in triggers_de_vendas():
+        conn.execute(trigger)
+    conn.execute("INSERT INTO vendas (id_cliente, nome_cliente, cpf, codigo_produto, quantidade, data_venda, "
+                 "data_compra, codigo_loja, codigo_vendedor) VALUES (0, 'Antigo', '900', 'P1', 1, '02/01/2024', "
+                 "'02/01/2024', 'L1', 'V1')")
+    conn.commit()
+    conn.close()
+
+
+def venda(cpf, loja='L1', vendedor='V1', quantidade=1, data='01/01/2024'):
+    return {'nome_cliente': f'Cliente {cpf}', 'cpf': cpf, 'codigo_produto': 'P1', 'quantidade': quantidade,
+            'data_venda': data, 'codigo_loja': loja, 'codigo_vendedor': vendedor}
+
+
+def versao_schema(caminho):
+    conn = sqlite3.connect(caminho)
+    versao = conn.execute("PRAGMA schema_version").fetchone()[0]
+    conn.close()
+    return versao
+
+
+def estado_banco(caminho):
+    conn = sqlite3.connect(caminho)
+    vendas = conn.execute("SELECT id_venda, cpf, codigo_loja, codigo_vendedor FROM vendas ORDER BY id_venda").fetchall()
+    logs = conn.execute("SELECT mensagem FROM sistema_logs ORDER BY id").fetchall()
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name").fetchall()
+    conn.close()
+    return vendas, logs, triggers
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, 'DUPLICATE_LOG', str(tmp_path / 'duplicates.log'))
+    monkeypatch.setattr(db_utils, 'DUPLICATE_CSV', str(tmp_path / 'duplicates.csv'))
+
+
+def test_carga_em_bloco_equivale_a_insercao_com_triggers(tmp_path, monkeypatch, reports, caplog):
+    lote = [
+        venda('1'),
+        venda('2', loja='L1', vendedor='V2'),   # vendedor fora da loja
+        venda('3', quantidade=0),                 # viola CHECK(quantidade > 0)
+        venda('5', loja='L1', vendedor='V2', quantidade=0),  # trigger e CHECK: o trigger dispara antes
+        venda('3'),                               # primeira ocorrência falhou: esta entra
+        venda('1'),                               # repetido no lote
+        venda('4', loja='L2', vendedor='V2'),
+        venda('900'),                             # CPF já gravado
+    ]
+
+    resultados = {}
+    for carga_em_bloco in (False, True):
+        caminho = tmp_path / f'vendas_{carga_em_bloco}.db'
+        preparar_banco(caminho, monkeypatch)
+        versao_antes = versao_schema(caminho)
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger='app'):
+            retorno = db_utils.inserir_lote(lote, carga_em_bloco=carga_em_bloco)
+        if carga_em_bloco:
+            assert not any('Carga em bloco falhou' in r.getMessage() for r in caplog.records)
+        # nenhum DDL na gravação: as conexões do dashboard não precisam repreparar consultas
+        assert versao_schema(caminho) == versao_antes
+        erros = sorted(r.getMessage() for r in caplog.records if r.levelno == logging.ERROR)
+        resultados[carga_em_bloco] = (retorno, erros, estado_banco(caminho))
+
+    assert resultados[True] == resultados[False]
+    retorno, erros, _ = resultados[True]
+    assert retorno == [True, False, False, False, True, False, True, False]
+    assert erros == ['❌ Erro ao inserir venda: CHECK constraint failed: quantidade > 0',
+                     '❌ Erro ao inserir venda: Vendedor não está atribuído à loja informada',
+                     '❌ Erro ao inserir venda: Vendedor não está atribuído à loja informada']
+
+
+def test_pipeline_em_bloco_suspende_e_recria_indices(tmp_path, monkeypatch, reports):
+    monkeypatch.chdir(tmp_path)
+    caminho = tmp_path / 'vendas.db'
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(caminho))
+    db_utils.criar_tabela()
+    conn = sqlite3.connect(caminho)
+    conn.execute("CREATE INDEX idx_vendas_cpf ON vendas(cpf)")
+    conn.execute("CREATE INDEX idx_vendas_loja ON vendas(codigo_loja)")
+    conn.commit()
+    conn.close()
+
+    suspensos = []
+    suspender_original = pipeline.suspender_indices_vendas
+
+    def suspender():
+        suspensos.append(suspender_original())
+        return suspensos[-1]
+
+    monkeypatch.setattr(pipeline, 'suspender_indices_vendas', suspender)
+    resultado = pipeline.executar_pipeline(montar_vendas(20), caminho_raw='', chunk_size=6,
+                                           carga_em_bloco=True, recriar_indices=True)
+
+    assert resultado['sucesso'] and contar_vendas() == 20
+    # idx_vendas_loja e os índices de data (idx_vendas_cpf é mantido durante a carga)
+    assert suspensos == [3]
+    conn = sqlite3.connect(caminho)
+    indices = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert {'idx_vendas_cpf', 'idx_vendas_loja', 'idx_vendas_data_venda_iso'} <= indices
+    assert not os.path.exists(tmp_path / 'indices_suspensos.json')
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from src.categorias import normalizar_categorias, normalizar_colunas
+
+
+def test_normaliza_uma_vez_por_valor_e_funde_categorias():
+    chamadas = []
+
+    def funcao(valor):
+        chamadas.append(valor)
+        return valor.strip().upper()
+
+    serie = pd.Series(['pix', ' Pix', 'cartão', None, 'pix'] * 100, name='forma_pagamento')
+    normalizada = normalizar_categorias(serie, funcao)
+
+    assert sorted(chamadas) == [' Pix', 'cartão', 'pix']
+    assert isinstance(normalizada.dtype, pd.CategoricalDtype)
+    assert list(normalizada.cat.categories) == ['PIX', 'CARTÃO', '']
+    assert normalizada.tolist()[:5] == ['PIX', 'PIX', 'CARTÃO', '', 'PIX']
+    assert normalizada.index.equals(serie.index) and normalizada.name == 'forma_pagamento'
+
+    assert normalizar_categorias(pd.Series(['a', None]), str.upper, valor_nulo=None).isna().tolist() == [False, True]
+
+
+def test_colunas_de_alta_cardinalidade_voltam_a_texto():
+    df = pd.DataFrame({
+        'cidade': ['São Paulo', 'Santos'] * 50,
+        'nome_cliente': [f'Cliente {i}' for i in range(100)],
+    })
+    normalizar_colunas(df, ['cidade', 'nome_cliente', 'inexistente'], str.lower)
+
+    assert isinstance(df['cidade'].dtype, pd.CategoricalDtype)
+    assert df['nome_cliente'].dtype == object and df['nome_cliente'][3] == 'cliente 3'
+    # categórica em filtros e agrupamentos
+    assert df[df['cidade'].isin(['santos'])].shape[0] == 50
+    assert df.groupby('cidade', observed=True).size().to_dict() == {'são paulo': 50, 'santos': 50}
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import checkpoints
+from src import db_utils
+from src import pipeline
+from tests.conftest import montar_vendas, contar_vendas, resumo_deterministico
+
+
+def falhar_no_chunk(monkeypatch, numero):
+    gravar_original = pipeline.gravar_chunk
+    chamadas = []
+
+    def gravar(lote, *args):
+        chamadas.append(1)
+        if len(chamadas) == numero:
+            raise RuntimeError('conexão perdida')
+        return gravar_original(lote, *args)
+
+    monkeypatch.setattr(pipeline, 'gravar_chunk', gravar)
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_retomada_produz_mesmo_resumo_que_execucao_continua(temp_env, monkeypatch, streaming):
+    df = montar_vendas(40)
+    caminho = temp_env / 'vendas.csv'
+    df.to_csv(caminho, sep=';', index=False)
+
+    def executar(retomar=False):
+        if streaming:
+            return pipeline.executar_pipeline_stream(str(caminho), caminho_raw='', chunk_size=6, sep=';',
+                                                     retomar=retomar)
+        return pipeline.executar_pipeline(df, caminho_raw='', chunk_size=6, retomar=retomar)
+
+    with monkeypatch.context() as m:
+        falhar_no_chunk(m, 4)
+        interrompido = executar()
+    assert not interrompido['sucesso']
+    assert contar_vendas() == 18
+
+    arquivos = os.listdir(checkpoints.DIRETORIO_CHECKPOINTS)
+    assert len(arquivos) == 1
+
+    retomado = executar(retomar=True)
+    assert retomado['sucesso']
+    assert contar_vendas() == 40
+    assert not os.path.exists(db_utils.DUPLICATE_LOG)
+    assert os.listdir(checkpoints.DIRETORIO_CHECKPOINTS) == []
+    resumo_retomado = resumo_deterministico(retomado['resumo_csv'])
+
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(temp_env / 'continuo.db'))
+    db_utils.criar_tabela()
+    continuo = executar()
+
+    assert resumo_retomado == resumo_deterministico(continuo['resumo_csv'])
+    # amostra do relatório e entidades criadas também cobrem a parte anterior à interrupção
+    assert retomado['estatisticas']['novas_entidades'] == continuo['estatisticas']['novas_entidades']
+    assert pd.read_csv(retomado['relatorio_csv']).equals(pd.read_csv(continuo['relatorio_csv']))
+
+
+def test_checkpoint_com_outro_chunk_size_e_ignorado(temp_env):
+    checkpoints.salvar_checkpoint('abc', {'chunk_size': 10, 'inicio': 0, 'ultimo_chunk': 1, 'total_linhas': 10})
+
+    assert checkpoints.carregar_checkpoint('abc', 10)['total_linhas'] == 10
+    assert checkpoints.carregar_checkpoint('abc', 20) is None
+    assert checkpoints.carregar_checkpoint('outra', 10) is None
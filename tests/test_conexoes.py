@@ -0,0 +1,156 @@
+import threading
+
+import pytest
+
+from src import db_utils
+
+
+class SupabaseIndisponivel:
+    def table(self, nome):
+        raise ConnectionError('supabase fora do ar')
+
+
+@pytest.fixture
+def gerenciador(tmp_path, monkeypatch):
+    chamadas = []
+
+    def create_client_falso(url, key):
+        chamadas.append((url, key))
+        return SupabaseIndisponivel()
+
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(tmp_path / 'vendas.db'))
+    monkeypatch.setattr(db_utils, 'HAS_SUPABASE', True)
+    monkeypatch.setattr(db_utils, 'create_client', create_client_falso, raising=False)
+
+    gerenciador = db_utils.ConnectionManager(intervalo_verificacao=3600, tamanho_pool=2)
+    monkeypatch.setattr(db_utils, 'gerenciador_conexoes', gerenciador)
+    yield gerenciador, chamadas
+    gerenciador.fechar()
+
+
+def test_backend_verificado_uma_vez_por_intervalo(gerenciador):
+    manager, chamadas = gerenciador
+    db_utils.criar_tabela()
+    for _ in range(5):
+        db_utils.buscar_vendas()
+
+    assert len(chamadas) == 1
+    assert manager.backend() == 'sqlite'
+
+    manager.invalidar()
+    manager.backend()
+    assert len(chamadas) == 2
+
+
+def test_pool_reaproveita_conexoes_sqlite(gerenciador):
+    with db_utils.db_connection() as (conn1, db_type):
+        assert db_type == 'sqlite'
+        conn1.execute("CREATE TABLE t (x INTEGER)")
+        conn1.execute("INSERT INTO t VALUES (1)")
+
+    # a transação foi confirmada ao sair e a conexão voltou ao pool
+    with db_utils.db_connection() as (conn2, _):
+        assert conn2 is conn1
+        assert conn2.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+    # erro dentro do bloco desfaz a transação
+    with pytest.raises(RuntimeError):
+        with db_utils.db_connection() as (conn3, _):
+            conn3.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError('falha')
+    with db_utils.db_connection() as (conn4, _):
+        assert conn4.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+
+def test_sonda_lenta_nao_bloqueia_conexoes_sqlite(gerenciador, monkeypatch):
+    manager, _ = gerenciador
+    assert manager.backend() == 'sqlite'
+
+    sonda_iniciada = threading.Event()
+    liberar_sonda = threading.Event()
+
+    class SupabaseLento:
+        def table(self, nome):
+            sonda_iniciada.set()
+            liberar_sonda.wait(5)
+            raise ConnectionError('supabase fora do ar')
+
+    monkeypatch.setattr(db_utils, 'create_client', lambda url, key: SupabaseLento())
+    manager.intervalo_verificacao = 0
+
+    verificacao = threading.Thread(target=manager.backend)
+    verificacao.start()
+    try:
+        assert sonda_iniciada.wait(5)
+        # com a sonda presa, o backend em cache continua servindo conexões SQLite
+        resultado = []
+
+        def consulta_sqlite():
+            with db_utils.db_connection() as (conn, db_type):
+                resultado.append((db_type, conn.execute("SELECT 1").fetchone()[0]))
+
+        consulta = threading.Thread(target=consulta_sqlite)
+        consulta.start()
+        consulta.join(2)
+        assert not consulta.is_alive()
+        assert resultado == [('sqlite', 1)]
+    finally:
+        liberar_sonda.set()
+        verificacao.join(5)
+    assert manager.backend() == 'sqlite'
+
+
+class ConsultaFalsa:
+    def __init__(self, cliente, tabela):
+        self.cliente, self.tabela = cliente, tabela
+        self.acao = None
+
+    def select(self, colunas):
+        self.acao = ('select', colunas)
+        return self
+
+    def insert(self, registros):
+        self.acao = ('insert', registros)
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        acao, valor = self.acao
+        self.cliente.consultas.append((self.tabela, acao))
+        if acao == 'select' and self.tabela == 'vendas' and 'data_venda_iso' in valor:
+            raise Exception('column vendas.data_venda_iso does not exist')
+        if acao == 'insert':
+            registros = valor if isinstance(valor, list) else [valor]
+            if any('data_venda_iso' in r for r in registros):
+                raise Exception("Could not find the 'data_venda_iso' column of 'vendas'")
+            self.cliente.inseridos.extend(registros)
+        return self
+
+
+class SupabaseSemColunasIso:
+    def __init__(self):
+        self.inseridos = []
+        self.consultas = []
+
+    def table(self, nome):
+        return ConsultaFalsa(self, nome)
+
+
+def test_supabase_sem_colunas_iso_continua_aceitando_vendas(gerenciador, monkeypatch):
+    manager, _ = gerenciador
+    cliente = SupabaseSemColunasIso()
+    monkeypatch.setattr(db_utils, 'create_client', lambda url, key: cliente)
+    manager.invalidar()
+
+    venda = {'nome_cliente': 'Cliente', 'cpf': '1', 'codigo_produto': 'P1', 'quantidade': 1,
+             'data_venda': '1/2/2024', 'codigo_loja': 'L1', 'codigo_vendedor': 'V1'}
+    assert db_utils.inserir_lote([venda, dict(venda, cpf='2')]) == [True, True]
+    assert db_utils.inserir_lote([dict(venda, cpf='3')]) == [True]
+
+    assert [r['cpf'] for r in cliente.inseridos] == ['1', '2', '3']
+    assert not any(col in r for r in cliente.inseridos for col in db_utils.COLUNAS_DATA_ISO)
+    # a ausência das colunas é verificada uma única vez, e nenhum insert é recusado
+    assert cliente.consultas.count(('vendas', 'select')) == 1
+    assert cliente.consultas.count(('vendas', 'insert')) == 2
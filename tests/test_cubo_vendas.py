@@ -0,0 +1,131 @@
+import sqlite3
+
+import pandas as pd
+
+from src import db_utils
+from src import pipeline
+from src.cubo_vendas import CuboVendas, CuboVendasIncremental, cubo_do_banco
+from tests.conftest import carregar_vendas, montar_vendas
+
+
+def vendas_exemplo():
+    return pd.DataFrame({
+        'data_venda_dt': pd.to_datetime(['2024-01-30', '2024-01-30', '2024-02-01', '2024-02-02', None, '2024-02-02']),
+        'nome_loja': ['Loja A', 'Loja A', 'Loja B', 'Loja A', 'Loja B', None],
+        'nome_vendedor': pd.Categorical(['Ana', 'Ana', 'Bia', 'Bia', 'Ana', 'Ana']),
+        'nome_produto': ['P1', 'P2', 'P1', 'P1', 'P2', 'P1'],
+        'forma_pagamento': ['Pix', 'Pix', 'Dinheiro', 'Pix', 'Pix', 'Pix'],
+        'quantidade': [1, 2, 3, 1, 5, 1],
+        'valor_produto': [10.0, 5.0, 10.0, 10.0, 5.0, 10.0],
+    })
+
+
+def test_somar_confere_com_groupby():
+    df = vendas_exemplo()
+    df['valor_total'] = df['valor_produto'] * df['quantidade']
+    cubo = CuboVendas.de_vendas(df)
+
+    assert cubo.totais() == {'total_vendas': 6, 'quantidade': 13, 'valor_total': 95.0}
+
+    por_loja = cubo.somar('nome_loja').set_index('nome_loja').sort_index()
+    esperado = df.groupby('nome_loja').agg(total_vendas=('quantidade', 'size'), quantidade=('quantidade', 'sum'),
+                                           valor_total=('valor_total', 'sum'))
+    pd.testing.assert_frame_equal(por_loja, esperado, check_dtype=False)
+
+    # ano/mes derivados do dia; vendas sem data ficam fora, como no groupby
+    por_mes = cubo.somar('ano', 'mes').sort_values(['ano', 'mes'])
+    assert por_mes[['ano', 'mes', 'valor_total']].values.tolist() == [[2024, 1, 20.0], [2024, 2, 50.0]]
+
+
+def test_fatiar_por_filtros_e_datas():
+    cubo = CuboVendas.de_vendas(vendas_exemplo())
+
+    fatia = cubo.fatiar({'lojas': ['Loja A'], 'vendedores': None, 'data_inicio': '2024-01-31',
+                         'data_fim': pd.Timestamp('2024-02-02').date()})
+    assert fatia.totais() == {'total_vendas': 1, 'quantidade': 1, 'valor_total': 10.0}
+    assert cubo.fatiar({'formas_pagamento': []}).vazio
+    assert cubo.fatiar({}) is cubo
+    assert cubo.fatiar({'produtos': ['P9']}).somar('nome_produto').empty
+
+
+def test_cubo_do_banco_igual_as_vendas_filtradas(temp_env):
+    carregar_vendas(16)
+    cubo, maior_id = cubo_do_banco()
+    assert maior_id == db_utils.ultimo_id_venda()
+
+    gerente = db_utils.restricoes_perfil('manager', 'Loja 1', 'Gerente')
+    filtros = {'produtos': ['Produto 0', 'Produto 2'], 'data_inicio': '2024-01-02'}
+    vendas = db_utils.buscar_vendas_filtradas(filtros, gerente)
+    fatia = cubo.fatiar(db_utils.combinar_filtros(filtros, gerente))
+
+    assert len(vendas) > 0
+    assert fatia.totais()['total_vendas'] == len(vendas)
+    assert fatia.totais()['valor_total'] == (vendas['valor_produto'] * vendas['quantidade']).sum()
+    por_produto = fatia.somar('nome_produto').set_index('nome_produto')['quantidade']
+    assert por_produto.to_dict() == vendas.groupby('nome_produto')['quantidade'].sum().to_dict()
+
+
+def test_cubo_do_banco_conta_vendas_sem_data(temp_env):
+    carregar_vendas(8)
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("UPDATE vendas SET data_venda = 'sem data', data_venda_iso = NULL WHERE id_venda IN (1, 2)")
+    conn.commit()
+    conn.close()
+    db_utils.reconstruir_resumo_vendas()
+
+    cubo, _ = cubo_do_banco()
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    total, quantidade = conn.execute("SELECT COUNT(*), SUM(quantidade) FROM vendas").fetchone()
+    conn.close()
+    # sem filtro de período os totais batem com as vendas; com ele, as sem data saem
+    assert cubo.totais()['total_vendas'] == total == 8
+    assert cubo.totais()['quantidade'] == quantidade
+    assert cubo.fatiar({'data_inicio': '2000-01-01'}).totais()['total_vendas'] == 6
+    assert cubo.fatiar({'lojas': ['Loja 0', 'Loja 1']}).totais()['total_vendas'] == 8
+
+
+def copiar_venda_sem_resumo(id_venda, cpf):
+    """Grava uma cópia da venda direto no banco, sem passar pelo pipeline (resumo fica atrasado)"""
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    venda = dict(conn.execute("SELECT * FROM vendas WHERE id_venda = ?", (id_venda,)).fetchone())
+    del venda['id_venda']
+    venda['cpf'] = cpf
+    conn.execute(f"INSERT INTO vendas ({', '.join(venda)}) VALUES ({', '.join('?' * len(venda))})",
+                 list(venda.values()))
+    conn.commit()
+    conn.close()
+
+
+def totais_por_loja(cubo):
+    return cubo.somar('dia', 'nome_loja').sort_values(['dia', 'nome_loja']).reset_index(drop=True)
+
+
+def test_cubo_incremental_acrescenta_so_vendas_novas(temp_env):
+    carregar_vendas(8)
+    copiar_venda_sem_resumo(1, '99999999999')  # acima da marca d'água do resumo
+    incremental = CuboVendasIncremental()
+    versao = db_utils.versao_dados_vendas()
+    cubo = incremental.atualizar(versao)
+    assert cubo.totais()['total_vendas'] == 9
+    assert db_utils.versao_dados_vendas() == versao
+    assert incremental.atualizar(versao) is cubo
+
+    # carga nova com um dia que o cubo ainda não tinha
+    novas = montar_vendas(12).iloc[8:]
+    novas['data_venda'] = '10/01/2024'
+    pipeline.executar_pipeline(novas, caminho_raw='')
+    grupos, maior_id = db_utils.buscar_vendas_agrupadas(desde_id=incremental.ultimo_id_venda)
+    assert grupos['total_vendas'].sum() == 4 and maior_id == db_utils.ultimo_id_venda()
+
+    cubo = incremental.atualizar(db_utils.versao_dados_vendas())
+    assert incremental.ultimo_id_venda == maior_id
+    pd.testing.assert_frame_equal(totais_por_loja(cubo), totais_por_loja(cubo_do_banco()[0]))
+    assert cubo.fatiar({'data_inicio': '2024-01-10'}).totais()['total_vendas'] == 4
+
+    # exclusão da última venda: o maior id_venda diminui e o cubo é reconstruído das vendas
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("DELETE FROM vendas WHERE id_venda = ?", (maior_id,))
+    conn.commit()
+    conn.close()
+    assert incremental.atualizar(db_utils.versao_dados_vendas()).totais()['total_vendas'] == 12
@@ -0,0 +1,130 @@
+import sqlite3
+
+from src import db_utils
+from src import pipeline
+from src.migrations import ensure_loja_vendedor
+from tests.conftest import montar_vendas
+
+
+def test_data_iso():
+    assert db_utils.data_iso('05/03/2024') == '2024-03-05'
+    assert db_utils.data_iso('2024-03-05') == '2024-03-05'
+    assert db_utils.data_iso('2024-03-05 10:00:00') == '2024-03-05'
+    assert db_utils.data_iso('1/1/2024') == '2024-01-01'
+    assert db_utils.data_iso(' 1/03/2024') == '2024-03-01'
+    assert db_utils.data_iso('15/3/2024') == '2024-03-15'
+    assert db_utils.data_iso('') is None
+    assert db_utils.data_iso(None) is None
+    # datas inexistentes ou com texto a mais não entram na coluna ISO
+    for invalida in ('1/1/20245', '10/13/2024', '31/02/2024', '0/1/2024', '2024-13-01', '2024-03-051'):
+        assert db_utils.data_iso(invalida) is None
+
+
+def test_data_iso_sql_equivale_ao_python():
+    datas = ['05/03/2024', '1/1/2024', ' 15/3/2024', '2024-03-05 10:00:00', '29/02/2024',
+             '1/1/20245', '10/13/2024', '31/02/2024', '29/02/2023', '0/1/2024', '2024-02-30', '', None]
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE vendas (data_venda TEXT)")
+    conn.executemany("INSERT INTO vendas VALUES (?)", [(data,) for data in datas])
+    esperado = [db_utils.data_iso(data) for data in datas]
+    for expressao in (db_utils._sql_data_iso('data_venda'), ensure_loja_vendedor.iso_date_sql('data_venda')):
+        assert [row[0] for row in conn.execute(f"SELECT {expressao} FROM vendas ORDER BY rowid")] == esperado
+    conn.close()
+
+
+def test_buscar_vendas_ordena_e_filtra_por_data_iso(temp_env):
+    df = montar_vendas(4)
+    df['data_venda'] = ['31/01/2024', '01/02/2024', '15/12/2023', '02/01/2024']
+    pipeline.executar_pipeline(df, caminho_raw='')
+
+    vendas = db_utils.buscar_vendas()
+    assert vendas['data_venda'].tolist() == ['01/02/2024', '31/01/2024', '02/01/2024', '15/12/2023']
+
+    janeiro = db_utils.buscar_vendas(data_inicio='2024-01-01', data_fim='31/01/2024')
+    assert sorted(janeiro['data_venda']) == ['02/01/2024', '31/01/2024']
+
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    plano = ' '.join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM vendas WHERE data_venda_iso >= ? AND data_venda_iso <= ?",
+        ('2024-01-01', '2024-01-31')))
+    conn.close()
+    assert 'idx_vendas_data_venda_iso' in plano
+
+
+def test_banco_antigo_recebe_colunas_iso(temp_env):
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("DROP TABLE vendas")
+    conn.execute("CREATE TABLE vendas (id_venda INTEGER PRIMARY KEY, cpf TEXT, data_venda TEXT, data_compra TEXT)")
+    conn.execute("INSERT INTO vendas (cpf, data_venda, data_compra) VALUES ('1', '20/06/2023', '19/06/2023')")
+    conn.commit()
+    conn.close()
+
+    db_utils.criar_tabela()
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    assert conn.execute("SELECT data_venda_iso, data_compra_iso FROM vendas").fetchone() == ('2023-06-20', '2023-06-19')
+    conn.close()
+
+
+def test_migracao_preenche_datas_e_recria_view_mensal(tmp_path):
+    banco = str(tmp_path / 'vendas.db')
+    ensure_loja_vendedor.main(['--db', banco])
+    # banco de antes das colunas ISO
+    conn = sqlite3.connect(banco)
+    conn.execute("DROP INDEX idx_vendas_data_venda_iso")
+    for view in ensure_loja_vendedor.DATE_VIEWS:
+        conn.execute(f"DROP VIEW {view}")
+    conn.execute("ALTER TABLE vendas DROP COLUMN data_venda_iso")
+    conn.execute("INSERT INTO lojas (codigo_loja, nome_loja) VALUES ('L1', 'Loja 1')")
+    conn.execute("INSERT INTO vendedores (codigo_vendedor, nome_vendedor) VALUES ('V1', 'Vendedor 1')")
+    conn.execute("INSERT INTO loja_vendedor (codigo_loja, codigo_vendedor) VALUES ('L1', 'V1')")
+    conn.execute("INSERT INTO vendas (id_cliente, nome_cliente, cpf, codigo_produto, quantidade, valor_produto, "
+                 "data_venda, data_compra, codigo_loja, codigo_vendedor) "
+                 "VALUES (1, 'C', '1', 'P001', 2, 10, '20/06/2023', '20/06/2023', 'L1', 'V1')")
+    conn.commit()
+    conn.close()
+
+    ensure_loja_vendedor.main(['--db', banco])
+    conn = sqlite3.connect(banco)
+    assert conn.execute("SELECT mes_ano, total_vendas FROM vw_vendas_mensais").fetchall() == [('2023-06', 1)]
+    conn.close()
+
+
+def test_datas_sem_zero_a_esquerda_entram_no_resumo_e_nos_filtros(temp_env):
+    df = montar_vendas(4)
+    df['data_venda'] = ['1/1/2024', ' 2/01/2024', '15/1/2024', '01/02/2024']
+    pipeline.executar_pipeline(df, caminho_raw='')
+
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    assert sorted(row[0] for row in conn.execute("SELECT data_venda_iso FROM vendas")) == \
+        ['2024-01-01', '2024-01-02', '2024-01-15', '2024-02-01']
+    assert conn.execute("SELECT SUM(total_vendas) FROM vendas_resumo_diario").fetchone()[0] == 4
+    # mesma conversão no SQL (preenchimento de bancos antigos) e no Python
+    assert [row[0] for row in conn.execute(
+        f"SELECT {db_utils._sql_data_iso('data_venda')} FROM vendas ORDER BY id_venda")] == \
+        [db_utils.data_iso(data) for data in df['data_venda']]
+    conn.close()
+
+    janeiro = db_utils.buscar_vendas(data_inicio='2024-01-01', data_fim='2024-01-31')
+    assert len(janeiro) == 3
+
+
+def test_preenchimento_de_datas_sem_zero_reconstroi_resumo(temp_env):
+    df = montar_vendas(4)
+    pipeline.executar_pipeline(df, caminho_raw='')
+
+    # vendas gravadas antes do suporte a d/m/aaaa: sem dia ISO e fora do resumo
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("UPDATE vendas SET data_venda = '2/1/2024', data_venda_iso = NULL WHERE id_venda <= 2")
+    conn.execute("DELETE FROM vendas_resumo_diario")
+    conn.execute("INSERT INTO vendas_resumo_diario SELECT data_venda_iso, codigo_loja, codigo_vendedor, "
+                 "codigo_produto, COALESCE(forma_pagamento, ''), COUNT(*), SUM(quantidade), 0 "
+                 "FROM vendas WHERE data_venda_iso IS NOT NULL GROUP BY 1, 2, 3, 4, 5")
+    conn.commit()
+    conn.close()
+
+    db_utils.criar_tabela()
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    assert conn.execute("SELECT data_venda_iso FROM vendas WHERE id_venda = 1").fetchone() == ('2024-01-02',)
+    assert conn.execute("SELECT SUM(total_vendas) FROM vendas_resumo_diario").fetchone()[0] == 4
+    assert conn.execute("SELECT SUM(total_vendas) FROM vendas_resumo_diario WHERE dia = '2024-01-02'").fetchone()[0] >= 2
+    conn.close()
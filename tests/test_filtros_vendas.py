@@ -0,0 +1,103 @@
+import sqlite3
+
+from src import db_utils
+from src import pipeline
+from tests.conftest import carregar_vendas, montar_vendas
+
+
+def test_filtros_aplicados_na_consulta(temp_env):
+    carregar_vendas(16)
+
+    todas = db_utils.buscar_vendas_filtradas()
+    assert len(todas) == 16
+    assert {'nome_loja', 'nome_produto', 'valor_produto'} <= set(todas.columns)
+    assert set(todas['nome_produto']) == {'Produto 0', 'Produto 1', 'Produto 2'}
+
+    filtradas = db_utils.buscar_vendas_filtradas({
+        'lojas': ['Loja 0'],
+        'produtos': ['Produto 0', 'Produto 1'],
+        'formas_pagamento': ['Pix'],
+        'data_inicio': '2024-01-02',
+        'data_fim': '03/01/2024',
+    })
+    esperadas = todas[(todas['nome_loja'] == 'Loja 0') & todas['nome_produto'].isin(['Produto 0', 'Produto 1'])
+                      & todas['data_venda_iso'].between('2024-01-02', '2024-01-03')]
+    assert sorted(filtradas['id_venda']) == sorted(esperadas['id_venda'])
+    assert (filtradas['valor_produto'] == filtradas['codigo_produto'].map({'P0': 10.0, 'P1': 20.0})).all()
+
+    # lista vazia = nenhuma venda (como um multiselect sem seleção)
+    assert db_utils.buscar_vendas_filtradas({'lojas': []}).empty
+
+
+def test_restricoes_de_perfil(temp_env):
+    carregar_vendas(16)
+
+    assert db_utils.restricoes_perfil('admin', 'Todas lojas', 'Admin') == {}
+    assert db_utils.restricoes_perfil('manager', 'Todas lojas', 'Gerente') == {}
+
+    gerente = db_utils.restricoes_perfil('manager', 'Loja 1', 'Gerente')
+    vendas = db_utils.buscar_vendas_filtradas({'lojas': ['Loja 0', 'Loja 1']}, gerente)
+    assert set(vendas['nome_loja']) == {'Loja 1'} and len(vendas) == 8
+    # filtro fora do que o perfil permite não amplia o acesso
+    assert db_utils.buscar_vendas_filtradas({'lojas': ['Loja 0']}, gerente).empty
+
+    vendedor = db_utils.restricoes_perfil('user', 'Loja 1', 'Vendedor 3')
+    vendas = db_utils.buscar_vendas_filtradas(None, vendedor)
+    assert set(vendas['nome_vendedor']) == {'Vendedor 3'} and len(vendas) == 4
+
+    opcoes = db_utils.buscar_opcoes_filtros(gerente)
+    assert opcoes['lojas'] == ['Loja 1']
+    assert opcoes['vendedores'] == ['Vendedor 1', 'Vendedor 3']
+    assert opcoes['formas_pagamento'] == ['Pix']
+    assert (opcoes['data_min'], opcoes['data_max']) == ('2024-01-02', '2024-01-04')
+
+    sem_vendas = db_utils.buscar_opcoes_filtros(db_utils.restricoes_perfil('user', 'Loja 0', 'Vendedor 1'))
+    assert sem_vendas['vendedores'] == [] and sem_vendas['data_min'] is None
+
+
+def test_versao_dos_dados_muda_com_novas_vendas(temp_env):
+    carregar_vendas(4)
+    versao = db_utils.versao_dados_vendas()
+    assert versao == db_utils.versao_dados_vendas()
+
+    pipeline.executar_pipeline(montar_vendas(6).iloc[4:], caminho_raw='')
+    assert db_utils.versao_dados_vendas() != versao
+
+
+def test_versao_muda_com_qualquer_gravacao_e_so_com_ela(temp_env):
+    carregar_vendas(4)
+    versao = db_utils.versao_dados_vendas()
+
+    # leituras e checkpoint do WAL não mudam a versão
+    db_utils.buscar_vendas_filtradas()
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    assert db_utils.versao_dados_vendas() == versao
+
+    # gravação por outra conexão, sem venda nova (mesmo maior id_venda)
+    conn.execute("UPDATE lojas SET nome_loja = 'Loja Nova' WHERE codigo_loja = (SELECT MIN(codigo_loja) FROM lojas)")
+    conn.commit()
+    conn.close()
+    nova = db_utils.versao_dados_vendas()
+    assert nova != versao and nova[-1] == versao[-1]
+    assert db_utils.versao_dados_vendas() == nova
+
+
+def test_paginas_ordenadas_no_banco(temp_env):
+    carregar_vendas(16)
+    gerente = db_utils.restricoes_perfil('manager', 'Loja 1', 'Gerente')
+
+    # páginas consecutivas = consulta completa na mesma ordem (desempate por id_venda)
+    todas = db_utils.buscar_vendas_filtradas(None, gerente, ordenar_por='valor_total')
+    paginas = [db_utils.buscar_vendas_filtradas(None, gerente, limit=3, offset=inicio, ordenar_por='valor_total')
+               for inicio in range(0, 9, 3)]
+    assert [len(p) for p in paginas] == [3, 3, 2]
+    assert sum((p['id_venda'].tolist() for p in paginas), []) == todas['id_venda'].tolist()
+    valores = (todas['valor_produto'] * todas['quantidade']).tolist()
+    assert valores == sorted(valores, reverse=True)
+
+    # padrão: data da venda mais recente primeiro
+    crescente = db_utils.buscar_vendas_filtradas(ordenar_por='data_venda', decrescente=False)
+    assert crescente['data_venda_iso'].is_monotonic_increasing
+    assert db_utils.buscar_vendas_filtradas(limit=2)['data_venda_iso'].tolist() == ['2024-01-04'] * 2
+    assert db_utils.buscar_vendas_filtradas(offset=14).shape[0] == 2
@@ -0,0 +1,114 @@
+import io
+import os
+import sqlite3
+
+from src import db_utils
+from src import importacoes
+from src import pipeline
+from src.importacoes import calcular_impressao, planejar_importacao
+from tests.conftest import montar_vendas, contar_vendas
+
+
+def importacoes_registradas():
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    linhas = conn.execute("""
+        SELECT nome_arquivo, total_registros, registros_importados, status
+        FROM importacoes ORDER BY id
+    """).fetchall()
+    conn.close()
+    return linhas
+
+
+def test_impressao_com_hash_de_prefixo(tmp_path):
+    caminho = tmp_path / 'a.csv'
+    caminho.write_bytes(b'abc\n123\n')
+
+    impressao = calcular_impressao(str(caminho), tamanhos_prefixo=[4])
+    assert impressao['tamanho_bytes'] == 8
+    assert impressao['hashes_prefixo'][4] == calcular_impressao(b'abc\n')['hash_arquivo']
+    assert calcular_impressao(caminho.read_bytes())['hash_arquivo'] == impressao['hash_arquivo']
+
+
+def test_impressao_de_arquivo_texto_conta_bytes(tmp_path):
+    conteudo = 'nome;cidade\nJoão;São Paulo\nCecília;Brasília\n'.encode('utf-8')
+    caminho = tmp_path / 'acentos.csv'
+    caminho.write_bytes(conteudo)
+    prefixo = len('nome;cidade\nJoão;São Paulo\n'.encode('utf-8'))
+    esperado = calcular_impressao(conteudo, tamanhos_prefixo=[prefixo])
+
+    with open(caminho, encoding='utf-8') as texto:
+        texto.readline()  # posição qualquer: a impressão lê desde o início
+        assert calcular_impressao(texto, tamanhos_prefixo=[prefixo]) == dict(esperado, nome_arquivo='acentos.csv')
+        assert texto.readline() == 'nome;cidade\n'
+    em_memoria = io.StringIO(conteudo.decode('utf-8'))
+    impressao = calcular_impressao(em_memoria, tamanhos_prefixo=[prefixo])
+    assert impressao['tamanho_bytes'] == len(conteudo) == importacoes._tamanho_fonte(em_memoria)
+    assert impressao['hashes_prefixo'] == esperado['hashes_prefixo']
+    assert impressao['hashes_prefixo'][prefixo] == calcular_impressao(conteudo[:prefixo])['hash_arquivo']
+
+
+def test_arquivo_repetido_e_ignorado_e_estendido_carrega_so_linhas_novas(temp_env):
+    df = montar_vendas(30)
+    caminho = temp_env / 'vendas.csv'
+    df.iloc[:20].to_csv(caminho, sep=';', index=False)
+
+    primeiro = pipeline.executar_pipeline_stream(str(caminho), caminho_raw='', chunk_size=7, sep=';')
+    assert primeiro['importacao'] == 'completa'
+    assert contar_vendas() == 20
+
+    # mesmo arquivo de novo: nada é processado, nenhuma duplicata registrada
+    assert planejar_importacao(str(caminho))['acao'] == 'pular'
+    repetido = pipeline.executar_pipeline_stream(str(caminho), caminho_raw='', chunk_size=7, sep=';')
+    assert repetido['importacao'] == 'pular'
+    assert contar_vendas() == 20
+    assert not os.path.exists(db_utils.DUPLICATE_LOG)
+
+    # arquivo estendido: só as 10 linhas novas são lidas
+    df.iloc[20:].to_csv(caminho, sep=';', index=False, header=False, mode='a')
+    estendido = pipeline.executar_pipeline_stream(str(caminho), caminho_raw='', chunk_size=7, sep=';')
+    assert estendido['importacao'] == 'incremental'
+    assert estendido['estatisticas']['total_processado'] == 10
+    assert contar_vendas() == 30
+    assert not os.path.exists(db_utils.DUPLICATE_LOG)
+
+    assert importacoes_registradas() == [
+        ('vendas.csv', 20, 20, 'CONCLUIDA'),
+        ('vendas.csv', 30, 10, 'CONCLUIDA'),
+    ]
+
+
+def test_pipeline_em_memoria_usa_plano_de_importacao(temp_env):
+    df = montar_vendas(12)
+    caminho = temp_env / 'vendas.csv'
+    df.to_csv(caminho, sep=';', index=False)
+
+    plano = planejar_importacao(str(caminho))
+    resultado = pipeline.executar_pipeline(df, caminho_raw='', importacao=plano)
+    assert resultado['sucesso'] and contar_vendas() == 12
+
+    plano = planejar_importacao(str(caminho))
+    assert plano['acao'] == 'pular'
+    assert pipeline.executar_pipeline(df, caminho_raw='', importacao=plano)['importacao'] == 'pular'
+    assert contar_vendas() == 12
+
+
+def test_migracao_de_tabela_importacoes_antiga(temp_env):
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("DROP TABLE importacoes")
+    conn.execute("""
+        CREATE TABLE importacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome_arquivo TEXT NOT NULL,
+            total_registros INTEGER NOT NULL,
+            registros_importados INTEGER NOT NULL,
+            registros_com_erro INTEGER DEFAULT 0,
+            usuario_importacao TEXT,
+            data_importacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'CONCLUIDA'
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+    assert db_utils.registrar_importacao('x.csv', 'abc', 10, 1, 1)
+    assert db_utils.buscar_importacao_por_hash('abc')['nome_arquivo'] == 'x.csv'
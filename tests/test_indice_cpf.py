@@ -0,0 +1,80 @@
+import os
+import sqlite3
+
+from src import db_utils
+from src import pipeline
+from src.indice_cpf import FiltroBloom, IndiceCPF
+from tests.conftest import montar_vendas, contar_vendas
+
+
+def cpfs_duplicados_registrados():
+    if not os.path.exists(db_utils.DUPLICATE_CSV):
+        return 0
+    with open(db_utils.DUPLICATE_CSV, encoding='utf-8') as f:
+        return sum(1 for _ in f) - 1
+
+
+def test_filtro_bloom_persistido(tmp_path):
+    filtro = FiltroBloom(1000)
+    for i in range(500):
+        filtro.adicionar(f'{i:011d}')
+    caminho = str(tmp_path / 'cpfs.bloom')
+    filtro.salvar(caminho, {'ultimo_id': 42})
+
+    carregado, metadados = FiltroBloom.carregar(caminho)
+    assert metadados['ultimo_id'] == 42
+    assert all(f'{i:011d}' in carregado for i in range(500))
+    falsos_positivos = sum(f'{i:011d}' in carregado for i in range(500, 10500))
+    assert falsos_positivos < 50
+    assert FiltroBloom.carregar(str(tmp_path / 'inexistente.bloom')) == (None, None)
+
+
+def test_indice_em_memoria_nao_consulta_banco_por_lote(temp_env, monkeypatch):
+    df = montar_vendas(20)
+    pipeline.executar_pipeline(df.iloc[:10], caminho_raw='', chunk_size=5)
+
+    def consulta_proibida(conn, cpfs):
+        raise AssertionError('consulta de CPFs por lote')
+
+    monkeypatch.setattr(db_utils, '_cpfs_existentes', consulta_proibida)
+    resultado = pipeline.executar_pipeline(df, caminho_raw='', chunk_size=5)
+
+    assert resultado['sucesso']
+    assert contar_vendas() == 20
+    assert cpfs_duplicados_registrados() == 10
+
+
+def test_modo_bloom_equivale_ao_modo_memoria(temp_env):
+    df = montar_vendas(30)
+    caminho_bloom = os.path.join(os.path.dirname(db_utils.DB_PATH), 'cpfs_vendas.bloom')
+
+    pipeline.executar_pipeline(df.iloc[:15], caminho_raw='', chunk_size=4, usar_bloom_cpf=True)
+    assert os.path.exists(caminho_bloom)
+
+    pipeline.executar_pipeline(df, caminho_raw='', chunk_size=4, usar_bloom_cpf=True)
+    assert contar_vendas() == 30
+    assert cpfs_duplicados_registrados() == 15
+
+    # vendas gravadas por fora do pipeline entram no filtro na próxima carga
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    indice = IndiceCPF.carregar(conn, caminho_bloom)
+    assert all(f'{i:011d}' in indice.bloom for i in range(30))
+    assert indice.existentes(conn, {f'{i:011d}' for i in range(25, 35)}, db_utils._cpfs_existentes) == \
+        {f'{i:011d}' for i in range(25, 30)}
+    conn.close()
+
+
+def test_filtro_cheio_e_reconstruido(temp_env):
+    pipeline.executar_pipeline(montar_vendas(10), caminho_raw='')
+    caminho_bloom = os.path.join(os.path.dirname(db_utils.DB_PATH), 'cpfs_vendas.bloom')
+
+    filtro = FiltroBloom(1000)
+    filtro.quantidade = 1001
+    filtro.salvar(caminho_bloom, {'ultimo_id': 10 ** 9})
+
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    indice = IndiceCPF.carregar(conn, caminho_bloom)
+    conn.close()
+    assert not indice.bloom.cheio
+    assert indice.ultimo_id > 0
+    assert all(f'{i:011d}' in indice.bloom for i in range(10))
@@ -0,0 +1,94 @@
+import os
+import time
+
+from src import db_utils
+from tests.conftest import contar_vendas
+
+
+def venda(cpf, quantidade=1):
+    return {
+        'nome_cliente': f'Cliente {cpf}', 'cpf': cpf, 'codigo_produto': 'P001', 'quantidade': quantidade,
+        'valor_produto': 10.0, 'data_venda': '01/01/2024', 'codigo_loja': 'L1', 'codigo_vendedor': 'V1'
+    }
+
+
+def test_lote_retorna_resultado_por_linha(temp_env):
+    db_utils.inserir_linha(venda('111'))
+
+    linhas = [
+        venda('222'),
+        venda('111'),              # já existe no banco
+        venda('333'),
+        venda('222'),              # repetido dentro do lote
+        venda('444', quantidade=0),  # viola CHECK(quantidade > 0)
+        venda('444'),              # primeira ocorrência falhou, então esta entra
+    ]
+    resultados = db_utils.inserir_lote(linhas)
+
+    assert resultados == [True, False, True, False, False, True]
+    assert contar_vendas() == 1 + 3
+
+    with open(db_utils.DUPLICATE_LOG, encoding='utf-8') as f:
+        conteudo = f.read()
+    assert '"111"' in conteudo and '"222"' in conteudo
+
+
+def test_lote_equivalente_a_insercoes_sequenciais(temp_env, tmp_path, monkeypatch):
+    linhas = [venda('555'), venda('555'), venda('666', quantidade=0), venda('777')]
+    resultados_lote = db_utils.inserir_lote(linhas)
+
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(tmp_path / 'sequencial.db'))
+    db_utils.criar_tabela()
+    resultados_sequenciais = [db_utils.inserir_linha(dados) for dados in linhas]
+
+    assert resultados_lote == resultados_sequenciais
+
+
+def test_lote_vazio(temp_env):
+    assert db_utils.inserir_lote([]) == []
+
+
+def test_log_de_duplicatas_gravado_em_bloco(temp_env, monkeypatch):
+    aberturas = []
+    open_original = open
+
+    def open_contado(caminho, *args, **kwargs):
+        if caminho in (db_utils.DUPLICATE_LOG, db_utils.DUPLICATE_CSV):
+            aberturas.append(caminho)
+        return open_original(caminho, *args, **kwargs)
+
+    db_utils.inserir_lote([venda(str(i)) for i in range(10)])
+    monkeypatch.setattr('builtins.open', open_contado)
+    resultados = db_utils.inserir_lote([venda(str(i)) for i in range(10)])
+
+    assert resultados == [False] * 10
+    assert sorted(aberturas) == sorted([db_utils.DUPLICATE_LOG, db_utils.DUPLICATE_CSV])
+    with open_original(db_utils.DUPLICATE_CSV, encoding='utf-8') as f:
+        assert len(f.read().strip().splitlines()) == 1 + 10
+
+
+def test_buffer_de_duplicatas_descarrega_por_tamanho(temp_env):
+    buffer = db_utils.BufferDuplicatas(max_entradas=3, intervalo=3600)
+    for i in range(2):
+        buffer.registrar({'timestamp': 't', 'cpf': str(i), 'codigo_loja': 'L', 'codigo_vendedor': 'V'})
+    assert not os.path.exists(db_utils.DUPLICATE_LOG)
+
+    buffer.registrar({'timestamp': 't', 'cpf': '2', 'codigo_loja': 'L', 'codigo_vendedor': 'V'})
+    with open(db_utils.DUPLICATE_LOG, encoding='utf-8') as f:
+        assert len(f.read().strip().splitlines()) == 3
+    assert buffer.flush() == 0
+
+
+def test_buffer_de_duplicatas_descarrega_por_tempo_sem_nova_entrada(temp_env):
+    buffer = db_utils.BufferDuplicatas(max_entradas=100, intervalo=0.05)
+    buffer.registrar({'timestamp': 't', 'cpf': '1', 'codigo_loja': 'L', 'codigo_vendedor': 'V'})
+    assert not os.path.exists(db_utils.DUPLICATE_LOG)
+
+    # nenhuma duplicata nova chega: o timer grava a pendente
+    for _ in range(100):
+        if os.path.exists(db_utils.DUPLICATE_CSV):  # gravado depois do log
+            break
+        time.sleep(0.02)
+    with open(db_utils.DUPLICATE_LOG, encoding='utf-8') as f:
+        assert len(f.read().strip().splitlines()) == 1
+    assert buffer.flush() == 0
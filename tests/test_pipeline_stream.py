@@ -0,0 +1,217 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+from src import db_utils
+from src import pipeline
+from tests.conftest import montar_vendas, contar_vendas, resumo_deterministico
+
+
+def test_stream_equivalente_ao_pipeline_em_memoria(temp_env, monkeypatch):
+    df = montar_vendas(23)
+    caminho = temp_env / 'vendas.csv'
+    df.to_csv(caminho, sep=';', index=False)
+
+    resultado = pipeline.executar_pipeline_stream(str(caminho), chunk_size=5, sep=';')
+
+    assert resultado['sucesso']
+    assert resultado['estatisticas']['total_processado'] == 23
+    assert resultado['estatisticas']['inseridos'] == 23
+    assert contar_vendas() == 23
+    # o próprio arquivo de entrada é arquivado ao final
+    assert not caminho.exists() and resultado['csv_arquivado']
+
+    resumo_stream = resumo_deterministico(resultado['resumo_csv'])
+
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(temp_env / 'memoria.db'))
+    db_utils.criar_tabela()
+    resultado_memoria = pipeline.executar_pipeline(df, caminho_raw=str(temp_env / 'inexistente.csv'), chunk_size=5)
+    assert resumo_stream == resumo_deterministico(resultado_memoria['resumo_csv'])
+
+
+def test_stream_descarta_linhas_duplicadas_como_tratar_dados(temp_env, monkeypatch):
+    df = montar_vendas(10)
+    # duplicatas exatas dentro do chunk (linha 11) e entre chunks (linhas 10 e 12; chunk_size=4)
+    df = pd.concat([df, df.iloc[[1, 8]], df.iloc[[8]]], ignore_index=True).drop(columns=['nome_cliente'])
+    caminho = temp_env / 'vendas.csv'
+    df.to_csv(caminho, sep=';', index=False)
+
+    def executar(retomar=False):
+        return pipeline.executar_pipeline_stream(str(caminho), caminho_raw='', chunk_size=4, sep=';',
+                                                 retomar=retomar)
+
+    # interrompido após o 2º chunk: na retomada, as repetições de linhas já gravadas
+    # são barradas pelo CPF
+    gravar_original = pipeline.gravar_chunk
+    chamadas = []
+
+    def gravar(lote, *args):
+        chamadas.append(1)
+        if len(chamadas) == 3:
+            raise RuntimeError('conexão perdida')
+        return gravar_original(lote, *args)
+
+    with monkeypatch.context() as m:
+        m.setattr(pipeline, 'gravar_chunk', gravar)
+        assert not executar()['sucesso']
+    resultado = executar(retomar=True)
+
+    assert resultado['sucesso']
+    assert resultado['estatisticas']['linhas_duplicadas'] == 1
+    assert resultado['estatisticas']['total_processado'] == 12
+    assert contar_vendas() == 10
+    # coluna esperada ausente no arquivo é criada vazia (nome_cliente)
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    assert conn.execute("SELECT COUNT(*) FROM vendas WHERE nome_cliente = ''").fetchone()[0] == 10
+    # importacoes conta as linhas do arquivo (posição para arquivos estendidos)
+    assert conn.execute("SELECT total_registros FROM importacoes WHERE status = 'CONCLUIDA'").fetchone()[0] == 13
+    conn.close()
+
+
+def test_sincronizacao_incremental_envia_apenas_combinacoes_novas(monkeypatch):
+    enviados = []
+    monkeypatch.setattr(pipeline, 'ensure_store_sellers_from_df', lambda df: enviados.append(len(df)))
+
+    ja_sincronizados = set()
+    df = montar_vendas(8)
+    pipeline.sincronizar_lojas_vendedores(df.iloc[:4], ja_sincronizados)
+    pipeline.sincronizar_lojas_vendedores(df.iloc[4:], ja_sincronizados)
+
+    # as 4 combinações loja/vendedor aparecem nas 4 primeiras linhas
+    assert enviados == [4]
+    assert len(ja_sincronizados) == 4
+
+
+def test_workers_produzem_mesmo_resultado_que_um_processo(temp_env, monkeypatch):
+    df = montar_vendas(40)
+
+    resultado_paralelo = pipeline.executar_pipeline(df, caminho_raw='inexistente.csv', chunk_size=6, workers=3)
+    resumo_paralelo = pd.read_csv(resultado_paralelo['resumo_csv'])
+    resumo_paralelo_fixo = resumo_deterministico(resultado_paralelo['resumo_csv'])
+    assert contar_vendas() == 40
+
+    monkeypatch.setattr(db_utils, 'DB_PATH', str(temp_env / 'serial.db'))
+    db_utils.criar_tabela()
+    resultado_serial = pipeline.executar_pipeline(df, caminho_raw='inexistente.csv', chunk_size=6)
+    resumo_serial = pd.read_csv(resultado_serial['resumo_csv'])
+
+    assert list(resumo_paralelo.columns) == list(resumo_serial.columns)
+    assert resumo_paralelo_fixo == resumo_deterministico(resultado_serial['resumo_csv'])
+
+    corrigido, erros = pipeline.corrigir_e_validar_paralelo(df, workers=2, chunk_size=7)
+    corrigido_serial, erros_serial = pipeline.corrigir_e_validar(df)
+    assert corrigido.equals(corrigido_serial)
+    assert erros.tolist() == erros_serial.tolist()
+
+
+def test_escrita_sobrepoe_validacao_com_fila_limitada(temp_env, monkeypatch):
+    import time
+
+    validacoes, gravacoes = [], []
+    validar_original = pipeline.validar_chunk
+    sincronizar_original = pipeline.sincronizar_lojas_vendedores
+    gravar_original = pipeline.gravar_chunk
+
+    def validar(df_chunk, start_idx=0):
+        inicio = time.perf_counter()
+        resultado = validar_original(df_chunk, start_idx)
+        validacoes.append((inicio, time.perf_counter()))
+        return resultado
+
+    def sincronizar(df_chunk, ja_sincronizados):
+        gravacoes.append([time.perf_counter(), None])
+        return sincronizar_original(df_chunk, ja_sincronizados)
+
+    def gravar(lote, *args):
+        time.sleep(0.05)
+        try:
+            return gravar_original(lote, *args)
+        finally:
+            gravacoes[-1][1] = time.perf_counter()
+
+    monkeypatch.setattr(pipeline, 'validar_chunk', validar)
+    monkeypatch.setattr(pipeline, 'sincronizar_lojas_vendedores', sincronizar)
+    monkeypatch.setattr(pipeline, 'gravar_chunk', gravar)
+
+    resultado = pipeline.executar_pipeline(montar_vendas(30), caminho_raw='inexistente.csv', chunk_size=5,
+                                           profundidade_fila=1)
+
+    assert resultado['sucesso']
+    assert resultado['estatisticas']['inseridos'] == 30
+    # algum chunk foi validado enquanto o anterior estava sendo gravado
+    assert any(v_ini < g_fim and g_ini < v_fim for v_ini, v_fim in validacoes for g_ini, g_fim in gravacoes)
+
+
+def test_erro_na_gravacao_interrompe_pipeline(temp_env, monkeypatch):
+    def gravar(lote, *args):
+        raise RuntimeError('banco indisponível')
+
+    monkeypatch.setattr(pipeline, 'gravar_chunk', gravar)
+    resultado = pipeline.executar_pipeline(montar_vendas(30), caminho_raw='inexistente.csv', chunk_size=5,
+                                           profundidade_fila=1)
+
+    assert not resultado['sucesso']
+    assert 'banco indisponível' in resultado['erro']
+
+
+def test_falha_no_encerramento_nao_mascara_erro_nem_deixa_indices_suspensos(temp_env, monkeypatch):
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("CREATE INDEX idx_vendas_loja ON vendas(codigo_loja)")
+    conn.commit()
+    conn.close()
+
+    gravacao_falhou = threading.Event()
+    validar_original = pipeline.validar_chunk
+
+    def gravar(lote, *args):
+        gravacao_falhou.set()
+        raise RuntimeError('banco indisponível')
+
+    def validar(df_chunk, start_idx=0):
+        if start_idx > 0:
+            gravacao_falhou.wait(5)
+            raise ValueError('chunk corrompido')
+        return validar_original(df_chunk, start_idx)
+
+    monkeypatch.setattr(pipeline, 'gravar_chunk', gravar)
+    monkeypatch.setattr(pipeline, 'validar_chunk', validar)
+    resultado = pipeline.executar_pipeline(montar_vendas(30), caminho_raw='inexistente.csv', chunk_size=5,
+                                           carga_em_bloco=True, recriar_indices=True)
+
+    # o erro da validação é o relatado; o da gravação (relançado ao concluir) só é registrado
+    assert not resultado['sucesso']
+    assert 'chunk corrompido' in resultado['erro']
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    indices = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert 'idx_vendas_loja' in indices
+    assert not (temp_env / 'indices_suspensos.json').exists()
+
+
+def test_tempos_por_etapa_no_resultado_e_no_resumo(temp_env):
+    resultado = pipeline.executar_pipeline(montar_vendas(12), caminho_raw='inexistente.csv', chunk_size=5)
+
+    desempenho = resultado['desempenho']
+    assert set(desempenho['tempos_etapas']) == set(pipeline.MedidorEtapas.ETAPAS)
+    assert desempenho['tempos_etapas']['insercao'] > 0
+    assert len(desempenho['linhas_por_segundo_chunks']) == 3
+    assert desempenho['tempo_total'] >= desempenho['tempos_etapas']['pdf']
+
+    resumo = pd.read_csv(resultado['resumo_csv'])
+    for etapa in pipeline.MedidorEtapas.ETAPAS:
+        assert f'tempo_{etapa}_s' in resumo.columns
+    assert {'tempo_total_s', 'linhas_por_segundo', 'linhas_por_segundo_chunk_min'} <= set(resumo.columns)
+
+
+def test_sincronizacao_em_bloco_cria_apenas_entidades_novas(temp_env):
+    df = montar_vendas(8)
+    criadas = db_utils.ensure_store_sellers_from_df(df.iloc[:2])
+    assert criadas == {'vendedores': 2, 'lojas': 2, 'loja_vendedor': 2}
+
+    # apenas o que falta é inserido; repetir a sincronização não cria nada
+    assert db_utils.ensure_store_sellers_from_df(df) == {'vendedores': 2, 'lojas': 0, 'loja_vendedor': 2}
+    assert db_utils.ensure_store_sellers_from_df(df) == {'vendedores': 0, 'lojas': 0, 'loja_vendedor': 0}
+
+    resultado = pipeline.executar_pipeline(montar_vendas(8), caminho_raw='', chunk_size=3)
+    assert resultado['estatisticas']['novas_entidades'] == {'lojas': 0, 'vendedores': 0, 'loja_vendedor': 0}
@@ -0,0 +1,141 @@
+import sqlite3
+
+from src import db_utils
+from src import pipeline
+from src.migrations import ensure_loja_vendedor
+from tests.conftest import montar_vendas
+
+
+def resumo_no_banco():
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    linhas = conn.execute("""
+        SELECT dia, codigo_loja, codigo_vendedor, codigo_produto, forma_pagamento,
+               total_vendas, quantidade_total, valor_total
+        FROM vendas_resumo_diario ORDER BY 1, 2, 3, 4, 5
+    """).fetchall()
+    conn.close()
+    return linhas
+
+
+def resumo_calculado_de_vendas():
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    linhas = conn.execute("""
+        SELECT v.data_venda_iso, v.codigo_loja, v.codigo_vendedor, v.codigo_produto, v.forma_pagamento,
+               COUNT(*), SUM(v.quantidade), SUM(p.valor_produto * v.quantidade)
+        FROM vendas v JOIN produtos p ON p.codigo_produto = v.codigo_produto
+        GROUP BY 1, 2, 3, 4, 5 ORDER BY 1, 2, 3, 4, 5
+    """).fetchall()
+    conn.close()
+    return linhas
+
+
+def cadastrar_produtos():
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.executemany("INSERT INTO produtos (codigo_produto, nome_produto, valor_produto) VALUES (?, ?, ?)",
+                     [(f'P{i}', f'Produto {i}', 10.5) for i in range(3)])
+    conn.commit()
+    conn.close()
+
+
+def test_pipeline_atualiza_resumo_a_cada_chunk(temp_env):
+    cadastrar_produtos()
+    df = montar_vendas(24)
+    df['data_venda'] = ['01/01/2024' if i % 3 else '02/01/2024' for i in range(24)]
+
+    resultado = pipeline.executar_pipeline(df.iloc[:16], caminho_raw='', chunk_size=5)
+    assert resultado['sucesso']
+    assert resumo_no_banco() == resumo_calculado_de_vendas()
+    assert sum(linha[5] for linha in resumo_no_banco()) == 16
+
+    # nova carga: só as vendas novas são somadas aos grupos existentes
+    pipeline.executar_pipeline(df.iloc[16:], caminho_raw='', chunk_size=5)
+    assert resumo_no_banco() == resumo_calculado_de_vendas()
+    assert sum(linha[5] for linha in resumo_no_banco()) == 24
+
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    assert conn.execute("SELECT ultimo_id_venda FROM vendas_resumo_controle").fetchone()[0] == \
+        conn.execute("SELECT MAX(id_venda) FROM vendas").fetchone()[0]
+    conn.close()
+    assert db_utils.atualizar_resumo_vendas() == 0
+
+
+def test_reconstruir_resumo_e_filtro_por_dia(temp_env):
+    cadastrar_produtos()
+    df = montar_vendas(8)
+    df['data_venda'] = ['01/01/2024', '02/01/2024'] * 4
+    pipeline.executar_pipeline(df, caminho_raw='')
+
+    # exclusões não são vistas pela atualização incremental; a reconstrução corrige
+    conn = sqlite3.connect(db_utils.DB_PATH)
+    conn.execute("DELETE FROM vendas WHERE data_venda_iso = '2024-01-02'")
+    conn.commit()
+    conn.close()
+    assert db_utils.atualizar_resumo_vendas() == 0
+    assert resumo_no_banco() != resumo_calculado_de_vendas()
+
+    assert db_utils.reconstruir_resumo_vendas() == len(resumo_calculado_de_vendas())
+    assert resumo_no_banco() == resumo_calculado_de_vendas()
+
+    resumo = db_utils.buscar_resumo_vendas(data_inicio='2024-01-01', data_fim='01/01/2024')
+    assert set(resumo['dia']) == {'2024-01-01'}
+    assert resumo['total_vendas'].sum() == 4
+    assert db_utils.buscar_resumo_vendas(data_inicio='2024-01-02').empty
+
+
+def test_views_de_desempenho_leem_o_resumo(tmp_path):
+    banco = str(tmp_path / 'vendas.db')
+    ensure_loja_vendedor.main(['--db', banco])
+    conn = sqlite3.connect(banco)
+    conn.execute("INSERT INTO lojas (codigo_loja, nome_loja) VALUES ('L1', 'Loja 1')")
+    conn.execute("INSERT INTO vendedores (codigo_vendedor, nome_vendedor) VALUES ('V1', 'Vendedor 1')")
+    conn.execute("INSERT INTO loja_vendedor (codigo_loja, codigo_vendedor) VALUES ('L1', 'V1')")
+    for dia in ('20/06/2023', '21/06/2023'):
+        conn.execute("INSERT INTO vendas (id_cliente, nome_cliente, cpf, codigo_produto, quantidade, valor_produto, "
+                     "data_venda, data_compra, data_venda_iso, codigo_loja, codigo_vendedor) "
+                     "VALUES (1, 'C', ?, 'P001', 2, 10, ?, ?, ?, 'L1', 'V1')",
+                     (dia, dia, dia, db_utils.data_iso(dia)))
+    conn.commit()
+    conn.close()
+
+    # a migração reconstrói o resumo a partir das vendas existentes
+    ensure_loja_vendedor.main(['--db', banco])
+    conn = sqlite3.connect(banco)
+    assert conn.execute("SELECT total_vendas, valor_total_vendido, ultima_venda FROM vw_performance_vendedores "
+                        "WHERE codigo_vendedor = 'V1'").fetchone() == (2, 40.0, '2023-06-21')
+    assert conn.execute("SELECT total_vendido FROM vw_produtos_mais_vendidos "
+                        "WHERE codigo_produto = 'P001'").fetchone() == (4,)
+    conn.close()
+
+
+def test_views_incluem_vendas_acima_da_marca_dagua(tmp_path):
+    banco = str(tmp_path / 'vendas.db')
+    ensure_loja_vendedor.main(['--db', banco])
+    conn = sqlite3.connect(banco)
+    conn.execute("INSERT INTO lojas (codigo_loja, nome_loja) VALUES ('L1', 'Loja 1')")
+    conn.execute("INSERT INTO vendedores (codigo_vendedor, nome_vendedor) VALUES ('V1', 'Vendedor 1')")
+    conn.execute("INSERT INTO loja_vendedor (codigo_loja, codigo_vendedor) VALUES ('L1', 'V1')")
+    vendas = [(1, '20/06/2023', 2), (2, '21/06/2023', 1), (1, '21/06/2023', 3), (3, 'sem data', 1)]
+    for id_cliente, dia, quantidade in vendas:
+        conn.execute("INSERT INTO vendas (id_cliente, nome_cliente, cpf, codigo_produto, quantidade, valor_produto, "
+                     "data_venda, data_compra, data_venda_iso, codigo_loja, codigo_vendedor) "
+                     "VALUES (?, 'C', ?, 'P001', ?, 10, ?, ?, ?, 'L1', 'V1')",
+                     (id_cliente, str(quantidade) * 11, quantidade, dia, dia, db_utils.data_iso(dia)))
+        if dia == '20/06/2023':
+            # só a primeira venda passa pelo resumo; as demais ficam acima da marca d'água
+            conn.commit()
+            conn.close()
+            ensure_loja_vendedor.main(['--db', banco])
+            conn = sqlite3.connect(banco)
+    conn.commit()
+
+    assert conn.execute("SELECT SUM(total_vendas) FROM vendas_resumo_diario").fetchone() == (1,)
+    assert conn.execute("SELECT total_vendas, valor_total_vendido, ultima_venda FROM vw_performance_vendedores "
+                        "WHERE codigo_vendedor = 'V1'").fetchone() == (3, 60.0, '2023-06-21')
+    assert conn.execute("SELECT total_vendido, total_vendas FROM vw_produtos_mais_vendidos "
+                        "WHERE codigo_produto = 'P001'").fetchone() == (6, 3)
+    assert conn.execute("SELECT total_vendas, valor_total_vendido, total_vendedores, total_clientes, ticket_medio "
+                        "FROM vw_performance_lojas WHERE codigo_loja = 'L1'").fetchone() == (3, 60.0, 1, 2, 20.0)
+    # a venda sem data entra nos totais gerais, como antes do resumo
+    assert conn.execute("SELECT total_vendas, valor_total_vendido, total_clientes, total_vendedores, "
+                        "ticket_medio_geral FROM vw_dashboard_resumo").fetchone() == (4, 70.0, 3, 1, 17.5)
+    conn.close()
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from src.validacao import corrigir_linha, validar_linha, corrigir_df, validar_df
+
+
+DATAS = ['01/01/2000', '1/1/2000', ' 1/01/2000', '31/02/2000', '29/02/2024', '29/02/1900',
+         '01/13/2000', '01/01/0000', '2000-01-01', '31/12/2999', '', None, float('nan')]
+DOCUMENTOS = ['123.456.789-01', '123', '(11) 98765-4321', 12345678901, 12345678901.0, '', None, float('nan')]
+
+
+def montar_df():
+    linhas = []
+    for i in range(len(DATAS) * len(DOCUMENTOS)):
+        linhas.append({
+            'cpf': DOCUMENTOS[i % len(DOCUMENTOS)],
+            'telefone': DOCUMENTOS[(i // 3) % len(DOCUMENTOS)],
+            'data_nascimento': DATAS[i % len(DATAS)],
+            'data_compra': DATAS[(i // 2) % len(DATAS)],
+        })
+    return pd.DataFrame(linhas)
+
+
+def test_corrigir_df_igual_a_versao_escalar():
+    df = montar_df()
+    esperado = [corrigir_linha(row.copy()).to_dict() for _, row in df.iterrows()]
+    obtido = corrigir_df(df).to_dict('records')
+    for linha_esperada, linha_obtida in zip(esperado, obtido):
+        for coluna in ['cpf', 'telefone', 'data_nascimento', 'data_compra']:
+            assert linha_esperada[coluna] == linha_obtida[coluna]
+
+
+def test_validar_df_igual_a_versao_escalar():
+    df = montar_df()
+    # antes e depois da correção, para exercitar todos os tipos de erro
+    for frame in (df, corrigir_df(df)):
+        esperado = [validar_linha(row) for _, row in frame.iterrows()]
+        assert validar_df(frame).tolist() == esperado
+
+
+def test_colunas_ausentes_e_df_vazio():
+    df = pd.DataFrame({'outra': [1]})
+    corrigido = corrigir_df(df)
+    assert corrigido.loc[0, 'cpf'] == '00000000000'
+    assert corrigido.loc[0, 'data_nascimento'] == '01/01/2000'
+    assert validar_df(df).iloc[0] == validar_linha(df.iloc[0])
+
+    vazio = pd.DataFrame(columns=['cpf', 'telefone', 'data_nascimento', 'data_compra'])
+    assert corrigir_df(vazio).empty
+    assert validar_df(vazio).empty